@@ -2,22 +2,13 @@
 import board
 import busio
 import adafruit_ssd1306
-import digitalio
+from buttons import Buttons, PRESS, RELEASE
 import time
 
 i2c_sda = board.GP2
 i2c_scl = board.GP3
-btns = {
-    "up": digitalio.DigitalInOut(board.GP7),
-    "left": digitalio.DigitalInOut(board.GP6),
-    "down": digitalio.DigitalInOut(board.GP5),
-    "right": digitalio.DigitalInOut(board.GP4),
-    "A": digitalio.DigitalInOut(board.GP15),
-    "B": digitalio.DigitalInOut(board.GP14)
-}
-for btn in btns.values():
-    btn.direction = digitalio.Direction.INPUT
-    btn.pull = digitalio.Pull.UP
+names = [ "up", "left", "down", "right", "A", "B" ]
+buttons = Buttons((board.GP7, board.GP6, board.GP5, board.GP4, board.GP15, board.GP14))
 
 i2c = busio.I2C(i2c_scl, i2c_sda)
 
@@ -30,33 +21,25 @@ display.text(" push", 80, 0, 1)
 display.text("button", 80, 10, 1)
 display.show()
 
-btns_printed = {
-    "up": False,
-    "left": False,
-    "down": False,
-    "right": False,
-    "A": False,
-    "B": False
-}
 has_change = False
 while True:
-    for i, btn_color in enumerate([ "up", "left", "down", "right", "A", "B" ]):
-        if (not btns[btn_color].value) and (not btns_printed[btn_color]):
-            # button pushed but keyword not printed
-            display.text(btn_color, 0, i*10, 1)
-            btns_printed[btn_color] = True
-            print(btn_color, "pressed")
+    buttons.poll()
+    while True:
+        event = buttons.get()
+        if event is None:
+            break
+        kind, i, t = event
+        if kind == PRESS:
+            display.text(names[i], 0, i*10, 1)
+            print(names[i], "pressed", t)
             has_change = True
-
-        elif btns[btn_color].value and btns_printed[btn_color]:
-            # button not pushed anymore but keyword still printed
+        elif kind == RELEASE:
             display.fill_rect(0, i*10, 80, 10, 0)
-            btns_printed[btn_color] = False
-            print(btn_color, "released")
+            print(names[i], "released", t)
             has_change = True
 
     if has_change:
         display.show()
         has_change = False
 
-    time.sleep(0.1)
+    time.sleep(0.02)
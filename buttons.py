@@ -0,0 +1,161 @@
+# Button input shared by the games: every button is read once per poll()
+# into an integer bitmask (bit i = pins[i]), with debounced, timestamped
+# press/release edges and auto-repeat (DAS/ARR).
+#
+#   buttons = Buttons((board.GP7, board.GP6))    # bit 0 = GP7, bit 1 = GP6
+#   UP, DOWN = 1, 2
+#   buttons.set_repeat(UP | DOWN, 0.20, 0.08)    # repeat after 0.2s, every 0.08s
+#   held = buttons.poll()                        # once per game tick
+#   if buttons.pressed & UP: ...                 # went down since the last poll
+#   if buttons.repeated & DOWN: ...              # press or auto-repeat
+#   ev = buttons.get()                           # (PRESS/RELEASE/REPEAT, index, time) or None
+#
+# Where the keypad module exists (CircuitPython 7+) the pins are scanned in
+# the background, so a tap shorter than a slow frame still arrives as a
+# press. Otherwise the pins are read through digitalio at every poll().
+# source=callable(now) -> mask replaces the pins (autoplay, replays); it can
+# also be set later through buttons.source. A Recorder (recorder.py) sets
+# buttons.tape to log what every poll reported, or to replay a log instead
+# of reading the pins.
+
+import time
+
+import digitalio
+
+try:
+    import keypad
+except ImportError:
+    keypad = None
+
+try:
+    from supervisor import ticks_ms
+except ImportError:
+    ticks_ms = None
+
+PRESS = 1
+RELEASE = 2
+REPEAT = 3
+
+
+class Buttons:
+    """ Debounced button bitmask with press/release/repeat events """
+
+    def __init__(self, pins, *, debounce=0.005, source=None, max_events=16):
+        self.count = len(pins)
+        self.debounce = debounce        # s, a bit ignores changes this long after an edge
+        self.source = source
+        self.max_events = max_events
+        self._keys = None
+        self._ios = None
+        if source is None:
+            if keypad is not None:
+                self._keys = keypad.Keys(pins, value_when_pressed=False, pull=True)
+                self._event = keypad.Event()
+            else:
+                self._ios = []
+                for pin in pins:
+                    io = digitalio.DigitalInOut(pin)
+                    io.direction = digitalio.Direction.INPUT
+                    io.pull = digitalio.Pull.UP
+                    self._ios.append(io)
+        n = self.count
+        self._lock = [0.0] * n          # lockout end per button
+        self._das = [None] * n
+        self._arr = [None] * n
+        self._next = [0.0] * n          # next auto-repeat per button
+        self.events = []
+        self.held = 0
+        self.pressed = 0
+        self.released = 0
+        self.repeated = 0
+        self.tape = None                # Recorder or None
+
+    def set_repeat(self, mask, das, arr):
+        """ Auto-repeat for the buttons in mask: first after das, then every arr """
+        for i in range(self.count):
+            if mask & (1 << i):
+                self._das[i] = das
+                self._arr[i] = arr
+
+    def _scan(self):
+        raw = 0
+        bit = 1
+        for io in self._ios:
+            if not io.value:  # pull-up: pressed reads low
+                raw |= bit
+            bit <<= 1
+        return raw
+
+    def poll(self, now=None):
+        """ Read all buttons once; returns the held mask """
+        if now is None:
+            now = time.monotonic()
+        tape = self.tape
+        if tape is not None and tape.replaying:
+            return tape.play(self, now)
+        self.pressed = self.released = self.repeated = 0
+        if self._keys is not None and self.source is None:
+            # queued in the background: short taps aren't lost
+            ev = self._event
+            events = self._keys.events
+            while events.get_into(ev):
+                t = now
+                if ticks_ms is not None:
+                    t -= ((ticks_ms() - ev.timestamp) & 0x3FFFFFFF) / 1000
+                self._edge(ev.key_number, ev.pressed, t)
+        else:
+            raw = self.source(now) if self.source is not None else self._scan()
+            changed = raw ^ self.held
+            if changed:
+                for i in range(self.count):
+                    if changed & (1 << i) and now >= self._lock[i]:
+                        self._edge(i, raw & (1 << i), now)
+        held = self.held
+        if held & ~self.pressed:
+            das = self._das
+            nxt = self._next
+            for i in range(self.count):
+                bit = 1 << i
+                if held & bit and das[i] is not None and not self.pressed & bit and now >= nxt[i]:
+                    nxt[i] = now + self._arr[i]
+                    self.repeated |= bit
+                    self._push(REPEAT, i, now)
+        if tape is not None:
+            tape.record(self)
+        return held
+
+    def _edge(self, i, down, t):
+        bit = 1 << i
+        self._lock[i] = t + self.debounce
+        if down:
+            if self.held & bit:
+                return
+            self.held |= bit
+            self.pressed |= bit
+            self.repeated |= bit
+            if self._das[i] is not None:
+                self._next[i] = t + self._das[i]
+            self._push(PRESS, i, t)
+        else:
+            if not self.held & bit:
+                return
+            self.held &= ~bit
+            self.released |= bit
+            self._push(RELEASE, i, t)
+
+    def _push(self, kind, i, t):
+        events = self.events
+        if len(events) >= self.max_events:
+            events.pop(0)
+        events.append((kind, i, t))
+
+    def get(self):
+        """ Oldest queued (kind, index, time) event, or None """
+        if self.events:
+            return self.events.pop(0)
+        return None
+
+    def clear(self):
+        # forget queued events and this poll's edges (e.g. after a blocking screen)
+        self.events = []
+        self.pressed = self.released = self.repeated = 0
@@ -0,0 +1,342 @@
+# Drop-in replacement for adafruit_ssd1306.SSD1306_I2C that remembers which
+# 8-pixel pages / column ranges were drawn since the last show() and only
+# sends those bytes over I2C.
+#
+#   from dirty_display import DirtySSD1306_I2C
+#   display = DirtySSD1306_I2C(128, 64, i2c)
+#
+# Counters (since start or reset_stats()):
+#   display.frames        number of show() calls
+#   display.bytes_sent    I2C payload bytes actually sent
+#   display.bytes_full    bytes a plain SSD1306_I2C.show() would have sent
+#   display.last_sent     bytes sent by the last show()
+#   display.last_saved    bytes saved by the last show()
+#
+# Pass glyphs=GlyphCache() (glyph_cache.py) to draw text from RAM instead of
+# reading font5x8.bin from flash for every character.
+#
+# Under asyncio the flush can be split so other tasks run during the I2C
+# transfer: start display.flusher() as a task and call display.request_show()
+# instead of show(). The frame is copied out when its transfer starts and
+# sent one page row per await; drawing done meanwhile goes into the next
+# frame. display.seq / display.shown_seq count frames taken / fully sent.
+#
+# Pass capture=FrameCapture(path) (frame_capture.py) to append every frame
+# shown to a file, as a delta against the previous one.
+
+import adafruit_ssd1306
+
+SET_COL_ADDR = 0x21
+SET_PAGE_ADDR = 0x22
+
+# 6 commands (col start/end, page start/end), each sent as control byte + command
+WINDOW_CMD_BYTES = 12
+
+CLEAN = 0xFF  # "first dirty column" of a page with nothing to send
+
+
+class DirtySSD1306_I2C(adafruit_ssd1306.SSD1306_I2C):
+    """ SSD1306_I2C that only transmits the changed pages/columns on show() """
+
+    def __init__(self, width, height, i2c, *, glyphs=None, capture=None, **kwargs):
+        pages = height // 8
+        # Per page: first and last dirty column (lo > hi means clean)
+        self._lo = bytearray([CLEAN] * pages)
+        self._hi = bytearray(pages)
+        # Flush windows: (c0, c1, p0, p1) per entry, at most one per page
+        self._win = bytearray(4 * pages)
+        self._scratch = bytearray(width * pages + 1)
+        self._scratch[0] = 0x40  # Co=0, D/C=1
+        self._tracking = True
+        self._mv = None
+        self._tx = None         # async transfer snapshot, allocated on first use
+        self._sending = False
+        self._pending = False
+        self._wake = None
+        self.seq = 0
+        self.shown_seq = 0
+        self.glyphs = glyphs
+        self.capture = None     # set after the constructor's first show()
+        self.reset_stats()
+        # The base constructor clears and shows the whole screen once
+        super().__init__(width, height, i2c, **kwargs)
+        self._mv = memoryview(self.buffer)
+        self._smv = memoryview(self._scratch)
+        self._col_offset = (128 - width) // 2 if width != 128 else 0
+        self.capture = capture
+
+    # ---------- Statistics ----------
+    def reset_stats(self):
+        self.frames = 0
+        self.bytes_sent = 0
+        self.bytes_full = 0
+        self.last_sent = 0
+        self.last_saved = 0
+
+    @property
+    def full_frame_bytes(self):
+        # what a plain show() costs: addressing commands + data byte + framebuffer
+        return WINDOW_CMD_BYTES + len(self.buffer)
+
+    @property
+    def bytes_saved(self):
+        return self.bytes_full - self.bytes_sent
+
+    @property
+    def saved_per_frame(self):
+        if not self.frames:
+            return 0
+        return self.bytes_saved // self.frames
+
+    # ---------- Dirty tracking ----------
+    def mark(self, x, y, width, height):
+        """ Mark a rectangle as changed (for code that writes self.buf directly) """
+        x1 = x + width - 1
+        y1 = y + height - 1
+        if width < 1 or height < 1 or x1 < 0 or y1 < 0 or x >= self.width or y >= self.height:
+            return
+        if x < 0:
+            x = 0
+        if y < 0:
+            y = 0
+        if x1 >= self.width:
+            x1 = self.width - 1
+        if y1 >= self.height:
+            y1 = self.height - 1
+        lo = self._lo
+        hi = self._hi
+        for page in range(y >> 3, (y1 >> 3) + 1):
+            if x < lo[page]:
+                lo[page] = x
+            if x1 > hi[page]:
+                hi[page] = x1
+
+    def mark_all(self):
+        self.mark(0, 0, self.width, self.height)
+
+    def _clear_dirty(self):
+        lo = self._lo
+        hi = self._hi
+        for page in range(len(lo)):
+            lo[page] = CLEAN
+            hi[page] = 0
+
+    # ---------- Drawing (same API as adafruit_framebuf) ----------
+    def fill(self, color):
+        self.mark_all()
+        super().fill(color)
+
+    def rect(self, x, y, width, height, color, *, fill=False):
+        # fill_rect, hline, vline and the font renderer all end up here
+        if self._tracking:
+            self.mark(x, y, width, height)
+        super().rect(x, y, width, height, color, fill=fill)
+
+    def pixel(self, x, y, color=None):
+        if color is not None:
+            self.mark(x, y, 1, 1)
+        return super().pixel(x, y, color)
+
+    def text(self, string, x, y, color, *, font_name="font5x8.bin", size=1):
+        glyphs = self.glyphs
+        if glyphs is not None and size == 1 and font_name == glyphs.font_name and not self.rotation:
+            glyphs.draw(self, string, x, y, color)
+            return
+        # One box for the whole string instead of one mark per glyph pixel
+        lines = string.count("\n") + 1
+        self.mark(x, y, len(string) * 6 * size, lines * 8 * size)
+        self._tracking = False
+        try:
+            super().text(string, x, y, color, font_name=font_name, size=size)
+        finally:
+            self._tracking = True
+
+    def scroll(self, delta_x, delta_y):
+        self.mark_all()
+        super().scroll(delta_x, delta_y)
+
+    # ---------- Flush ----------
+    def _plan(self):
+        # Group dirty pages into windows. Neighbouring pages are merged into
+        # one window when the extra columns cost less than another set of
+        # addressing commands. Returns (number of windows, bytes to send).
+        lo = self._lo
+        hi = self._hi
+        count = 0
+        cost = 0
+        c0 = c1 = p0 = p1 = -1
+        for page in range(len(lo)):
+            if lo[page] > hi[page]:
+                continue
+            l = lo[page]
+            h = hi[page]
+            if p0 >= 0 and page == p1 + 1:
+                n0 = min(c0, l)
+                n1 = max(c1, h)
+                merged = (n1 - n0 + 1) * (page - p0 + 1)
+                apart = (c1 - c0 + 1) * (p1 - p0 + 1) + (h - l + 1) + WINDOW_CMD_BYTES + 1
+                if merged <= apart:
+                    c0, c1, p1 = n0, n1, page
+                    continue
+            if p0 >= 0:
+                cost += self._add_window(count, c0, c1, p0, p1)
+                count += 1
+            c0, c1, p0, p1 = l, h, page, page
+        if p0 >= 0:
+            cost += self._add_window(count, c0, c1, p0, p1)
+            count += 1
+        return count, cost
+
+    def _add_window(self, index, c0, c1, p0, p1):
+        win = self._win
+        i = index * 4
+        win[i] = c0
+        win[i + 1] = c1
+        win[i + 2] = p0
+        win[i + 3] = p1
+        return WINDOW_CMD_BYTES + 1 + (c1 - c0 + 1) * (p1 - p0 + 1)
+
+    def _send_window(self, c0, c1, p0, p1):
+        self.write_cmd(SET_COL_ADDR)
+        self.write_cmd(c0 + self._col_offset)
+        self.write_cmd(c1 + self._col_offset)
+        self.write_cmd(SET_PAGE_ADDR)
+        self.write_cmd(p0)
+        self.write_cmd(p1)
+        w = c1 - c0 + 1
+        if p0 == p1:
+            # The bytes are contiguous: borrow the byte in front of them for
+            # the data control byte instead of copying.
+            buf = self.buffer
+            start = p0 * self.width + c0
+            saved = buf[start]
+            buf[start] = 0x40
+            with self.i2c_device:
+                self.i2c_device.write(buf, start=start, end=start + w + 1)
+            buf[start] = saved
+        else:
+            n = 1
+            for page in range(p0, p1 + 1):
+                base = 1 + page * self.width + c0
+                self._smv[n:n + w] = self._mv[base:base + w]
+                n += w
+            with self.i2c_device:
+                self.i2c_device.write(self._scratch, end=n)
+
+    def show(self):
+        if self._sending:
+            # a frame is half-sent by show_async(): don't disturb it, send
+            # this one when it is done
+            self._pending = True
+            return
+        full = self.full_frame_bytes
+        if self._mv is None or self.page_addressing or self.rotation:
+            super().show()
+            sent = full
+            if self.capture is not None:
+                self.capture.frame(self.buffer, start=1)
+        else:
+            count, sent = self._plan()
+            if sent >= full:
+                super().show()
+                sent = full
+            else:
+                win = self._win
+                for i in range(0, count * 4, 4):
+                    self._send_window(win[i], win[i + 1], win[i + 2], win[i + 3])
+            if self.capture is not None:
+                self.capture.frame(self.buffer, self._lo, self._hi, start=1)
+        self._clear_dirty()
+        self._count(sent, full)
+        self.seq += 1
+        self.shown_seq = self.seq
+
+    def _count(self, sent, full):
+        self.frames += 1
+        self.bytes_sent += sent
+        self.bytes_full += full
+        self.last_sent = sent
+        self.last_saved = full - sent
+
+    # ---------- Async flush ----------
+    def _snapshot(self):
+        # Copy the dirty windows into _tx as one [0x40, row...] chunk per
+        # page row. Returns the windows as (c0, c1, p0, p1) bytes.
+        full = self.full_frame_bytes
+        count, sent = self._plan()
+        if sent >= full:
+            count = 1
+            self._add_window(0, 0, self.width - 1, 0, len(self._lo) - 1)
+        wins = bytes(self._win[:count * 4])
+        tx = self._tx
+        mv = self._mv
+        n = 0
+        for i in range(0, len(wins), 4):
+            c0, c1, p0, p1 = wins[i], wins[i + 1], wins[i + 2], wins[i + 3]
+            w = c1 - c0 + 1
+            for page in range(p0, p1 + 1):
+                tx[n] = 0x40
+                base = 1 + page * self.width + c0
+                tx[n + 1:n + 1 + w] = mv[base:base + w]
+                n += w + 1
+        if self.capture is not None:
+            self.capture.frame(self.buffer, self._lo, self._hi, start=1)
+        self._clear_dirty()
+        self._count(count * WINDOW_CMD_BYTES + n, full)
+        self.seq += 1
+        return wins
+
+    async def show_async(self):
+        """ show() that yields to other tasks after every page row it sends """
+        import asyncio
+        if self._sending:
+            self._pending = True  # goes out right after the frame in flight
+            return
+        if self._mv is None or self.page_addressing or self.rotation:
+            self.show()
+            return
+        if self._tx is None:
+            self._tx = bytearray(len(self._lo) * (self.width + 1))
+        self._sending = True
+        try:
+            while True:
+                seq = self.seq + 1
+                wins = self._snapshot()
+                n = 0
+                for i in range(0, len(wins), 4):
+                    c0, c1, p0, p1 = wins[i], wins[i + 1], wins[i + 2], wins[i + 3]
+                    for cmd in (SET_COL_ADDR, c0 + self._col_offset, c1 + self._col_offset,
+                                SET_PAGE_ADDR, p0, p1):
+                        self.write_cmd(cmd)
+                    w = c1 - c0 + 1
+                    for _ in range(p0, p1 + 1):
+                        # the column/page pointer carries on between transactions
+                        with self.i2c_device:
+                            self.i2c_device.write(self._tx, start=n, end=n + w + 1)
+                        n += w + 1
+                        await asyncio.sleep(0)
+                self.shown_seq = seq
+                if not self._pending:
+                    break
+                self._pending = False
+        finally:
+            self._sending = False
+
+    def request_show(self):
+        """ Have the flusher() task send the frame; plain show() without one """
+        if self._wake is None:
+            self.show()
+        else:
+            self._wake.set()
+
+    async def flusher(self):
+        """ Task sending the frames asked for with request_show(), newest only """
+        import asyncio
+        self._wake = asyncio.Event()
+        try:
+            while True:
+                await self._wake.wait()
+                self._wake.clear()
+                await self.show_async()
+        finally:
+            self._wake = None
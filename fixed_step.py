@@ -0,0 +1,126 @@
+# Fixed-timestep pacing for the game loops.
+#
+# Game logic runs at a fixed rate whatever display.show() costs: when a frame
+# overruns, the next call runs several logic ticks to catch up, and while the
+# loop is still behind schedule the show() is skipped (the dirty display then
+# sends the union of the skipped frames once).
+#
+#   pacer = FixedStep(0.1)
+#   while True:
+#       for i in range(pacer.ticks()):   # sleeps until a tick is due
+#           step()                       # input + logic + drawing
+#       if pacer.render_due():
+#           display.show()
+#
+# Logic that keeps its own timers can use pacer.start + i * pacer.period as
+# the time of tick i, so caught-up ticks don't all see the same clock.
+# pacer.report() summarizes tick lateness (jitter), frames and skips.
+# FixedStep(..., heap=HeapStats()) also samples the heap once per frame
+# (see heapstats.py), and gc_policy=GCPolicy() gets to collect in the sleep
+# before a tick (see gc_policy.py). FixedStep(..., fast=True) never sleeps
+# and never skips: each ticks() runs one tick on the exact schedule, for
+# replays and benchmarks that should go as fast as the CPU allows.
+
+import time
+
+
+class FixedStep:
+    """ Fixed logic tick rate with catch-up and frame skipping """
+
+    def __init__(self, period, max_catchup=4, max_skip=3, heap=None, gc_policy=None, fast=False):
+        self.period = period
+        self.fast = fast                # no waiting: one tick per call (replays)
+        self.heap = heap                # HeapStats or None
+        self.gc_policy = gc_policy      # GCPolicy or None
+        self.period_ns = int(period * 1000000000)
+        self.max_catchup = max_catchup  # logic ticks per call at most
+        self.max_skip = max_skip        # shows skipped in a row at most
+        self.reset()
+
+    def reset(self):
+        """ Restart the schedule from now (after a pause or a new game) """
+        self.next_ns = time.monotonic_ns()
+        self.start = self.next_ns / 1000000000  # (s) first tick of the last ticks()
+        self._skips = 0
+        self._caught_up = False
+        self._last_frame = None
+        self.calls = 0
+        self.ticks_run = 0
+        self.catchups = 0       # calls that ran more than one tick
+        self.dropped = 0        # ticks given up when too far behind
+        self.frames = 0
+        self.skipped = 0
+        self.late_max = 0       # ns, worst lateness of a tick start
+        self.late_sum = 0
+        self.frame_min = None   # ns between shown frames
+        self.frame_max = 0
+
+    def ticks(self):
+        """ Sleep until the next tick is due; returns how many ticks to run """
+        if self.heap is not None:
+            self.heap.frame()
+        if self.fast:
+            if self.gc_policy is not None:
+                self.gc_policy.frame(0.0)  # only the floor
+            self.start = self.next_ns / 1000000000
+            self.next_ns += self.period_ns
+            self.calls += 1
+            self.ticks_run += 1
+            return 1
+        wait = self.next_ns - time.monotonic_ns()
+        if self.gc_policy is not None and self.gc_policy.frame(wait / 1000000000):
+            wait = self.next_ns - time.monotonic_ns()
+        if wait > 0:
+            time.sleep(wait / 1000000000)
+        now = time.monotonic_ns()
+        late = now - self.next_ns
+        if late < 0:
+            late = 0  # woke a little early (sleep granularity): run the tick now
+        n = late // self.period_ns + 1
+        self._caught_up = n > 1
+        if n > 1:
+            self.catchups += 1
+        if n > self.max_catchup:
+            # too far behind: run what we may and start over from now
+            self.dropped += n - self.max_catchup
+            n = self.max_catchup
+            self.next_ns = now - (n - 1) * self.period_ns
+        self.start = self.next_ns / 1000000000
+        self.next_ns += n * self.period_ns
+        self.calls += 1
+        self.ticks_run += n
+        if late > self.late_max:
+            self.late_max = late
+        self.late_sum += late
+        return n
+
+    def render_due(self):
+        """ False if this frame should be skipped to catch up """
+        if self.heap is not None:
+            self.heap.mark("logic")
+        if self.fast:
+            self.frames += 1
+            return True
+        now = time.monotonic_ns()
+        # the last frame overran (ticks had to catch up) or we still are late
+        if (self._caught_up or now > self.next_ns) and self._skips < self.max_skip:
+            self._skips += 1
+            self.skipped += 1
+            return False
+        self._skips = 0
+        self.frames += 1
+        if self._last_frame is not None:
+            interval = now - self._last_frame
+            if self.frame_min is None or interval < self.frame_min:
+                self.frame_min = interval
+            if interval > self.frame_max:
+                self.frame_max = interval
+        self._last_frame = now
+        return True
+
+    def report(self):
+        calls = max(self.calls, 1)
+        return "ticks %d @%.0fms (late avg %.2fms max %.2fms, catch-up %d, dropped %d), frames %d skipped %d (interval %.1f-%.1fms)" % (
+            self.ticks_run, self.period * 1000, self.late_sum / calls / 1e6, self.late_max / 1e6,
+            self.catchups, self.dropped, self.frames, self.skipped,
+            (self.frame_min or 0) / 1e6, self.frame_max / 1e6)
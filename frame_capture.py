@@ -0,0 +1,163 @@
+# Frame capture: every frame the display shows, appended to a file as its
+# XOR with the previous frame, run-length encoded.
+#
+#   capture = FrameCapture.from_settings()   # FRAME_CAPTURE = "/frames.bin", else None
+#   display = DirtySSD1306_I2C(128, 64, i2c, capture=capture)
+#   capture.flush()                          # at game over: the frames so far are on flash
+#
+# DirtySSD1306_I2C calls frame() at every show() (and for every frame the
+# async flusher takes) with the dirty column range of each page: only those
+# bytes can differ from the last frame, so a moving ball costs a few dozen
+# byte compares, not 1024, and the record is a few bytes.
+#
+# On the host, python -m host.frames turns a capture into PBM/PNG images or
+# an animated GIF and compares two captures frame by frame (a run against a
+# golden one; a recorder.py replay makes runs repeatable).
+#
+# File: b"FRM1", width (1 byte), pages (1 byte), then per frame the ms since
+# the previous frame (2 bytes, little endian, at most 65535) and tokens
+# until the frame is complete:
+#   0x00        the rest of the frame is unchanged
+#   0x01-0x7F   skip that many unchanged bytes
+#   0x80-0xBF   (t & 0x3F) + 1 XOR bytes follow
+#   0xC0-0xFF   the next XOR byte, (t & 0x3F) + 2 times
+# Bytes are in the SSD1306's order: page by page, one column of 8 pixels
+# per byte (bit 0 at the top). An unchanged frame is 3 bytes.
+#
+# The board can only write files if boot.py remounts the drive for the
+# program (storage.remount("/", readonly=False)); otherwise capture is
+# turned off with a message.
+
+import array
+import time
+
+MAGIC = b"FRM1"
+
+instances = []  # for the host runner: files are closed when a run ends
+
+
+class FrameCapture:
+    """ Shown frames as run-length encoded XOR deltas, appended to a file """
+
+    def __init__(self, path, width=128, height=64, *, flush_every=32):
+        size = width * (height // 8)
+        self.path = path
+        self.width = width
+        self.size = size
+        self.flush_every = flush_every  # frames between file flushes
+        self.frames = 0
+        self.bytes = 0                  # written, header included
+        self._prev = bytearray(size)    # the screen starts cleared
+        self._idx = array.array("H", bytes(2 * size))  # changed bytes of this frame
+        self._val = bytearray(size)
+        self._out = bytearray(size * 3 // 2 + 4)  # worst case: every other byte changed
+        self._last = time.monotonic()
+        try:
+            self._file = open(path, "wb")
+            self._file.write(MAGIC + bytes((width, height // 8)))
+            self.bytes = len(MAGIC) + 2
+        except OSError as e:
+            print("frame_capture: can't write %s (%s), not capturing" % (path, e))
+            self._file = None
+        instances.append(self)
+
+    @staticmethod
+    def from_settings(width=128, height=64):
+        """ A FrameCapture if FRAME_CAPTURE (a file name) is set, else None """
+        try:
+            import os
+            path = os.getenv("FRAME_CAPTURE")
+        except AttributeError:  # no os.getenv before CircuitPython 8
+            return None
+        return FrameCapture(path, width, height) if path else None
+
+    def frame(self, buffer, lo=None, hi=None, start=0):
+        """ Append the frame in buffer[start:] (lo/hi: first/last dirty column per page) """
+        if self._file is None:
+            return
+        prev = self._prev
+        idx = self._idx
+        val = self._val
+        width = self.width
+        m = 0
+        for p in range(self.size // width):
+            a = p * width
+            if lo is None:
+                b = a + width - 1
+            elif lo[p] > hi[p]:
+                continue  # clean page
+            else:
+                b = a + hi[p]
+                a += lo[p]
+            for i in range(a, b + 1):
+                v = buffer[start + i]
+                d = v ^ prev[i]
+                if d:
+                    prev[i] = v
+                    idx[m] = i
+                    val[m] = d
+                    m += 1
+        now = time.monotonic()
+        ms = int((now - self._last) * 1000)
+        self._last = now
+        n = self._encode(m, ms if ms < 0xFFFF else 0xFFFF)
+        self._file.write(memoryview(self._out)[:n])
+        self.bytes += n
+        self.frames += 1
+        if self.frames % self.flush_every == 0:
+            self._file.flush()
+
+    def _encode(self, m, ms):
+        out = self._out
+        idx = self._idx
+        val = self._val
+        out[0] = ms & 0xFF
+        out[1] = ms >> 8
+        n = 2
+        pos = 0
+        i = 0
+        while i < m:
+            k = idx[i]
+            gap = k - pos
+            while gap > 0x7F:
+                out[n] = 0x7F
+                n += 1
+                gap -= 0x7F
+            if gap:
+                out[n] = gap
+                n += 1
+            v = val[i]
+            j = i + 1
+            while j < m and j - i < 65 and idx[j] == k + j - i and val[j] == v:
+                j += 1
+            if j - i >= 2:
+                out[n] = 0xC0 | (j - i - 2)
+                out[n + 1] = v
+                n += 2
+            else:
+                # literal, up to a gap or the start of a repeat
+                while (j < m and j - i < 64 and idx[j] == k + j - i
+                       and not (j + 1 < m and idx[j + 1] == idx[j] + 1 and val[j + 1] == val[j])):
+                    j += 1
+                out[n] = 0x80 | (j - i - 1)
+                n += 1
+                for t in range(i, j):
+                    out[n] = val[t]
+                    n += 1
+            pos = k + j - i
+            i = j
+        out[n] = 0
+        return n + 1
+
+    def flush(self):
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def report(self):
+        return "frames %s: %d frames, %d bytes (%.1f per frame)" % (
+            self.path, self.frames, self.bytes, (self.bytes - 6) / self.frames if self.frames else 0)
@@ -0,0 +1,135 @@
+# Garbage collection at quiet moments instead of in the middle of a frame.
+#
+# Left alone, the CircuitPython collector runs whenever an allocation finds
+# the heap full: in the middle of a rally or a DAS repeat, as a visible
+# hitch. GCPolicy collects where a pause can't be seen, early enough that
+# the heap rarely fills during play:
+#
+#   policy = GCPolicy()
+#   policy.play()                  # game starts (gc.threshold() if one is given)
+#   policy.idle()                  # a natural pause: piece locked, point
+#                                  # scored, game over, waiting for input
+#   pacer = FixedStep(TICK, gc_policy=policy)  # also checks once per frame
+#   print(policy.report())
+#
+# idle() only collects if at least idle_above bytes were allocated since the
+# last collection and min_gap seconds have passed, so it can be called on
+# every quiet tick. At every frame FixedStep calls frame(spare) with the time
+# it is about to sleep: below the free-heap floor it collects no matter what,
+# otherwise it collects in the sleep if the longest pause so far fits in it.
+# Automatic collection stays on: with GC disabled a full heap raises
+# MemoryError instead of collecting, and the floor is only checked once per
+# frame. Collections the VM still does on its own (a frame that allocated
+# past the floor) are noticed as mem_alloc() dropping and reported as
+# "in frames".
+#
+# The host has no gc.mem_free(): the floor and idle_above are not checked
+# there and idle() collects at most every min_gap seconds.
+
+import gc
+import time
+
+try:
+    from time import perf_counter as _clock  # host: time.monotonic is the virtual clock
+except ImportError:
+    from time import monotonic as _clock
+
+try:
+    mem_alloc = gc.mem_alloc
+    mem_free = gc.mem_free
+except AttributeError:  # host
+    mem_alloc = mem_free = None
+
+
+class GCPolicy:
+    """ Collect at idle points, with a free-heap floor """
+
+    def __init__(self, *, floor=16384, idle_above=4096, min_gap=0.5, threshold=None):
+        self.floor = floor              # bytes free below which a frame collects anyway
+        self.idle_above = idle_above    # bytes allocated before an idle point collects
+        self.min_gap = min_gap          # s between idle collections at least
+        self.threshold = threshold      # None: collect only when the heap is full, else gc.threshold(bytes)
+        self.idle_count = 0             # collections moved to idle points
+        self.spare_count = 0            # ... into a frame's sleep
+        self.floor_count = 0            # forced by the floor
+        self.auto_count = 0             # done by the VM in the middle of a frame
+        self.pause_max = 0.0            # s, longest collection
+        self.pause_sum = 0.0
+        self.free_min = None
+        self._last_time = time.monotonic()
+        self._after = 0                 # mem_alloc() right after our last collection
+        self._used = 0                  # mem_alloc() at the last check
+        self._collect()                 # start clean, and a first pause estimate
+        self.pause_sum = 0.0
+
+    def play(self):
+        """ Active play: the VM collects only when the heap is full (or past the threshold) """
+        if self.threshold is not None and hasattr(gc, "threshold"):
+            gc.threshold(self.threshold)
+        gc.enable()
+
+    def stop(self):
+        """ Back to the VM's own collections """
+        if self.threshold is not None and hasattr(gc, "threshold"):
+            gc.threshold(-1)
+        gc.enable()
+
+    def _collect(self):
+        start = _clock()
+        gc.collect()
+        pause = _clock() - start
+        self.pause_sum += pause
+        if pause > self.pause_max:
+            self.pause_max = pause
+        self._last_time = time.monotonic()
+        if mem_alloc is not None:
+            self._after = self._used = mem_alloc()
+
+    def _check(self):
+        # free heap now; counts collections the VM did by itself
+        used = mem_alloc()
+        if used < self._used:
+            self.auto_count += 1
+            self._after = used
+        self._used = used
+        free = mem_free()
+        if self.free_min is None or free < self.free_min:
+            self.free_min = free
+        return free
+
+    def idle(self):
+        """ A natural pause in the game: collect if it's worth it; True if it did """
+        if time.monotonic() - self._last_time < self.min_gap:
+            return False
+        if mem_alloc is not None:
+            self._check()
+            if self._used - self._after < self.idle_above:
+                return False
+        self._collect()
+        self.idle_count += 1
+        return True
+
+    def frame(self, spare=0.0):
+        """ Frame boundary with spare seconds before the next tick; True if it collected """
+        if mem_alloc is None:
+            return False
+        free = self._check()
+        if free < self.floor:
+            self._collect()
+            self.floor_count += 1
+            return True
+        if spare > self.pause_max and self._used - self._after >= self.idle_above:
+            self._collect()
+            self.spare_count += 1
+            return True
+        return False
+
+    def report(self):
+        n = self.idle_count + self.spare_count + self.floor_count
+        text = "gc: %d moved out of frames (%d at idle points, %d in spare time), %d forced by the floor, %d in frames; pause avg %.1fms max %.1fms" % (
+            self.idle_count + self.spare_count, self.idle_count, self.spare_count,
+            self.floor_count, self.auto_count,
+            self.pause_sum / n * 1000 if n else 0, self.pause_max * 1000)
+        if self.free_min is not None:
+            text += ", free min %dB" % self.free_min
+        return text
@@ -0,0 +1,106 @@
+# RAM-resident font and rendered-string cache for display.text().
+#
+# adafruit_framebuf reads font5x8.bin from flash one column at a time for
+# every character drawn. GlyphCache reads the font once into a bytearray and
+# keeps recently drawn strings ("P1: 3", "S:1200", "0".."8") as ready-made
+# column bytes that are ORed (or cleared) straight into the SSD1306 buffer.
+#
+#   glyphs = GlyphCache()
+#   glyphs.preload("012345678")
+#   glyphs.draw(display, "P1: 3", 5, 5, 1)    # same pixels as display.text()
+#
+# DirtySSD1306_I2C(..., glyphs=glyphs) routes its text() through the cache.
+
+CHAR_W = 6  # 5 columns of glyph + 1 column of spacing, as adafruit_framebuf
+
+
+class GlyphCache:
+    """ Font held in RAM plus an LRU of rendered strings """
+
+    def __init__(self, font_name="font5x8.bin", max_strings=24):
+        self.font_name = font_name
+        with open(font_name, "rb") as f:
+            header = f.read(2)
+            self.font_width = header[0]
+            self.font_height = header[1]
+            if self.font_width != 5 or self.font_height != 8:
+                raise RuntimeError("Only 5x8 fonts are supported: " + font_name)
+            self.font = bytearray(f.read(256 * self.font_width))
+        self.max_strings = max_strings  # 0: font in RAM only, strings rendered every time
+        self._strings = {}
+        self._order = []  # least recently used first
+        self.hits = 0
+        self.misses = 0
+
+    def preload(self, strings):
+        # Render up front, e.g. preload("012345678") or preload(("P1: 0", "P2: 0"))
+        for s in strings:
+            self.columns(s)
+
+    def columns(self, string):
+        """ Column bytes of a single-line string (cached) """
+        cols = self._strings.get(string)
+        order = self._order
+        if cols is not None:
+            self.hits += 1
+            if order[-1] != string:
+                order.remove(string)
+                order.append(string)
+            return cols
+        self.misses += 1
+        cols = bytearray(len(string) * CHAR_W)
+        font = self.font
+        for i in range(len(string)):
+            base = ord(string[i]) * 5
+            if base + 5 <= len(font):
+                cols[i * CHAR_W:i * CHAR_W + 5] = font[base:base + 5]
+        if self.max_strings < 1:
+            return cols
+        if len(order) >= self.max_strings:
+            del self._strings[order.pop(0)]
+        self._strings[string] = cols
+        order.append(string)
+        return cols
+
+    def draw(self, display, string, x, y, color):
+        """ Same pixels as display.text(string, x, y, color) with the 5x8 font """
+        if "\n" in string:
+            for line in string.split("\n"):
+                self.draw(display, line, x, y, color)
+                y += 8
+            return
+        width = display.width
+        height = display.height
+        if y >= height or y <= -8 or not string:
+            return
+        cols = self.columns(string)
+        start = -x if x < 0 else 0
+        end = len(cols)
+        if x + end > width:
+            end = width - x
+        if start >= end:
+            return
+        mark = getattr(display, "mark", None)
+        if mark is not None:
+            mark(x, y, len(cols), 8)
+        buf = display.buf
+        upper = y >= 0                    # top page is on screen
+        shift = y & 7
+        top = (y >> 3) * width + x        # byte index of column 0 in the upper page
+        bottom = top + width              # ... and in the page below
+        pages_end = (height >> 3) * width
+        for i in range(start, end):
+            c = cols[i]
+            if not c:
+                continue
+            v = c << shift
+            if upper:
+                if color:
+                    buf[top + i] |= v & 0xFF
+                else:
+                    buf[top + i] &= ~v & 0xFF
+            if shift and bottom + i < pages_end:
+                if color:
+                    buf[bottom + i] |= v >> 8
+                else:
+                    buf[bottom + i] &= ~(v >> 8) & 0xFF
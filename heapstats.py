@@ -0,0 +1,172 @@
+# Heap and allocation counters for the game loops.
+#
+# On CircuitPython the heap only shrinks when the collector runs, so the
+# rise of gc.mem_alloc() between two samples is exactly what was allocated
+# in between. HeapStats samples it at every frame (FixedStep(..., heap=heap)
+# calls frame() at the start of ticks() and mark("logic") in render_due()),
+# so the report splits each frame into "logic" (input, game logic, drawing)
+# and "show" (everything after render_due(): show() and the wait). A sample
+# where mem_alloc went down had a collection in it: it is counted as one and
+# its bytes are unknown. Games can add mark(name) calls for finer sections.
+#
+# On the host (no gc.mem_alloc) the same numbers come from tracemalloc: the
+# peak traced memory since the previous sample. CPython boxes ints and floats
+# that the board keeps unboxed, so the host never reads zero; what it adds
+# is call sites: after leak_after frames a snapshot is taken, and report()
+# gives the heap growth since then and lists the lines in the game's
+# directory whose memory has grown (leaks over a long soak).
+#
+#   heap = HeapStats.from_settings()    # HEAP_STATS = 1 in settings.toml, else None
+#   pacer = FixedStep(TICK, heap=heap)
+#   if heap is not None:
+#       print(heap.report())
+
+import gc
+
+try:
+    mem_alloc = gc.mem_alloc
+    mem_free = gc.mem_free
+    tracemalloc = None
+except AttributeError:  # host
+    mem_alloc = mem_free = None
+    import tracemalloc
+
+instances = []  # for the host runner's summary
+
+
+class HeapStats:
+    """ Bytes allocated per frame and per section, collections, heap growth """
+
+    def __init__(self, *, leak_after=100, top=5):
+        self.leak_after = leak_after    # host: frames before the leak reference snapshot
+        self.top = top                  # host: lines listed in the leak report
+        self.frames = 0
+        self.measured = 0               # frames without a collection in them
+        self.alloc_sum = 0
+        self.alloc_max = 0
+        self.alloc_frames = 0           # frames that allocated anything
+        self.collections = 0
+        self.sections = {}              # name -> [bytes, frames it allocated in]
+        self.live_first = None
+        self.live = 0                   # bytes in use (device: right after a collection)
+        self.free_min = None
+        self._frame = 0                 # bytes this frame so far, -1: a collection ran
+        self._snapshot = None
+        if tracemalloc is not None and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self._last = 0
+        self._restart()
+        instances.append(self)
+
+    @staticmethod
+    def from_settings():
+        """ A HeapStats if HEAP_STATS is set in settings.toml (or the environment), else None """
+        try:
+            import os
+            on = int(os.getenv("HEAP_STATS", 0))
+        except AttributeError:  # no os.getenv before CircuitPython 8
+            on = 0
+        return HeapStats() if on else None
+
+    # ---------- Sampling ----------
+    def _restart(self):
+        if tracemalloc is None:
+            self._last = mem_alloc()
+        else:
+            tracemalloc.reset_peak()
+            self._last = tracemalloc.get_traced_memory()[0]
+
+    def _since(self):
+        # bytes allocated since _restart(), or -1 if a collection ran
+        if tracemalloc is None:
+            used = mem_alloc()
+            if used < self._last:
+                self.collections += 1
+                self.live = used
+                return -1
+            return used - self._last
+        return tracemalloc.get_traced_memory()[1] - self._last
+
+    def mark(self, name):
+        """ Bytes allocated since the previous mark or frame go to section name """
+        n = self._since()
+        if n < 0:
+            self._frame = -1
+        else:
+            if self._frame >= 0:
+                self._frame += n
+            if n:
+                sec = self.sections.get(name)
+                if sec is None:
+                    self.sections[name] = [n, 1]
+                else:
+                    sec[0] += n
+                    sec[1] += 1
+        self._restart()
+
+    def frame(self, name="show"):
+        """ Close the frame: the rest of it goes to section name """
+        self.mark(name)
+        self.frames += 1
+        n = self._frame
+        self._frame = 0
+        if n >= 0:
+            self.measured += 1
+            self.alloc_sum += n
+            if n > self.alloc_max:
+                self.alloc_max = n
+            if n:
+                self.alloc_frames += 1
+        if tracemalloc is None:
+            free = mem_free()
+            if self.free_min is None or free < self.free_min:
+                self.free_min = free
+            if self.live_first is None and self.live:
+                self.live_first = self.live  # after the first collection
+        else:
+            self.live = tracemalloc.get_traced_memory()[0]
+            if self.frames == self.leak_after:
+                self._snapshot = self._take()
+                self.live_first = self.live  # growth counts from here, after the warm-up
+        self._restart()
+
+    # ---------- Report ----------
+    def _take(self):
+        # only the game's directory (the host runs games from there): not the
+        # interpreter's own caches
+        import os
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(True, os.path.join(os.getcwd(), "*")),
+            tracemalloc.Filter(False, __file__),
+        ))
+
+    def leaks(self):
+        """ Host: [(file:line, bytes grown, blocks grown)] since the reference snapshot """
+        if self._snapshot is None:
+            return []
+        out = []
+        for stat in self._take().compare_to(self._snapshot, "lineno"):
+            if stat.size_diff <= 0:
+                continue
+            frame = stat.traceback[0]
+            out.append(("%s:%d" % (frame.filename.split("/")[-1], frame.lineno),
+                        stat.size_diff, stat.count_diff))
+            if len(out) >= self.top:
+                break
+        return out
+
+    def report(self):
+        measured = max(self.measured, 1)
+        frames = max(self.frames, 1)
+        text = "heap: %d frames, alloc avg %.1fB max %dB per frame, %d frames allocated, %d collections" % (
+            self.frames, self.alloc_sum / measured, self.alloc_max, self.alloc_frames, self.collections)
+        if self.sections:
+            text += "; " + ", ".join("%s %.1fB" % (name, sec[0] / frames)
+                                     for name, sec in sorted(self.sections.items()))
+        if self.live_first is not None:
+            text += "; live %dB (%+dB)" % (self.live, self.live - self.live_first)
+        if self.free_min is not None:
+            text += ", free min %dB" % self.free_min
+        for site, size, count in self.leaks():
+            text += "\n  grew: %s %+dB in %+d blocks" % (site, size, count)
+        return text
@@ -0,0 +1,15 @@
+# Host-side stand-ins for the badge hardware, so the games can run, be
+# profiled and be regression-tested on a normal machine:
+#
+#   python -m host pingpong_optimized.py --seconds 30
+#
+# Stand-ins: board, busio (I2C with byte/transaction counters and an
+# SSD1306 panel model), digitalio (scriptable buttons), adafruit_ssd1306 /
+# adafruit_framebuf (bit-exact MVLSB framebuffer), audiocore, audiopwmio,
+# audiomixer (mixes in Python, optionally to a WAV file).
+# time.sleep/time.monotonic and asyncio run on a virtual clock.
+#
+# Text needs font5x8.bin next to the game script, as on the board.
+
+from host.runner import install, run, uninstall
+from host.vclock import StopRun
@@ -0,0 +1,50 @@
+# python -m host GAME.py [--seconds N | --ticks N] [--press GP7:1.0:0.5 ...]
+
+import argparse
+
+from host.runner import run
+
+
+def parse_press(text):
+    # PIN:START[:DURATION]
+    parts = text.split(":")
+    if len(parts) not in (2, 3):
+        raise argparse.ArgumentTypeError("expected PIN:START[:DURATION], got %r" % text)
+    duration = float(parts[2]) if len(parts) == 3 else 0.1
+    return parts[0], float(parts[1]), duration
+
+
+def write_pbm(path, panel):
+    width = panel.width
+    height = panel.pages * 8
+    with open(path, "w") as f:
+        f.write("P1\n%d %d\n" % (width, height))
+        for y in range(height):
+            f.write(" ".join(str(panel.pixel(x, y)) for x in range(width)))
+            f.write("\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m host", description="Run a game on the virtual board")
+    parser.add_argument("script")
+    parser.add_argument("--seconds", type=float, help="virtual seconds to run")
+    parser.add_argument("--ticks", type=int, help="number of sleeps to run")
+    parser.add_argument("--seed", type=int, default=0, help="random.seed() before the game starts")
+    parser.add_argument("--press", type=parse_press, action="append", default=[],
+                        metavar="PIN:START[:DURATION]", help="hold a button (repeatable)")
+    parser.add_argument("--verbose", action="store_true", help="show the game's print() output")
+    parser.add_argument("--pbm", metavar="FILE", help="save the last panel image as PBM")
+    parser.add_argument("--wav", metavar="FILE", help="save the audiomixer output as WAV")
+    args = parser.parse_args()
+    if args.seconds is None and args.ticks is None:
+        args.seconds = 10.0
+
+    result = run(args.script, seconds=args.seconds, ticks=args.ticks, seed=args.seed,
+                 presses=args.press, quiet=not args.verbose, wav=args.wav)
+    print(result.summary())
+    if args.pbm and result.panel is not None:
+        write_pbm(args.pbm, result.panel)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+# Host stand-in for adafruit_framebuf, MVLSB (SSD1306) format only.
+#
+# Drawing results are bit-identical to the library; method dispatch is kept
+# the same (fill_rect/hline/vline go through rect(), glyphs through
+# fill_rect()) so driver subclasses behave as they do on the board.
+# `calls` counts top-level drawing calls made by the game (through whatever
+# subclass is in use), not the nested ones a method makes internally.
+
+import os
+import struct
+
+MVLSB = 0
+MHMSB = 3
+
+COUNTED = ("fill", "fill_rect", "rect", "hline", "vline", "pixel", "line", "circle", "text", "scroll")
+
+
+class MVLSBFormat:
+    @staticmethod
+    def set_pixel(framebuf, x, y, color):
+        index = (y >> 3) * framebuf.stride + x
+        offset = y & 0x07
+        framebuf.buf[index] = (framebuf.buf[index] & ~(0x01 << offset)) | ((color != 0) << offset)
+
+    @staticmethod
+    def get_pixel(framebuf, x, y):
+        index = (y >> 3) * framebuf.stride + x
+        return (framebuf.buf[index] >> (y & 0x07)) & 0x01
+
+    @staticmethod
+    def fill(framebuf, color):
+        fill = 0xFF if color else 0x00
+        framebuf.buf[:] = bytes((fill,)) * len(framebuf.buf)
+
+    @staticmethod
+    def fill_rect(framebuf, x, y, width, height, color):
+        # Same result as the library's row-by-row loop, one page at a time
+        buf = framebuf.buf
+        stride = framebuf.stride
+        y_end = y + height
+        while y < y_end:
+            page = y >> 3
+            bottom = min(y_end, (page + 1) << 3)
+            mask = ((1 << (bottom - y)) - 1) << (y & 0x07)
+            index = page * stride + x
+            if color:
+                for i in range(index, index + width):
+                    buf[i] |= mask
+            else:
+                keep = ~mask & 0xFF
+                for i in range(index, index + width):
+                    buf[i] &= keep
+            y = bottom
+
+
+class FrameBuffer:
+    def __init__(self, buf, width, height, buf_format=MVLSB, stride=None):
+        if buf_format != MVLSB:
+            raise ValueError("invalid format")
+        self.buf = buf
+        self.width = width
+        self.height = height
+        self.stride = width if stride is None else stride
+        self.format = MVLSBFormat()
+        self._font = None
+        self._rotation = 0
+        self.calls = {}
+        self._depth = 0
+        self._count_calls()
+
+    # ---------- Call accounting ----------
+    def _count_calls(self):
+        # Shadow the drawing methods (as resolved on the final class, so
+        # driver overrides are counted too) with counting wrappers
+        for name in COUNTED:
+            setattr(self, name, self._counter(name, getattr(self, name)))
+
+    def _counter(self, name, method):
+        calls = self.calls
+
+        def counted(*args, **kwargs):
+            if self._depth:
+                return method(*args, **kwargs)
+            calls[name] = calls.get(name, 0) + 1
+            self._depth += 1
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self._depth -= 1
+        return counted
+
+    # ---------- Library API ----------
+    @property
+    def rotation(self):
+        return self._rotation
+
+    @rotation.setter
+    def rotation(self, val):
+        if val not in {0, 1, 2, 3}:
+            raise RuntimeError("Bad rotation setting")
+        self._rotation = val
+
+    def fill(self, color):
+        self.format.fill(self, color)
+
+    def fill_rect(self, x, y, width, height, color):
+        self.rect(x, y, width, height, color, fill=True)
+
+    def pixel(self, x, y, color=None):
+        if self.rotation == 1:
+            x, y = y, x
+            x = self.width - x - 1
+        if self.rotation == 2:
+            x = self.width - x - 1
+            y = self.height - y - 1
+        if self.rotation == 3:
+            x, y = y, x
+            y = self.height - y - 1
+        if x < 0 or x >= self.width or y < 0 or y >= self.height:
+            return None
+        if color is None:
+            return self.format.get_pixel(self, x, y)
+        self.format.set_pixel(self, x, y, color)
+        return None
+
+    def hline(self, x, y, width, color):
+        self.rect(x, y, width, 1, color, fill=True)
+
+    def vline(self, x, y, height, color):
+        self.rect(x, y, 1, height, color, fill=True)
+
+    def circle(self, center_x, center_y, radius, color):
+        x = radius - 1
+        y = 0
+        d_x = 1
+        d_y = 1
+        err = d_x - (radius << 1)
+        while x >= y:
+            self.pixel(center_x + x, center_y + y, color)
+            self.pixel(center_x + y, center_y + x, color)
+            self.pixel(center_x - y, center_y + x, color)
+            self.pixel(center_x - x, center_y + y, color)
+            self.pixel(center_x - x, center_y - y, color)
+            self.pixel(center_x - y, center_y - x, color)
+            self.pixel(center_x + y, center_y - x, color)
+            self.pixel(center_x + x, center_y - y, color)
+            if err <= 0:
+                y += 1
+                err += d_y
+                d_y += 2
+            if err > 0:
+                x -= 1
+                d_x += 2
+                err += d_x - (radius << 1)
+
+    def rect(self, x, y, width, height, color, *, fill=False):
+        if self.rotation == 1:
+            x, y = y, x
+            width, height = height, width
+            x = self.width - x - width
+        if self.rotation == 2:
+            x = self.width - x - width
+            y = self.height - y - height
+        if self.rotation == 3:
+            x, y = y, x
+            width, height = height, width
+            y = self.height - y - height
+        if (width < 1 or height < 1 or (x + width) <= 0 or (y + height) <= 0
+                or y >= self.height or x >= self.width):
+            return
+        x_end = min(self.width - 1, x + width - 1)
+        y_end = min(self.height - 1, y + height - 1)
+        x = max(x, 0)
+        y = max(y, 0)
+        if fill:
+            self.format.fill_rect(self, x, y, x_end - x + 1, y_end - y + 1, color)
+        else:
+            self.format.fill_rect(self, x, y, x_end - x + 1, 1, color)
+            self.format.fill_rect(self, x, y, 1, y_end - y + 1, color)
+            self.format.fill_rect(self, x, y_end, x_end - x + 1, 1, color)
+            self.format.fill_rect(self, x_end, y, 1, y_end - y + 1, color)
+
+    def line(self, x_0, y_0, x_1, y_1, color):
+        d_x = abs(x_1 - x_0)
+        d_y = abs(y_1 - y_0)
+        x, y = x_0, y_0
+        s_x = -1 if x_0 > x_1 else 1
+        s_y = -1 if y_0 > y_1 else 1
+        if d_x > d_y:
+            err = d_x / 2.0
+            while x != x_1:
+                self.pixel(x, y, color)
+                err -= d_y
+                if err < 0:
+                    y += s_y
+                    err += d_x
+                x += s_x
+        else:
+            err = d_y / 2.0
+            while y != y_1:
+                self.pixel(x, y, color)
+                err -= d_x
+                if err < 0:
+                    x += s_x
+                    err += d_y
+                y += s_y
+        self.pixel(x, y, color)
+
+    def blit(self):
+        raise NotImplementedError()
+
+    def scroll(self, delta_x, delta_y):
+        if delta_x < 0:
+            shift_x = 0
+            xend = self.width + delta_x
+            dt_x = 1
+        else:
+            shift_x = self.width - 1
+            xend = delta_x - 1
+            dt_x = -1
+        if delta_y < 0:
+            y = 0
+            yend = self.height + delta_y
+            dt_y = 1
+        else:
+            y = self.height - 1
+            yend = delta_y - 1
+            dt_y = -1
+        while y != yend:
+            x = shift_x
+            while x != xend:
+                self.format.set_pixel(
+                    self, x, y, self.format.get_pixel(self, x - delta_x, y - delta_y)
+                )
+                x += dt_x
+            y += dt_y
+
+    def text(self, string, x, y, color, *, font_name="font5x8.bin", size=1):
+        frame_width = self.width
+        frame_height = self.height
+        if self.rotation in {1, 3}:
+            frame_width, frame_height = frame_height, frame_width
+        for chunk in string.split("\n"):
+            if not self._font or self._font.font_name != font_name:
+                self._font = BitmapFont(font_name)
+            width = self._font.font_width
+            height = self._font.font_height
+            for i, char in enumerate(chunk):
+                char_x = x + (i * (width + 1)) * size
+                if (char_x + (width * size) > 0 and char_x < frame_width
+                        and y + (height * size) > 0 and y < frame_height):
+                    self._font.draw_char(char, char_x, y, self, color, size=size)
+            y += height * size
+
+    def image(self, img):
+        width = self.width
+        height = self.height
+        if self.rotation in {1, 3}:
+            width, height = height, width
+        if img.mode != "1":
+            raise ValueError("Image must be in mode 1.")
+        imwidth, imheight = img.size
+        if imwidth != width or imheight != height:
+            raise ValueError(f"Image must be same dimensions as display ({width}x{height}).")
+        pixels = img.load()
+        for i in range(len(self.buf)):
+            self.buf[i] = 0
+        for x in range(width):
+            for y in range(height):
+                if pixels[(x, y)]:
+                    self.pixel(x, y, 1)
+
+
+class BitmapFont:
+    """ Same file format and rendering as the library; the file is read once """
+
+    def __init__(self, font_name="font5x8.bin"):
+        self.font_name = font_name
+        try:
+            with open(font_name, "rb") as f:
+                data = f.read()
+        except OSError:
+            print("Could not find font file", font_name)
+            raise
+        self.font_width, self.font_height = struct.unpack("BB", data[:2])
+        if 2 + 256 * self.font_width != os.stat(font_name)[6]:
+            raise RuntimeError("Invalid font file: " + font_name)
+        self._data = data
+
+    def deinit(self):
+        pass
+
+    def draw_char(self, char, x, y, framebuffer, color, size=1):
+        size = max(size, 1)
+        base = 2 + ord(char) * self.font_width
+        for char_x in range(self.font_width):
+            if base + char_x >= len(self._data):
+                continue
+            line = self._data[base + char_x]
+            for char_y in range(self.font_height):
+                if (line >> char_y) & 0x1:
+                    framebuffer.fill_rect(x + char_x * size, y + char_y * size, size, size, color)
+
+    def width(self, text):
+        return len(text) * (self.font_width + 1)
+
+
+class FrameBuffer1(FrameBuffer):
+    pass
@@ -0,0 +1,179 @@
+# Host stand-in for adafruit_ssd1306 (I2C only), following the library
+# source so that subclasses such as dirty_display.DirtySSD1306_I2C run
+# unchanged. Every display created is kept in `displays`.
+
+from host import adafruit_framebuf as framebuf
+from host.adafruit_bus_device import i2c_device
+
+SET_CONTRAST = 0x81
+SET_ENTIRE_ON = 0xA4
+SET_NORM_INV = 0xA6
+SET_DISP = 0xAE
+SET_MEM_ADDR = 0x20
+SET_COL_ADDR = 0x21
+SET_PAGE_ADDR = 0x22
+SET_DISP_START_LINE = 0x40
+SET_SEG_REMAP = 0xA0
+SET_MUX_RATIO = 0xA8
+SET_IREF_SELECT = 0xAD
+SET_COM_OUT_DIR = 0xC0
+SET_DISP_OFFSET = 0xD3
+SET_COM_PIN_CFG = 0xDA
+SET_DISP_CLK_DIV = 0xD5
+SET_PRECHARGE = 0xD9
+SET_VCOM_DESEL = 0xDB
+SET_CHARGE_PUMP = 0x8D
+
+displays = []
+
+
+class _SSD1306(framebuf.FrameBuffer):
+    def __init__(self, buffer, width, height, *, external_vcc, reset, page_addressing):
+        super().__init__(buffer, width, height, framebuf.MVLSB)
+        self.width = width
+        self.height = height
+        self.external_vcc = external_vcc
+        self.reset_pin = reset
+        self.page_addressing = page_addressing
+        if self.reset_pin:
+            self.reset_pin.switch_to_output(value=0)
+        self.pages = self.height // 8
+        self._power = False
+        if self.page_addressing:
+            self.pagebuffer = bytearray(width + 1)
+            self.pagebuffer[0] = 0x40
+            self.page_column_start = bytearray(2)
+            self.page_column_start[0] = self.width % 32
+            self.page_column_start[1] = 0x10 + self.width // 32
+        else:
+            self.pagebuffer = None
+            self.page_column_start = None
+        displays.append(self)
+        self.poweron()
+        self.init_display()
+
+    @property
+    def power(self):
+        return self._power
+
+    def init_display(self):
+        for cmd in (
+            SET_DISP,
+            SET_MEM_ADDR,
+            0x10 if self.page_addressing else 0x00,
+            SET_DISP_START_LINE,
+            SET_SEG_REMAP | 0x01,
+            SET_MUX_RATIO,
+            self.height - 1,
+            SET_COM_OUT_DIR | 0x08,
+            SET_DISP_OFFSET,
+            0x00,
+            SET_COM_PIN_CFG,
+            0x02 if self.width > 2 * self.height else 0x12,
+            SET_DISP_CLK_DIV,
+            0x80,
+            SET_PRECHARGE,
+            0x22 if self.external_vcc else 0xF1,
+            SET_VCOM_DESEL,
+            0x30,
+            SET_CONTRAST,
+            0xFF,
+            SET_ENTIRE_ON,
+            SET_NORM_INV,
+            SET_IREF_SELECT,
+            0x30,
+            SET_CHARGE_PUMP,
+            0x10 if self.external_vcc else 0x14,
+            SET_DISP | 0x01,
+        ):
+            self.write_cmd(cmd)
+        self.fill(0)
+        self.show()
+
+    def poweroff(self):
+        self.write_cmd(SET_DISP)
+        self._power = False
+
+    def contrast(self, contrast):
+        self.write_cmd(SET_CONTRAST)
+        self.write_cmd(contrast)
+
+    def invert(self, invert):
+        self.write_cmd(SET_NORM_INV | (invert & 1))
+
+    def rotate(self, rotate):
+        self.write_cmd(SET_COM_OUT_DIR | ((rotate & 1) << 3))
+        self.write_cmd(SET_SEG_REMAP | (rotate & 1))
+
+    def write_framebuf(self):
+        raise NotImplementedError
+
+    def write_cmd(self, cmd):
+        raise NotImplementedError
+
+    def poweron(self):
+        self.write_cmd(SET_DISP | 0x01)
+        self._power = True
+
+    def show(self):
+        if not self.page_addressing:
+            xpos0 = 0
+            xpos1 = self.width - 1
+            if self.width != 128:
+                col_offset = (128 - self.width) // 2
+                xpos0 += col_offset
+                xpos1 += col_offset
+            self.write_cmd(SET_COL_ADDR)
+            self.write_cmd(xpos0)
+            self.write_cmd(xpos1)
+            self.write_cmd(SET_PAGE_ADDR)
+            self.write_cmd(0)
+            self.write_cmd(self.pages - 1)
+        self.write_framebuf()
+
+
+class SSD1306_I2C(_SSD1306):
+    def __init__(self, width, height, i2c, *, addr=0x3C, external_vcc=False, reset=None,
+                 page_addressing=False):
+        self.i2c_device = i2c_device.I2CDevice(i2c, addr)
+        self.addr = addr
+        self.page_addressing = page_addressing
+        self.temp = bytearray(2)
+        self.buffer = bytearray(((height // 8) * width) + 1)
+        self.buffer[0] = 0x40
+        super().__init__(
+            memoryview(self.buffer)[1:],
+            width,
+            height,
+            external_vcc=external_vcc,
+            reset=reset,
+            page_addressing=self.page_addressing,
+        )
+
+    @property
+    def panel(self):
+        # The controller model this display is wired to
+        return self.i2c_device.i2c.devices.get(self.addr)
+
+    def write_cmd(self, cmd):
+        self.temp[0] = 0x80
+        self.temp[1] = cmd
+        with self.i2c_device:
+            self.i2c_device.write(self.temp)
+
+    def write_framebuf(self):
+        if self.page_addressing:
+            for page in range(self.pages):
+                self.write_cmd(0xB0 + page)
+                self.write_cmd(self.page_column_start[0])
+                self.write_cmd(self.page_column_start[1])
+                self.pagebuffer[1:] = self.buffer[1 + self.width * page:1 + self.width * (page + 1)]
+                with self.i2c_device:
+                    self.i2c_device.write(self.pagebuffer)
+        else:
+            with self.i2c_device:
+                self.i2c_device.write(self.buffer)
+
+
+def reset():
+    del displays[:]
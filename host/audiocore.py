@@ -0,0 +1,40 @@
+# Host stand-in for the CircuitPython `audiocore` module.
+
+
+class RawSample:
+    def __init__(self, buffer, *, channel_count=1, sample_rate=8000, single_buffer=True):
+        self.buffer = buffer
+        self.channel_count = channel_count
+        self.sample_rate = sample_rate
+        self.single_buffer = single_buffer
+
+    @property
+    def duration(self):
+        return len(self.buffer) / self.channel_count / self.sample_rate
+
+    def deinit(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.deinit()
+
+
+class WaveFile:
+    def __init__(self, file, buffer=None):
+        import wave
+        with wave.open(file, "rb") as w:
+            self.sample_rate = w.getframerate()
+            self.channel_count = w.getnchannels()
+            self.bits_per_sample = w.getsampwidth() * 8
+            self.buffer = w.readframes(w.getnframes())
+        self._frames = len(self.buffer) // (self.bits_per_sample // 8) // self.channel_count
+
+    @property
+    def duration(self):
+        return self._frames / self.sample_rate
+
+    def deinit(self):
+        pass
@@ -0,0 +1,166 @@
+# Host stand-in for the CircuitPython `audiomixer` module.
+#
+# Mixer follows what each voice plays against the virtual clock and mixes
+# the samples in Python the way the board does in C: every voice's signed
+# sample times its level, summed and clipped. Voices reject samples whose
+# rate or format differ from the mixer's, as on the board. With wav_path set
+# (python -m host ... --wav FILE) the mixed stream is rendered and written
+# as a 16-bit mono WAV when the run ends; otherwise nothing is mixed and only
+# the counters are kept.
+
+import array
+import time
+
+from host import vclock
+
+mixers = []
+wav_path = None
+
+
+class MixerVoice:
+    def __init__(self, mixer):
+        self._mixer = mixer
+        self._sample = None
+        self._data = None
+        self._loop = False
+        self._start = 0         # output sample index the sample started at
+        self._level = 1.0
+        self.plays = 0
+
+    def play(self, sample, *, loop=False):
+        mixer = self._mixer
+        mixer._check(sample)
+        mixer._render()
+        self._sample = sample
+        self._data = sample.buffer
+        self._loop = loop
+        self._start = mixer._index()
+        self.plays += 1
+        mixer.plays += 1
+
+    def stop(self):
+        self._mixer._render()
+        self._sample = None
+
+    @property
+    def level(self):
+        return self._level
+
+    @level.setter
+    def level(self, value):
+        self._mixer._render()
+        self._level = min(max(value, 0.0), 1.0)
+
+    @property
+    def playing(self):
+        if self._sample is None:
+            return False
+        if self._loop:
+            return True
+        return self._mixer._index() - self._start < len(self._data)
+
+
+class Mixer:
+    def __init__(self, *, voice_count=2, buffer_size=1024, channel_count=2, bits_per_sample=16,
+                 samples_signed=True, sample_rate=8000):
+        if channel_count != 1:
+            raise NotImplementedError("host audiomixer is mono only")
+        self.voice_count = voice_count
+        self.buffer_size = buffer_size
+        self.channel_count = channel_count
+        self.bits_per_sample = bits_per_sample
+        self.samples_signed = samples_signed
+        self.sample_rate = sample_rate
+        self.voice = tuple(MixerVoice(self) for _ in range(voice_count))
+        self.plays = 0
+        self.mixed = 0          # output samples rendered
+        self.clipped = 0
+        self.mix_time = 0.0     # host seconds spent mixing
+        self.out = array.array("h") if wav_path else None
+        mixers.append(self)
+
+    @property
+    def playing(self):
+        return any(v.playing for v in self.voice)
+
+    def deinit(self):
+        pass
+
+    def _index(self):
+        return int(vclock.clock.now * self.sample_rate)
+
+    def _check(self, sample):
+        if sample.sample_rate != self.sample_rate:
+            raise ValueError("The sample's sample rate does not match the mixer's")
+        if sample.channel_count != self.channel_count:
+            raise ValueError("The sample's channel count does not match the mixer's")
+        code = getattr(sample.buffer, "typecode", "B")
+        bits = 8 if code in "bB" else 16
+        signed = code in "bh"
+        if bits != self.bits_per_sample:
+            raise ValueError("The sample's bits_per_sample does not match the mixer's")
+        if signed != self.samples_signed:
+            raise ValueError("The sample's signedness does not match the mixer's")
+
+    def _render(self, end=None):
+        # mix everything up to now (or end) into self.out
+        out = self.out
+        if out is None:
+            return
+        if end is None:
+            end = self._index()
+        start = len(out)
+        if end <= start:
+            return
+        t0 = time.perf_counter()
+        n = end - start
+        acc = [0.0] * n
+        offset = 0 if self.samples_signed else 1 << (self.bits_per_sample - 1)
+        scale = 1 << (16 - self.bits_per_sample)
+        for v in self.voice:
+            data = v._data
+            if v._sample is None or not len(data):
+                continue
+            level = v._level * scale
+            length = len(data)
+            k = start - v._start
+            for j in range(n):
+                if k >= length:
+                    if not v._loop:
+                        break
+                    k %= length
+                if k >= 0:
+                    acc[j] += (data[k] - offset) * level
+                k += 1
+        for j in range(n):
+            s = int(acc[j])
+            if s > 32767:
+                s = 32767
+                self.clipped += 1
+            elif s < -32768:
+                s = -32768
+                self.clipped += 1
+            out.append(s)
+        self.mixed += n
+        self.mix_time += time.perf_counter() - t0
+
+
+def write_wav(path, until):
+    """ Mix up to virtual time until and write the first mixer's stream """
+    import wave
+    if not mixers or mixers[0].out is None:
+        return False
+    mixer = mixers[0]
+    mixer._render(int(until * mixer.sample_rate))
+    with wave.open(path, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(mixer.sample_rate)
+        w.writeframes(mixer.out.tobytes())
+    return True
+
+
+def reset():
+    global wav_path
+    del mixers[:]
+    wav_path = None
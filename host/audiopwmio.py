@@ -0,0 +1,68 @@
+# Host stand-in for the CircuitPython `audiopwmio` module.
+#
+# PWMAudioOut keeps a log of (time, event, sample, loop) and works out
+# `playing` from the virtual clock and the sample length.
+
+from host import vclock
+
+outputs = []
+
+
+class PWMAudioOut:
+    def __init__(self, left_channel, *, right_channel=None, quiescent_value=0x8000):
+        self.left_channel = left_channel
+        self.right_channel = right_channel
+        self.quiescent_value = quiescent_value
+        self.log = []
+        self.plays = 0
+        self._sample = None
+        self._loop = False
+        self._started = 0.0
+        self._paused = False
+        outputs.append(self)
+
+    def deinit(self):
+        self.stop()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.deinit()
+
+    def play(self, sample, *, loop=False):
+        now = vclock.clock.now
+        self.plays += 1
+        self._sample = sample
+        self._loop = loop
+        self._started = now
+        self._paused = False
+        self.log.append((now, "play", sample, loop))
+
+    def stop(self):
+        if self._sample is not None:
+            self.log.append((vclock.clock.now, "stop", self._sample, self._loop))
+        self._sample = None
+
+    def pause(self):
+        self._paused = True
+
+    def resume(self):
+        self._paused = False
+
+    @property
+    def paused(self):
+        return self._paused
+
+    @property
+    def playing(self):
+        if self._sample is None:
+            return False
+        if self._loop:
+            return True
+        duration = getattr(self._sample, "duration", 0)
+        return vclock.clock.now - self._started < duration
+
+
+def reset():
+    del outputs[:]
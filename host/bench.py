@@ -0,0 +1,181 @@
+# Display-cost benchmark: each game against its *_optimized variant.
+#
+#   python -m host.bench [--ticks 3000] [--pair pingpong] [--strict]
+#
+# Both variants of a pair get the same seed and the same button script
+# (in ticks, so input lines up with game logic steps). Per tick it reports
+# drawing calls, I2C bytes and Python wall time, and estimates the time one
+# tick would take on the board from the bytes sent at the game's bus
+# frequency plus its sleep. It also compares the sequence of distinct
+# images the panel showed; the pair is expected to draw the same frames.
+
+import argparse
+import os
+import sys
+import time
+
+from host import busio
+from host.runner import run
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Button scripts: callable(pin name, tick) -> held
+
+def holds(*entries):
+    # entries: (pin, start tick, ticks held)
+    table = {}
+    for name, start, length in entries:
+        table.setdefault(name, []).append((start, start + length))
+    return lambda name, tick: any(a <= tick < b for a, b in table.get(name, ()))
+
+
+def snake_square(name, tick):
+    # Turn right, down, left, up every 4 ticks: a small square the snake
+    # keeps circling without hitting a wall
+    turns = ("GP4", "GP5", "GP6", "GP7")
+    return tick >= 4 and tick % 4 == 0 and turns[(tick // 4 - 1) % 4] == name
+
+
+# name: (plain, optimized, button script)
+PAIRS = {
+    "pingpong": ("pingpong.py", "pingpong_optimized.py", holds(
+        ("GP7", 20, 40), ("GP6", 100, 60), ("GP5", 150, 30), ("GP4", 300, 80),
+        ("GP7", 500, 25), ("GP4", 700, 50), ("GP6", 900, 90), ("GP5", 1200, 40),
+    )),
+    "snake": ("snake_game.py", "snake_game_optimized.py", snake_square),
+    "minesweeper": ("minesweeper.py", "minesweeper_optimized.py", holds(
+        ("GP4", 10, 1), ("GP5", 30, 1), ("GP14", 50, 1), ("GP4", 70, 1),
+        ("GP15", 90, 1), ("GP5", 110, 1), ("GP14", 130, 1), ("GP6", 150, 1),
+        ("GP7", 170, 1), ("GP14", 190, 1), ("GP15", 210, 1), ("GP15", 230, 1),
+    )),
+}
+
+# Safety net for scripts that busy-wait without sleeping (no ticks)
+MAX_SECONDS = 600
+
+COUNTED = ("fill", "fill_rect", "rect", "text", "pixel")
+
+
+class Probe:
+    """ Samples the board at the end of every tick """
+
+    def __init__(self, script):
+        self.script = script
+        self.run = None
+        self.frames = []
+        self.wall = []
+        self._last = None
+        self._t = None
+
+    def setup(self, result):
+        from host import board
+        self.run = result
+        clock = result.clock
+        for name, pin in board.pins.items():
+            pin.driver = self._driver(clock, name, self.script)
+        clock.tick_hooks.append(self.tick)
+        self._t = time.perf_counter()
+
+    @staticmethod
+    def _driver(clock, name, script):
+        return lambda now: script(name, clock.ticks)
+
+    def tick(self, clock):
+        now = time.perf_counter()
+        self.wall.append(now - self._t)
+        self._t = now
+        panel = self.run.panel
+        if panel is None:
+            return
+        frame = panel.frame()
+        if frame != self._last:
+            self.frames.append(frame)
+            self._last = frame
+
+
+def measure(script_name, script, ticks, seed):
+    probe = Probe(script)
+    result = run(os.path.join(ROOT, script_name), ticks=ticks, seconds=MAX_SECONDS, seed=seed,
+                 setup=probe.setup)
+    clock = result.clock
+    n = max(clock.ticks, 1)
+    stats = {"ticks": clock.ticks}
+    calls = {}
+    for display in result.displays:
+        for name, count in display.calls.items():
+            calls[name] = calls.get(name, 0) + count
+    for name in COUNTED:
+        stats[name] = calls.get(name, 0) / n
+    bus = result.buses[0] if result.buses else None
+    frequency = bus.frequency if bus else 0
+    stats["frequency"] = frequency
+    stats["i2c_bytes"] = result.i2c_bytes / n
+    stats["transactions"] = result.i2c_transactions / n
+    stats["py_us"] = sum(probe.wall) / max(len(probe.wall), 1) * 1e6
+    bus_s = busio.transfer_time(result.i2c_bytes, result.i2c_transactions, frequency) if frequency else 0.0
+    stats["bus_ms"] = bus_s / n * 1000
+    stats["device_ms"] = (bus_s + clock.idle) / n * 1000
+    return stats, probe.frames
+
+
+def compare(frames_a, frames_b):
+    # -> None if both showed the same image sequence, else the first index that differs
+    for i, (a, b) in enumerate(zip(frames_a, frames_b)):
+        if a != b:
+            return i
+    if len(frames_a) != len(frames_b):
+        return min(len(frames_a), len(frames_b))
+    return None
+
+
+ROWS = (
+    ("fill/tick", "fill", "%.2f"),
+    ("fill_rect/tick", "fill_rect", "%.2f"),
+    ("rect/tick", "rect", "%.2f"),
+    ("text/tick", "text", "%.2f"),
+    ("pixel/tick", "pixel", "%.2f"),
+    ("i2c bytes/tick", "i2c_bytes", "%.0f"),
+    ("i2c transactions/tick", "transactions", "%.1f"),
+    ("python us/tick", "py_us", "%.0f"),
+    ("bus ms/tick (est.)", "bus_ms", "%.3f"),
+    ("device ms/tick (est.)", "device_ms", "%.3f"),
+)
+
+
+def bench_pair(name, ticks, seed, out=sys.stdout):
+    plain, optimized, script = PAIRS[name]
+    a, frames_a = measure(plain, script, ticks, seed)
+    b, frames_b = measure(optimized, script, ticks, seed)
+    out.write("%s: %s vs %s, %d/%d ticks, seed %d, I2C %d kHz\n" % (
+        name, plain, optimized, a["ticks"], b["ticks"], seed, a["frequency"] // 1000))
+    width = max(len(plain), len(optimized), 10)
+    out.write("  %-24s %*s %*s %8s\n" % ("", width, plain, width, optimized, "ratio"))
+    for label, key, fmt in ROWS:
+        ratio = "%.2fx" % (a[key] / b[key]) if b[key] else "-"
+        out.write("  %-24s %*s %*s %8s\n" % (label, width, fmt % a[key], width, fmt % b[key], ratio))
+    diff = compare(frames_a, frames_b)
+    if diff is None:
+        out.write("  frames: identical (%d distinct)\n\n" % len(frames_a))
+    else:
+        out.write("  frames: DIFFER at distinct frame %d (%d vs %d distinct)\n\n" % (
+            diff, len(frames_a), len(frames_b)))
+    return diff is None
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m host.bench", description="Compare each game with its *_optimized variant")
+    parser.add_argument("--ticks", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--pair", choices=sorted(PAIRS), action="append",
+                        help="benchmark only this pair (repeatable)")
+    parser.add_argument("--strict", action="store_true", help="exit 1 if any pair draws different frames")
+    args = parser.parse_args()
+    same = True
+    for name in args.pair or sorted(PAIRS):
+        same = bench_pair(name, args.ticks, args.seed) and same
+    if args.strict and not same:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
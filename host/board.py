@@ -0,0 +1,56 @@
+# Host stand-in for the CircuitPython `board` module (Raspberry Pi Pico pins).
+#
+# Buttons on the badge connect a GPIO to GND, so a "pressed" pin reads low.
+# Test code drives them with press()/release() or a timeline of holds:
+#
+#   board.GP7.hold(1.0, 0.5)    # held from t=1.0s for 0.5s of virtual time
+
+
+class Pin:
+    def __init__(self, name):
+        self.name = name
+        self.pressed = False    # held down right now (press()/release())
+        self.holds = []         # (start, end) intervals in virtual seconds
+        self.driver = None      # optional callable(now) -> bool
+
+    def __repr__(self):
+        return "board." + self.name
+
+    def press(self):
+        self.pressed = True
+
+    def release(self):
+        self.pressed = False
+
+    def hold(self, start, duration):
+        self.holds.append((start, start + duration))
+
+    def reset(self):
+        self.pressed = False
+        self.holds = []
+        self.driver = None
+
+    def is_pressed(self, now):
+        if self.pressed:
+            return True
+        if self.driver is not None and self.driver(now):
+            return True
+        for start, end in self.holds:
+            if start <= now < end:
+                return True
+        return False
+
+
+pins = {}
+for _i in range(29):
+    pins["GP%d" % _i] = Pin("GP%d" % _i)
+globals().update(pins)
+del _i
+
+LED = GP25  # noqa: F821
+A0, A1, A2 = GP26, GP27, GP28  # noqa: F821
+
+
+def reset():
+    for pin in pins.values():
+        pin.reset()
@@ -0,0 +1,92 @@
+# Host stand-in for the CircuitPython `busio` module.
+#
+# I2C counts bytes and transactions and charges the virtual clock with the
+# time the transfer would take at the configured bus frequency. Every bus
+# has an SSD1306 panel model at 0x3C, like the badge.
+
+from host import vclock
+from host.oled import SSD1306Panel
+
+# Per transaction: START, address byte + ACK, STOP (in bit times)
+TRANSACTION_BITS = 11
+BITS_PER_BYTE = 9  # 8 data bits + ACK
+
+buses = []
+
+
+def transfer_time(nbytes, transactions, frequency):
+    return (nbytes * BITS_PER_BYTE + transactions * TRANSACTION_BITS) / frequency
+
+
+class I2C:
+    def __init__(self, scl, sda, *, frequency=100000, timeout=255):
+        self.scl = scl
+        self.sda = sda
+        self.frequency = frequency
+        self.devices = {0x3C: SSD1306Panel()}
+        self.bytes_written = 0
+        self.bytes_read = 0
+        self.transactions = 0
+        self._locked = False
+        buses.append(self)
+
+    def deinit(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.deinit()
+
+    def try_lock(self):
+        if self._locked:
+            return False
+        self._locked = True
+        return True
+
+    def unlock(self):
+        self._locked = False
+
+    def scan(self):
+        return sorted(self.devices)
+
+    def _device(self, address):
+        device = self.devices.get(address)
+        if device is None:
+            raise OSError(19, "No such device")  # ENODEV, like CircuitPython
+        return device
+
+    def _charge(self, nbytes):
+        self.transactions += 1
+        vclock.clock.charge(transfer_time(nbytes, 1, self.frequency))
+
+    def writeto(self, address, buffer, *, start=0, end=None):
+        device = self._device(address)
+        data = bytes(buffer[start:end])
+        self.bytes_written += len(data)
+        if data:
+            device.write(data)
+        self._charge(len(data))
+
+    def readfrom_into(self, address, buffer, *, start=0, end=None):
+        self._device(address)
+        if end is None:
+            end = len(buffer)
+        for i in range(start, end):
+            buffer[i] = 0
+        self.bytes_read += end - start
+        self._charge(end - start)
+
+    def writeto_then_readfrom(self, address, out_buffer, in_buffer, *,
+                              out_start=0, out_end=None, in_start=0, in_end=None):
+        self.writeto(address, out_buffer, start=out_start, end=out_end)
+        self.readfrom_into(address, in_buffer, start=in_start, end=in_end)
+
+    @property
+    def panel(self):
+        return self.devices.get(0x3C)
+
+
+def reset():
+    del buses[:]
@@ -0,0 +1,65 @@
+# Host stand-in for the CircuitPython `digitalio` module.
+
+from host import vclock
+
+# Rough cost of one DigitalInOut.value read in CircuitPython on the RP2040.
+# Charging it also lets busy-wait loops (no sleep) reach the run deadline.
+READ_COST = 0.000005
+
+
+class Direction:
+    INPUT = "INPUT"
+    OUTPUT = "OUTPUT"
+
+
+class Pull:
+    UP = "UP"
+    DOWN = "DOWN"
+
+
+class DriveMode:
+    PUSH_PULL = "PUSH_PULL"
+    OPEN_DRAIN = "OPEN_DRAIN"
+
+
+class DigitalInOut:
+    def __init__(self, pin):
+        self._pin = pin
+        self.direction = Direction.INPUT
+        self.pull = None
+        self.drive_mode = DriveMode.PUSH_PULL
+        self._out = False
+        self.reads = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.deinit()
+
+    def deinit(self):
+        pass
+
+    def switch_to_output(self, value=False, drive_mode=DriveMode.PUSH_PULL):
+        self.direction = Direction.OUTPUT
+        self.drive_mode = drive_mode
+        self._out = bool(value)
+
+    def switch_to_input(self, pull=None):
+        self.direction = Direction.INPUT
+        self.pull = pull
+
+    @property
+    def value(self):
+        if self.direction == Direction.OUTPUT:
+            return self._out
+        self.reads += 1
+        clock = vclock.clock
+        clock.charge(READ_COST)
+        if self._pin.is_pressed(clock.now):
+            return False
+        return self.pull == Pull.UP
+
+    @value.setter
+    def value(self, val):
+        self._out = bool(val)
@@ -0,0 +1,263 @@
+# Frame captures (frame_capture.py) on the PC: decode, export, compare.
+#
+#   python -m host.frames info RUN.frm
+#   python -m host.frames pbm RUN.frm DIR [--scale 2]      # DIR/00000.pbm ...
+#   python -m host.frames png RUN.frm DIR [--scale 2]
+#   python -m host.frames gif RUN.frm OUT.gif [--scale 2]
+#   python -m host.frames compare RUN.frm GOLDEN.frm [--diff FILE.pbm]
+#
+# Images are lit pixels = 1 in PBM and white in PNG/GIF. The GIF uses the
+# delays recorded with the frames. compare checks every frame's pixels
+# (timing is ignored: a replay runs faster than the recording), prints the
+# first frames that differ and exits with 1 if any do; --diff saves the
+# pixels that differ in the first one.
+
+import argparse
+import os
+import struct
+import sys
+import zlib
+
+MAGIC = b"FRM1"
+
+
+def read(path):
+    """ (width, height, [(ms, frame bytes)]) from a capture file """
+    with open(path, "rb") as f:
+        data = f.read()
+    if data[:4] != MAGIC or len(data) < 6:
+        raise ValueError("%s is not a frame capture" % path)
+    width, pages = data[4], data[5]
+    size = width * pages
+    screen = bytearray(size)
+    frames = []
+    i = 6
+    n = len(data)
+    while i + 2 < n:
+        ms = data[i] | data[i + 1] << 8
+        i += 2
+        pos = 0
+        while True:
+            t = data[i]
+            i += 1
+            if t == 0:
+                break
+            if t < 0x80:
+                pos += t
+            elif t < 0xC0:
+                for k in range(t - 0x7F):
+                    screen[pos + k] ^= data[i + k]
+                i += t - 0x7F
+                pos += t - 0x7F
+            else:
+                v = data[i]
+                i += 1
+                for k in range(t - 0xBE):
+                    screen[pos + k] ^= v
+                pos += t - 0xBE
+            if pos > size:
+                raise ValueError("%s: frame %d runs past the screen" % (path, len(frames)))
+        frames.append((ms, bytes(screen)))
+    return width, pages * 8, frames
+
+
+def pixels(frame, width, height, scale=1):
+    """ Rows of 0/1 pixels, each pixel repeated scale times both ways """
+    rows = []
+    for y in range(height):
+        base = (y >> 3) * width
+        bit = y & 7
+        row = []
+        for x in range(width):
+            row.extend([(frame[base + x] >> bit) & 1] * scale)
+        for _ in range(scale):
+            rows.append(row)
+    return rows
+
+
+# ---------- Writers ----------
+def write_pbm(path, rows):
+    with open(path, "w") as f:
+        f.write("P1\n%d %d\n" % (len(rows[0]), len(rows)))
+        for row in rows:
+            f.write(" ".join(map(str, row)))
+            f.write("\n")
+
+
+def _chunk(kind, body):
+    return struct.pack(">I", len(body)) + kind + body + struct.pack(">I", zlib.crc32(kind + body))
+
+
+def write_png(path, rows):
+    width = len(rows[0])
+    raw = bytearray()
+    for row in rows:
+        raw.append(0)  # filter: none
+        for x in range(0, width, 8):
+            byte = 0
+            for b, v in enumerate(row[x:x + 8]):
+                byte |= v << (7 - b)
+            raw.append(byte)
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(_chunk(b"IHDR", struct.pack(">IIBBBBB", width, len(rows), 1, 0, 0, 0, 0)))
+        f.write(_chunk(b"IDAT", zlib.compress(bytes(raw), 9)))
+        f.write(_chunk(b"IEND", b""))
+
+
+def _lzw(indices, min_size=2):
+    # GIF LZW: codes of growing width up to 12 bits, packed LSB first
+    clear = 1 << min_size
+    end = clear + 1
+    out = bytearray()
+    acc = 0
+    nbits = 0
+
+    def emit(code):
+        nonlocal acc, nbits
+        acc |= code << nbits
+        nbits += size
+        while nbits >= 8:
+            out.append(acc & 0xFF)
+            acc >>= 8
+            nbits -= 8
+
+    size = min_size + 1
+    table = {}                  # (prefix code << 8 | pixel) -> code
+    nxt = end + 1
+    emit(clear)
+    prefix = None
+    for v in indices:
+        if prefix is None:
+            prefix = v
+            continue
+        key = prefix << 8 | v
+        code = table.get(key)
+        if code is not None:
+            prefix = code
+            continue
+        emit(prefix)
+        if nxt < 4096:
+            table[key] = nxt
+            if nxt == 1 << size and size < 12:
+                size += 1
+            nxt += 1
+        else:
+            emit(clear)
+            table = {}
+            nxt = end + 1
+            size = min_size + 1
+        prefix = v
+    if prefix is not None:
+        emit(prefix)
+    emit(end)
+    if nbits:
+        out.append(acc & 0xFF)
+    return bytes(out)
+
+
+def write_gif(path, images, delays):
+    width = len(images[0][0])
+    height = len(images[0])
+    with open(path, "wb") as f:
+        f.write(b"GIF89a" + struct.pack("<HHBBB", width, height, 0x80, 0, 0))
+        f.write(b"\x00\x00\x00\xff\xff\xff")  # palette: black, white
+        f.write(b"\x21\xff\x0bNETSCAPE2.0\x03\x01\x00\x00\x00")  # loop forever
+        for rows, delay in zip(images, delays):
+            f.write(b"\x21\xf9\x04\x00" + struct.pack("<H", delay) + b"\x00\x00")
+            f.write(b"\x2c" + struct.pack("<HHHHB", 0, 0, width, height, 0))
+            data = _lzw([v for row in rows for v in row])
+            f.write(b"\x02")
+            for i in range(0, len(data), 255):
+                block = data[i:i + 255]
+                f.write(bytes((len(block),)) + block)
+            f.write(b"\x00")
+        f.write(b"\x3b")
+
+
+# ---------- Commands ----------
+def info(args):
+    width, height, frames = read(args.capture)
+    size = os.path.getsize(args.capture)
+    distinct = len(set(frame for _, frame in frames))
+    ms = sum(ms for ms, _ in frames[1:])
+    print("%s: %dx%d, %d frames (%d distinct) over %.2fs, %d bytes (%.1f per frame)" % (
+        args.capture, width, height, len(frames), distinct, ms / 1000, size,
+        (size - 6) / len(frames) if frames else 0))
+    return 0
+
+
+def export(args):
+    width, height, frames = read(args.capture)
+    if not frames:
+        print("%s: no frames" % args.capture)
+        return 1
+    if args.command == "gif":
+        images = []
+        delays = []  # ms each image stays up
+        last = None
+        for i, (_, frame) in enumerate(frames):
+            shown = frames[i + 1][0] if i + 1 < len(frames) else 1000
+            if frame == last:
+                delays[-1] += shown  # equal frames in a row: one longer GIF frame
+                continue
+            images.append(pixels(frame, width, height, args.scale))
+            delays.append(shown)
+            last = frame
+        write_gif(args.out, images, [max(round(ms / 10), 2) for ms in delays])
+        print("%s: %d frames (%d after merging repeats)" % (args.out, len(frames), len(images)))
+        return 0
+    os.makedirs(args.out, exist_ok=True)
+    write = write_pbm if args.command == "pbm" else write_png
+    for i, (_, frame) in enumerate(frames):
+        write(os.path.join(args.out, "%05d.%s" % (i, args.command)), pixels(frame, width, height, args.scale))
+    print("%s: %d frames" % (args.out, len(frames)))
+    return 0
+
+
+def compare(args):
+    width, height, run = read(args.capture)
+    gwidth, gheight, golden = read(args.golden)
+    if (width, height) != (gwidth, gheight):
+        print("size differs: %dx%d vs golden %dx%d" % (width, height, gwidth, gheight))
+        return 1
+    differ = []
+    for i, ((_, a), (_, b)) in enumerate(zip(run, golden)):
+        if a != b:
+            differ.append(i)
+            if len(differ) <= args.show:
+                count = sum(bin(x ^ y).count("1") for x, y in zip(a, b))
+                print("frame %d: %d pixels differ" % (i, count))
+                if args.diff and len(differ) == 1:
+                    write_pbm(args.diff, pixels(bytes(x ^ y for x, y in zip(a, b)), width, height))
+    if len(run) != len(golden):
+        print("frame count differs: %d vs golden %d" % (len(run), len(golden)))
+    same = min(len(run), len(golden)) - len(differ)
+    print("%s vs %s: %d frames identical, %d differ" % (args.capture, args.golden, same, len(differ)))
+    return 1 if differ or len(run) != len(golden) else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m host.frames", description="Decode and compare frame captures")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("info", help="frames, size and bytes per frame")
+    p.add_argument("capture")
+    p.set_defaults(func=info)
+    for name in ("pbm", "png", "gif"):
+        p = sub.add_parser(name, help="write the frames as %s" % name.upper())
+        p.add_argument("capture")
+        p.add_argument("out", help="directory (pbm, png) or file (gif)")
+        p.add_argument("--scale", type=int, default=1, help="pixel size")
+        p.set_defaults(func=export)
+    p = sub.add_parser("compare", help="compare with a golden capture frame by frame")
+    p.add_argument("capture")
+    p.add_argument("golden")
+    p.add_argument("--show", type=int, default=5, help="differing frames to list")
+    p.add_argument("--diff", metavar="FILE", help="save the differing pixels of the first such frame as PBM")
+    p.set_defaults(func=compare)
+    args = parser.parse_args()
+    sys.exit(args.func(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# Model of the SSD1306 controller on the far side of the I2C bus.
+#
+# It decodes the command/data stream the driver sends (control bytes,
+# addressing mode, column/page windows) into its own GDDRAM, so `ram` is
+# what the real panel would be showing, independent of the driver's
+# framebuffer.
+
+# Commands followed by argument bytes
+_ARGS = {
+    0x20: 1, 0x21: 2, 0x22: 2, 0x81: 1, 0x8D: 1, 0xA8: 1, 0xAD: 1,
+    0xD3: 1, 0xD5: 1, 0xD9: 1, 0xDA: 1, 0xDB: 1,
+}
+
+
+class SSD1306Panel:
+    def __init__(self, width=128, height=64):
+        self.width = width
+        self.pages = height // 8
+        self.ram = bytearray(width * self.pages)
+        self.mode = 2               # 0 horizontal, 1 vertical, 2 page (reset default)
+        self.col0, self.col1 = 0, width - 1
+        self.page0, self.page1 = 0, self.pages - 1
+        self.col = 0
+        self.page = 0
+        self.on = False
+        self.data_bytes = 0         # GDDRAM bytes written
+        self.data_writes = 0        # data transactions
+        self._cmd = []
+
+    def frame(self):
+        return bytes(self.ram)
+
+    def pixel(self, x, y):
+        return (self.ram[(y >> 3) * self.width + x] >> (y & 7)) & 1
+
+    # ---------- Bus side ----------
+    def write(self, data):
+        i = 0
+        n = len(data)
+        while i < n:
+            control = data[i]
+            i += 1
+            is_data = control & 0x40
+            if control & 0x80:
+                # Co=1: one byte, then another control byte
+                if i < n:
+                    self._feed(data[i], is_data)
+                    i += 1
+            else:
+                # Co=0: the rest of the transaction is a stream
+                if is_data:
+                    self.data_writes += 1
+                for j in range(i, n):
+                    self._feed(data[j], is_data)
+                i = n
+
+    def _feed(self, byte, is_data):
+        if is_data:
+            self._data(byte)
+        else:
+            self._command(byte)
+
+    def _data(self, byte):
+        self.data_bytes += 1
+        if self.page < self.pages and self.col < self.width:
+            self.ram[self.page * self.width + self.col] = byte
+        if self.mode == 0:
+            if self.col >= self.col1:
+                self.col = self.col0
+                self.page = self.page0 if self.page >= self.page1 else self.page + 1
+            else:
+                self.col += 1
+        elif self.mode == 1:
+            if self.page >= self.page1:
+                self.page = self.page0
+                self.col = self.col0 if self.col >= self.col1 else self.col + 1
+            else:
+                self.page += 1
+        elif self.col < self.width - 1:
+            self.col += 1
+
+    def _command(self, byte):
+        cmd = self._cmd
+        cmd.append(byte)
+        if len(cmd) <= _ARGS.get(cmd[0], 0):
+            return
+        op = cmd[0]
+        if op == 0x20:
+            self.mode = cmd[1] & 3
+        elif op == 0x21:
+            self.col0, self.col1 = cmd[1] & 0x7F, cmd[2] & 0x7F
+            self.col = self.col0
+        elif op == 0x22:
+            self.page0, self.page1 = cmd[1] & 7, cmd[2] & 7
+            self.page = self.page0
+        elif 0xB0 <= op <= 0xB7:
+            self.page = op & 7
+        elif op <= 0x0F:
+            self.col = (self.col & 0xF0) | op
+        elif op <= 0x1F:
+            self.col = (self.col & 0x0F) | ((op & 0x0F) << 4)
+        elif op == 0xAE:
+            self.on = False
+        elif op == 0xAF:
+            self.on = True
+        self._cmd = []
@@ -0,0 +1,254 @@
+# Run an unmodified game script on the virtual board.
+#
+# install() puts the stand-ins in sys.modules under their CircuitPython
+# names and swaps time.sleep/time.monotonic (and asyncio's clock) for the
+# virtual clock; run() executes a script until a virtual-time or tick budget
+# runs out and returns what happened.
+
+import asyncio
+import gc
+import os
+import random
+import runpy
+import sys
+import time
+
+from host import vclock
+
+STAND_INS = {
+    "board": "host.board",
+    "busio": "host.busio",
+    "digitalio": "host.digitalio",
+    "micropython": "host.micropython",
+    "adafruit_framebuf": "host.adafruit_framebuf",
+    "adafruit_bus_device": "host.adafruit_bus_device",
+    "adafruit_bus_device.i2c_device": "host.adafruit_bus_device.i2c_device",
+    "adafruit_ssd1306": "host.adafruit_ssd1306",
+    "audiocore": "host.audiocore",
+    "audiopwmio": "host.audiopwmio",
+    "audiomixer": "host.audiomixer",
+}
+
+_saved = None
+
+
+class _VirtualSelector:
+    # Never blocks: time the loop would wait is skipped on the virtual clock
+    def __init__(self, selector):
+        self._selector = selector
+        self._stopped = False
+
+    def select(self, timeout=None):
+        if self._stopped:
+            # asyncio.run() is cancelling the tasks: let them run to their end
+            return self._selector.select(0)
+        if vclock.clock.stopped:
+            # the budget ran out inside a task (which kept StopRun): stop the loop too,
+            # once, so asyncio.run() can still cancel the tasks
+            self._stopped = True
+            raise vclock.StopRun()
+        events = self._selector.select(0)
+        if events:
+            return events
+        if timeout is None:
+            raise RuntimeError("asyncio loop is waiting for I/O that will never happen")
+        try:
+            vclock.clock.sleep(timeout)
+        except vclock.StopRun:
+            self._stopped = True  # ran out while the loop waited: the same, once
+            raise
+        return []
+
+    def __getattr__(self, name):
+        return getattr(self._selector, name)
+
+
+class VirtualTimeLoop(asyncio.SelectorEventLoop):
+    def __init__(self):
+        super().__init__()
+        self._selector = _VirtualSelector(self._selector)
+
+    def time(self):
+        return vclock.clock.now
+
+
+class _VirtualPolicy(asyncio.DefaultEventLoopPolicy):
+    def new_event_loop(self):
+        return VirtualTimeLoop()
+
+
+def _sleep(seconds):
+    vclock.clock.sleep(seconds)
+
+
+def _monotonic():
+    return vclock.clock.now
+
+
+def _monotonic_ns():
+    return vclock.clock.monotonic_ns()
+
+
+def install():
+    """ Make the stand-ins importable under their board names and fresh """
+    global _saved
+    import importlib
+    if _saved is None:
+        _saved = {
+            "modules": {name: sys.modules.get(name) for name in STAND_INS},
+            "time": (time.sleep, time.monotonic, time.monotonic_ns),
+            "policy": asyncio.get_event_loop_policy(),
+        }
+    clock = vclock.reset()
+    for name, target in STAND_INS.items():
+        module = importlib.import_module(target)
+        sys.modules[name] = module
+        if hasattr(module, "reset"):
+            module.reset()
+    time.sleep, time.monotonic, time.monotonic_ns = _sleep, _monotonic, _monotonic_ns
+    asyncio.set_event_loop_policy(_VirtualPolicy())
+    return clock
+
+
+def uninstall():
+    global _saved
+    if _saved is None:
+        return
+    for name, module in _saved["modules"].items():
+        if module is None:
+            sys.modules.pop(name, None)
+        else:
+            sys.modules[name] = module
+    time.sleep, time.monotonic, time.monotonic_ns = _saved["time"]
+    gc.enable()  # a game may have turned automatic collection off
+    asyncio.set_event_loop_policy(_saved["policy"])
+    _saved = None
+
+
+class _NullWriter:
+    def write(self, s):
+        return len(s)
+
+    def flush(self):
+        pass
+
+
+class Run:
+    """ Outcome of one run: the clock, the hardware the game created, wall time """
+
+    def __init__(self, path, clock):
+        from host import adafruit_ssd1306, audiomixer, audiopwmio, busio
+        self.path = path
+        self.clock = clock
+        self.buses = busio.buses
+        self.displays = adafruit_ssd1306.displays
+        self.audio = audiopwmio.outputs
+        self.mixers = audiomixer.mixers
+        self.heap = []          # heapstats reports, taken before the game's modules go
+        self.wall = 0.0
+
+    @property
+    def display(self):
+        return self.displays[0] if self.displays else None
+
+    @property
+    def panel(self):
+        return self.buses[0].panel if self.buses else None
+
+    @property
+    def i2c_bytes(self):
+        return sum(bus.bytes_written for bus in self.buses)
+
+    @property
+    def i2c_transactions(self):
+        return sum(bus.transactions for bus in self.buses)
+
+    def summary(self):
+        clock = self.clock
+        lines = [
+            "%s: %.2fs virtual in %.2fs wall, %d ticks (%.0f ticks/s)" % (
+                os.path.basename(self.path), clock.now, self.wall, clock.ticks,
+                clock.ticks / self.wall if self.wall else 0.0),
+            "  busy %.3fs, idle %.3fs" % (clock.busy, clock.idle),
+        ]
+        for bus in self.buses:
+            lines.append("  i2c @%dHz: %d bytes in %d transactions" % (
+                bus.frequency, bus.bytes_written, bus.transactions))
+        for display in self.displays:
+            calls = ", ".join("%s=%d" % kv for kv in sorted(display.calls.items()))
+            lines.append("  %s: %s" % (type(display).__name__, calls))
+        for out in self.audio:
+            lines.append("  audio on %r: %d plays" % (out.left_channel, out.plays))
+        for mixer in self.mixers:
+            lines.append("  audiomixer: %d voices, %d plays, %d samples mixed in %.3fs, %d clipped" % (
+                mixer.voice_count, mixer.plays, mixer.mixed, mixer.mix_time, mixer.clipped))
+        for report in self.heap:
+            lines.append("  " + report.replace("\n", "\n  "))
+        return "\n".join(lines)
+
+
+def run(path, *, seconds=None, ticks=None, seed=0, presses=(), quiet=True, setup=None, wav=None):
+    """ Run a game script until `seconds` of virtual time or `ticks` sleeps.
+
+    presses: iterable of (pin name, start, duration), e.g. ("GP7", 1.0, 0.2)
+    setup:   optional callable(run) invoked after the board is built and
+             before the script starts (to add clock.tick_hooks etc.)
+    wav:     write what the first audiomixer.Mixer played to this WAV file
+    """
+    if seconds is None and ticks is None:
+        raise ValueError("run() needs a seconds or ticks budget")
+    path = os.path.abspath(path)
+    script_dir = os.path.dirname(path)
+    clock = install()
+    clock.deadline = seconds
+    clock.max_ticks = ticks
+    from host import audiomixer, board
+    audiomixer.wav_path = wav
+    for name, start, duration in presses:
+        board.pins[name].hold(start, duration)
+    result = Run(path, clock)
+    if setup is not None:
+        setup(result)
+
+    before = set(sys.modules)
+    cwd = os.getcwd()
+    stdout = sys.stdout
+    random.seed(seed)
+    sys.path.insert(0, script_dir)
+    os.chdir(script_dir)  # fonts and data files are looked up like on CIRCUITPY
+    if quiet:
+        sys.stdout = _NullWriter()
+    start = time.perf_counter()
+    try:
+        runpy.run_path(path, run_name="__main__")
+    except (vclock.StopRun, SystemExit):  # a replay that reached the end of its log exits
+        pass
+    finally:
+        result.wall = time.perf_counter() - start
+        if wav:
+            audiomixer.write_wav(wav, clock.now)
+        heapstats = sys.modules.get("heapstats")
+        if heapstats is not None:
+            result.heap = [h.report() for h in heapstats.instances]
+            del heapstats.instances[:]
+        recorder = sys.modules.get("recorder")
+        if recorder is not None:
+            for tape in recorder.instances:
+                tape.close()  # the run stops at any poll: keep the log up to it
+            del recorder.instances[:]
+        frame_capture = sys.modules.get("frame_capture")
+        if frame_capture is not None:
+            for capture in frame_capture.instances:
+                capture.close()
+            del frame_capture.instances[:]
+        sys.stdout = stdout
+        os.chdir(cwd)
+        sys.path.remove(script_dir)
+        # forget helper modules imported from the game's directory so the
+        # next run binds them to fresh stand-ins
+        for name in set(sys.modules) - before:
+            module_file = getattr(sys.modules[name], "__file__", None) or ""
+            if module_file.startswith(script_dir + os.sep) and not name.startswith("host"):
+                del sys.modules[name]
+        uninstall()
+    return result
@@ -0,0 +1,62 @@
+# Virtual clock shared by all host stand-ins.
+#
+# time.sleep() (and idle time inside the asyncio loop) jumps the clock
+# forward instead of blocking, so games run as fast as the host allows.
+# Simulated hardware costs (I2C transfers, pin reads) are charged to the
+# clock as busy time, which keeps frame pacing close to the real board.
+
+
+class StopRun(BaseException):
+    """ Raised from inside the game when the run budget is used up """
+
+
+class VirtualClock:
+    def __init__(self):
+        self.now = 0.0
+        self.ticks = 0          # number of sleeps / idle waits
+        self.busy = 0.0         # seconds charged by simulated hardware
+        self.idle = 0.0         # seconds spent sleeping
+        self.deadline = None    # stop when now >= deadline
+        self.max_ticks = None   # stop after this many ticks
+        self.tick_hooks = []    # called with the clock at the end of every tick
+        self.stopped = False
+
+    def monotonic(self):
+        return self.now
+
+    def monotonic_ns(self):
+        return int(self.now * 1000000000)
+
+    def sleep(self, seconds):
+        # One game tick ends here
+        self.ticks += 1
+        for hook in self.tick_hooks:
+            hook(self)
+        if seconds > 0:
+            self.now += seconds
+            self.idle += seconds
+        self._check()
+
+    def charge(self, seconds):
+        # Busy time of simulated hardware (does not end a tick)
+        self.now += seconds
+        self.busy += seconds
+        self._check()
+
+    def _check(self):
+        if self.stopped:
+            return
+        if (self.deadline is not None and self.now >= self.deadline) or (
+            self.max_ticks is not None and self.ticks >= self.max_ticks
+        ):
+            self.stopped = True
+            raise StopRun()
+
+
+clock = VirtualClock()
+
+
+def reset():
+    global clock
+    clock = VirtualClock()
+    return clock
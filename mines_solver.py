@@ -0,0 +1,299 @@
+# Minesweeper deduction engine: hints and no-guess boards for
+# minesweeper_optimized.py.
+#
+# Cells are flat indices and neighbours come from the game's NEIGHBORS /
+# NEIGHBOR_COUNT table. The solver only knows what a player sees: the numbers
+# of opened cells, plus the cells it has proven itself. open() hands it an
+# opened cell; solve() then looks again only at the numbers around cells that
+# changed since the last call:
+#
+#   1. one number: its unknown neighbours are all mines, or all safe
+#   2. two numbers sharing unknown cells: bound the mines in the shared
+#      cells, which can settle the cells only one of them sees (this covers
+#      the subset rule)
+#   3. still stuck: the frontier (unknown cells next to numbers) is split into
+#      independent groups and every group of at most max_enum cells is
+#      enumerated, giving certain cells and mine probabilities
+#
+#   solver = Solver(CELLS, NEIGHBORS, NEIGHBOR_COUNT)
+#   solver.open(i, board[i])           # every cell the player opened
+#   solver.solve()
+#   solver.next_safe()                 # a proven safe cell not opened yet, or None
+#   solver.mines                       # proven mines
+#   solver.prob                        # {cell: mine probability} from step 3
+#   solver.solvable(board, MINE, first)    # can the board be cleared without guessing?
+#
+# The total number of mines isn't used, so a few endgames a player could
+# still deduce from it count as guesses.
+
+UNKNOWN = 0
+OPEN = 1
+SAFE = 2    # proven safe, not opened yet
+MINE = 3    # proven mine
+
+
+class Solver:
+    """ Incremental minesweeper constraint solver """
+
+    def __init__(self, cells, neighbors, neighbor_count, max_enum=14):
+        self.cells = cells
+        self.nb = neighbors
+        self.nbc = neighbor_count
+        self.max_enum = max_enum        # largest frontier group enumerated
+        self.state = bytearray(cells)
+        self.number = bytearray(cells)
+        self._queued = bytearray(cells)
+        self.reset()
+
+    def reset(self):
+        for i in range(self.cells):
+            self.state[i] = UNKNOWN
+            self._queued[i] = 0
+        self.queue = []                 # numbers to look at again
+        self.frontier = set()           # numbers with unknown neighbours
+        self.safe = []
+        self.mines = []
+        self.prob = {}
+        self.found = 0                  # cells proven so far
+
+    # ---------- Input ----------
+    def open(self, i, n):
+        """ Cell i was opened and shows n """
+        if self.state[i] == OPEN:
+            return
+        self.state[i] = OPEN
+        self.number[i] = n
+        self._touch(i)
+
+    def _touch(self, i):
+        # i changed: the numbers on and around it need another look
+        state = self.state
+        nb = self.nb
+        if state[i] == OPEN:
+            self._push(i)
+        for k in range(i * 8, i * 8 + self.nbc[i]):
+            if state[nb[k]] == OPEN:
+                self._push(nb[k])
+
+    def _push(self, i):
+        if not self._queued[i]:
+            self._queued[i] = 1
+            self.queue.append(i)
+
+    def _set(self, j, s):
+        if self.state[j] != UNKNOWN:
+            return
+        self.state[j] = s
+        if s == SAFE:
+            self.safe.append(j)
+        else:
+            self.mines.append(j)
+        self.found += 1
+        self._touch(j)
+
+    # ---------- Deduction ----------
+    def _constraint(self, i):
+        # (unknown neighbours, mines among them) around the number at i
+        state = self.state
+        nb = self.nb
+        unknown = []
+        need = self.number[i]
+        for k in range(i * 8, i * 8 + self.nbc[i]):
+            s = state[nb[k]]
+            if s == UNKNOWN:
+                unknown.append(nb[k])
+            elif s == MINE:
+                need -= 1
+        return unknown, need
+
+    def _rules(self, i):
+        unknown, need = self._constraint(i)
+        if not unknown:
+            self.frontier.discard(i)
+            return
+        if need == 0 or need == len(unknown):
+            s = SAFE if need == 0 else MINE
+            for j in unknown:
+                self._set(j, s)
+            self.frontier.discard(i)
+            return
+        self.frontier.add(i)
+        # numbers sharing an unknown cell with this one
+        state = self.state
+        nb = self.nb
+        ours = set(unknown)
+        seen = {i}
+        for j in unknown:
+            for k in range(j * 8, j * 8 + self.nbc[j]):
+                b = nb[k]
+                if b in seen or state[b] != OPEN:
+                    continue
+                seen.add(b)
+                other, other_need = self._constraint(b)
+                theirs = set(other)
+                common = ours & theirs
+                # mines in the shared cells: at least lo, at most hi
+                lo = max(0, need - len(ours) + len(common), other_need - len(theirs) + len(common))
+                hi = min(len(common), need, other_need)
+                for cells, n in ((ours - common, need), (theirs - common, other_need)):
+                    if cells and (n == lo or n - hi == len(cells)):
+                        s = SAFE if n == lo else MINE
+                        for c in cells:
+                            self._set(c, s)
+                        return  # our cells changed: we are queued again
+
+    def next_safe(self):
+        """ A proven safe cell that isn't open yet, or None """
+        safe = self.safe
+        while safe:
+            if self.state[safe[-1]] == SAFE:
+                return safe[-1]
+            safe.pop()
+        return None
+
+    def solve(self, exhaustive=True):
+        """ Work through the changed numbers; enumerate the frontier if that
+        proves no safe cell (unless exhaustive is False). Returns the number
+        of cells newly proven. """
+        start = self.found
+        while True:
+            queue = self.queue
+            while queue:
+                i = queue.pop()
+                self._queued[i] = 0
+                self._rules(i)
+            if not exhaustive or self.next_safe() is not None:
+                break
+            before = self.found
+            self._enumerate()
+            if self.found == before:
+                break
+        return self.found - start
+
+    # ---------- Enumeration ----------
+    def _enumerate(self):
+        self.prob = {}
+        groups = self._groups()
+        for cells, cons in groups:
+            if len(cells) <= self.max_enum:
+                self._count(cells, cons)
+
+    def _groups(self):
+        # split the frontier into groups of cells linked through shared numbers
+        cons_of = {}        # unknown cell -> numbers next to it
+        unknowns = {}       # number -> its unknown cells
+        for i in self.frontier:
+            unknown, need = self._constraint(i)
+            if unknown:
+                unknowns[i] = (unknown, need)
+                for j in unknown:
+                    if j in cons_of:
+                        cons_of[j].append(i)
+                    else:
+                        cons_of[j] = [i]
+        groups = []
+        done = set()
+        for start in cons_of:
+            if start in done:
+                continue
+            done.add(start)
+            cells = [start]
+            numbers = set()
+            k = 0
+            while k < len(cells):
+                for i in cons_of[cells[k]]:
+                    if i not in numbers:
+                        numbers.add(i)
+                        for j in unknowns[i][0]:
+                            if j not in done:
+                                done.add(j)
+                                cells.append(j)
+                k += 1
+            groups.append((cells, [unknowns[i] for i in numbers]))
+        return groups
+
+    def _count(self, cells, cons):
+        # count the mine layouts that fit every number, per cell
+        n = len(cells)
+        index = {}
+        for k in range(n):
+            index[cells[k]] = k
+        need = [c[1] for c in cons]
+        left = [len(c[0]) for c in cons]
+        cons_at = [[] for _ in range(n)]
+        for c in range(len(cons)):
+            for j in cons[c][0]:
+                cons_at[index[j]].append(c)
+        assign = bytearray(n)
+        hits = [0] * n
+        total = [0]
+
+        def search(k):
+            if k == n:
+                total[0] += 1
+                for m in range(n):
+                    if assign[m]:
+                        hits[m] += 1
+                return
+            at = cons_at[k]
+            for v in (0, 1):
+                ok = True
+                for c in at:
+                    need[c] -= v
+                    left[c] -= 1
+                    if need[c] < 0 or need[c] > left[c]:
+                        ok = False
+                if ok:
+                    assign[k] = v
+                    search(k + 1)
+                for c in at:
+                    need[c] += v
+                    left[c] += 1
+            assign[k] = 0
+
+        search(0)
+        if not total[0]:
+            return
+        for k in range(n):
+            if hits[k] == 0:
+                self._set(cells[k], SAFE)
+            elif hits[k] == total[0]:
+                self._set(cells[k], MINE)
+            else:
+                self.prob[cells[k]] = hits[k] / total[0]
+
+    # ---------- Whole boards ----------
+    def _flood(self, board, mine, i):
+        # open i like the game does (zeros open their neighbours); returns cells opened
+        opened = 0
+        stack = [i]
+        nb = self.nb
+        while stack:
+            c = stack.pop()
+            if self.state[c] == OPEN or board[c] == mine:
+                continue
+            self.open(c, board[c])
+            opened += 1
+            if board[c] == 0:
+                for k in range(c * 8, c * 8 + self.nbc[c]):
+                    if self.state[nb[k]] != OPEN:
+                        stack.append(nb[k])
+        return opened
+
+    def solvable(self, board, mine, first):
+        """ True if opening first and then only proven safe cells clears the board """
+        self.reset()
+        to_open = 0
+        for i in range(self.cells):
+            if board[i] != mine:
+                to_open += 1
+        opened = self._flood(board, mine, first)
+        while opened < to_open:
+            self.solve()
+            i = self.next_safe()
+            if i is None:
+                return False
+            while i is not None:
+                opened += self._flood(board, mine, i)
+                i = self.next_safe()
+        return True
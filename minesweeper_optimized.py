@@ -1,175 +1,383 @@
 import board
 import busio
-import adafruit_ssd1306
-import digitalio
+from dirty_display import DirtySSD1306_I2C
+from frame_capture import FrameCapture
+from glyph_cache import GlyphCache
+from sprites import Sprite
+from fixed_step import FixedStep
+from heapstats import HeapStats
+from gc_policy import GCPolicy
+from buttons import Buttons
+from recorder import Recorder
+from mines_solver import Solver
 import time
 import random
+import array
+import gc
 
 # I2C接続の設定
 i2c_sda = board.GP2
 i2c_scl = board.GP3
 i2c = busio.I2C(i2c_scl, i2c_sda, frequency=1000000)
 
-# ボタン設定（6つ）
-btns = {
-    "up": digitalio.DigitalInOut(board.GP7),     # 上移動
-    "left": digitalio.DigitalInOut(board.GP6),   # 左移動
-    "down": digitalio.DigitalInOut(board.GP5),   # 下移動
-    "right": digitalio.DigitalInOut(board.GP4),  # 右移動
-    "open": digitalio.DigitalInOut(board.GP14),  # マスを開く
-    "mark": digitalio.DigitalInOut(board.GP15)   # マークをつける
-}
-for btn in btns.values():
-    btn.direction = digitalio.Direction.INPUT
-    btn.pull = digitalio.Pull.UP
+# ボタン設定（6つ、まとめて1回で読む）
+buttons = Buttons((
+    board.GP7,   # 上移動
+    board.GP6,   # 左移動
+    board.GP5,   # 下移動
+    board.GP4,   # 右移動
+    board.GP14,  # マスを開く
+    board.GP15,  # マークをつける（開いたマスで押すとヒント）
+))
+BTN_UP, BTN_LEFT, BTN_DOWN, BTN_RIGHT, BTN_OPEN, BTN_MARK = 1, 2, 4, 8, 16, 32
+# INPUT_RECORD = "/mines.bin" で乱数の種とボタン入力を記録し、INPUT_REPLAY = "/mines.bin" で全速で再生する
+tape = Recorder.from_settings(buttons)
+REPLAY = tape is not None and tape.replaying
 
 # ディスプレイ設定
 display_width = 128
 display_height = 64
-display = adafruit_ssd1306.SSD1306_I2C(display_width, display_height, i2c)
+glyphs = GlyphCache()  # フォントをRAMに読み込んでおく
+glyphs.preload("012345678*o")  # セルに描く文字
+glyphs.preload(("GAME OVER", "CLEAR"))
+capture = FrameCapture.from_settings()  # FRAME_CAPTURE = "/mines.frm" で表示したフレームを差分で記録
+display = DirtySSD1306_I2C(display_width, display_height, i2c, glyphs=glyphs, capture=capture)
 display.fill(0)
 display.show()
 
-# ゲーム設定
+# ゲーム設定（盤面は画面より大きくてもよい。例: 16x16に40個、30x16に99個、40x40に300個）
 GRID_WIDTH = 8      # 横8マス
 GRID_HEIGHT = 8     # 縦8マス
+NUM_MINES = 10      # 地雷の数（最初に開くマスと周り9マスには置かないので、マス数-9まで）
 CELL_SIZE = 8       # 各マスの間隔
 CELL_INNER = 7      # マスの実際のサイズ（7px）
 CURSOR_SIZE = 8     # カーソルのあるマスは8px
-NUM_MINES = 10      # 地雷の数
+VIEW_WIDTH = min(GRID_WIDTH, 8)    # 画面に見えるマス数。カーソルに合わせてスクロールする
+VIEW_HEIGHT = min(GRID_HEIGHT, 8)
+PANEL_X = 70        # 右側の表示（残りの地雷数など）
+NO_GUESS = False    # Trueにすると、運に頼らず最初のマスから解ける盤面になるまで作り直す
+NO_GUESS_TRIES = 100
+
+# セルのスプライト（draw_cellの塗り＋文字を合成したもの）
+# 文字が1px上にはみ出すことがあるので、原点は (px, py-1)
+CELL_UNOPENED = 9
+CELL_MARKED = 10
+# 地雷(MINE)は最後の要素
+
+def make_cell_sprites(size):
+    c = size // 2 - 2  # 文字の中央寄せ
+    box = ("fill", 0, 1, size-1, size-1)
+    sprites = []
+    for ch in "012345678":  # 開いたマス（黒地に数字）
+        sprites.append(Sprite.compose(size, 10, (box + (0,), ("text", glyphs.columns(ch), c, 1 + size//2 - 3, 1))))
+    sprites.append(Sprite.compose(size, 10, (box + (1,),)))  # 未開封
+    sprites.append(Sprite.compose(size, 10, (box + (1,), ("text", glyphs.columns("o"), c, 1 + size//2 - 4, 0))))  # マーク
+    sprites.append(Sprite.compose(size, 10, (box + (0,), ("text", glyphs.columns("*"), c, 1 + size//2 - 3, 1))))  # 地雷
+    return sprites
+
+CELL_SPRITES = {CELL_INNER: make_cell_sprites(CELL_INNER), CURSOR_SIZE: make_cell_sprites(CURSOR_SIZE)}
 
 # UIの開始位置
 UI_OFFSET_Y = 0
 
+# 盤面は1次元（マス番号 i = y*GRID_WIDTH + x）
+CELLS = GRID_WIDTH * GRID_HEIGHT
+MINE = 11  # 地雷。CELL_SPRITESの最後（地雷）の番号と同じ
+
+# 各マスの周りのマス番号: NEIGHBORS[i*8] から NEIGHBOR_COUNT[i] 個（端のマスは少ない）
+NEIGHBORS = array.array("H", [0] * (CELLS * 8))
+NEIGHBOR_COUNT = bytearray(CELLS)
+for _y in range(GRID_HEIGHT):
+    for _x in range(GRID_WIDTH):
+        _i = _y * GRID_WIDTH + _x
+        _n = _i * 8
+        for _dy in (-1, 0, 1):
+            for _dx in (-1, 0, 1):
+                if (_dx or _dy) and 0 <= _x + _dx < GRID_WIDTH and 0 <= _y + _dy < GRID_HEIGHT:
+                    NEIGHBORS[_n] = (_y + _dy) * GRID_WIDTH + _x + _dx
+                    _n += 1
+        NEIGHBOR_COUNT[_i] = _n - _i * 8
+
+def neighbors(i):
+    # NEIGHBORSの中の位置（for k in neighbors(i): j = NEIGHBORS[k]）
+    return range(i * 8, i * 8 + NEIGHBOR_COUNT[i])
+
+# ヒントと作り直しに使う推論エンジン（開いたマスの数字だけから考える）
+solver = Solver(CELLS, NEIGHBORS, NEIGHBOR_COUNT)
+
 # ゲーム変数
 cursor_x, cursor_y = 0, 0  # カーソル位置（初期値0）
-board = [[0 for _ in range(GRID_WIDTH)] for _ in range(GRID_HEIGHT)]
-revealed = [[False for _ in range(GRID_WIDTH)] for _ in range(GRID_HEIGHT)]
-marked = [[False for _ in range(GRID_WIDTH)] for _ in range(GRID_HEIGHT)]
+view_x, view_y = 0, 0      # 画面の左上に見えているマス
+board = bytearray(CELLS)     # 周りの地雷の数、地雷はMINE
+revealed = bytearray(CELLS)  # 1 = 開いた
+marked = bytearray(CELLS)    # 1 = マーク付き
+mines_placed = False       # 地雷は最初にマスを開いたときに置く
+mine_count = NUM_MINES     # 実際に置いた地雷の数（置ける場所が足りないとNUM_MINESより少ない）
+revealed_count = 0
+marked_count = 0
+hint_text = ""             # 右側に出しているヒント
 game_over = False
 
 # 地雷配置と各セルの数字計算
-def place_mines():
-    mines = set()
-    while len(mines) < NUM_MINES:
-        x, y = random.randint(0, GRID_WIDTH-1), random.randint(0, GRID_HEIGHT-1)
-        if (x, y) not in mines:
-            mines.add((x, y))
-            board[y][x] = -1  # 地雷を -1 とする
-
-    for y in range(GRID_HEIGHT):
-        for x in range(GRID_WIDTH):
-            if board[y][x] == -1:
-                continue
-            count = sum(
-                1 for dy in (-1, 0, 1) for dx in (-1, 0, 1)
-                if (0 <= x+dx < GRID_WIDTH and 0 <= y+dy < GRID_HEIGHT and board[y+dy][x+dx] == -1)
-            )
-            board[y][x] = count
+def place_mines(safe):
+    tries = NO_GUESS_TRIES if NO_GUESS else 1
+    start = time.monotonic()
+    for n in range(1, tries + 1):
+        if n > 1:
+            gc.collect()  # 初クリックはプレイ中なので、前の盤面を調べたゴミを試行ごとに回収する
+        shuffle_mines(safe)
+        if not NO_GUESS or solver.solvable(board, MINE, safe):
+            break
+    if NO_GUESS:
+        print("no-guess board: %d tries, %.2fs" % (n, time.monotonic() - start))
+    solver.reset()  # ここからはプレイヤーが開いたマスだけを教える
+
+def shuffle_mines(safe):
+    # 最初に開いたマスsafeとその周りを除いたマスを部分的にシャッフルし、
+    # 先頭のNUM_MINES個を地雷にする（引き直しがないので盤面が大きくても速い）
+    global mine_count
+    for i in range(CELLS):
+        board[i] = 0
+    excluded = bytearray(CELLS)
+    excluded[safe] = 1
+    for k in neighbors(safe):
+        excluded[NEIGHBORS[k]] = 1
+    candidates = array.array("H", [i for i in range(CELLS) if not excluded[i]])
+    n = len(candidates)
+    count = min(NUM_MINES, n)
+    mine_count = count
+    for k in range(count):
+        j = random.randint(k, n - 1)
+        candidates[k], candidates[j] = candidates[j], candidates[k]
+        board[candidates[k]] = MINE
+
+    # 地雷の周りのマスだけ数を足す
+    for k in range(count):
+        for kk in neighbors(candidates[k]):
+            j = NEIGHBORS[kk]
+            if board[j] != MINE:
+                board[j] += 1
+
+def scroll_to_cursor():
+    # カーソルが画面の外に出たら見える範囲をずらす。ずらしたらTrue
+    global view_x, view_y
+    old = (view_x, view_y)
+    if cursor_x < view_x:
+        view_x = cursor_x
+    elif cursor_x >= view_x + VIEW_WIDTH:
+        view_x = cursor_x - VIEW_WIDTH + 1
+    if cursor_y < view_y:
+        view_y = cursor_y
+    elif cursor_y >= view_y + VIEW_HEIGHT:
+        view_y = cursor_y - VIEW_HEIGHT + 1
+    return (view_x, view_y) != old
 
 def move_cursor(new_cursor_x, new_cursor_y):
     global cursor_x, cursor_y
 
     # カーソルのあったマスは元のサイズにする
-    size = CELL_INNER
-    px, py = cursor_x * CELL_SIZE+1, cursor_y * CELL_SIZE + UI_OFFSET_Y
-    display.fill_rect(px-1, py, CURSOR_SIZE, CURSOR_SIZE, 0)
-    draw_cell(cursor_x, cursor_y,px, py, size)
-
+    old_x, old_y = cursor_x, cursor_y
     cursor_x = new_cursor_x
     cursor_y = new_cursor_y
+    if scroll_to_cursor():
+        draw_view()  # 見える範囲が変わったら、見えるマスだけ全部描き直す
+        return
+    redraw_cell(old_x, old_y)
 
     # カーソルのあるマスは少し大きくする
-    size = CURSOR_SIZE
-    px, py = cursor_x * CELL_SIZE, cursor_y * CELL_SIZE + UI_OFFSET_Y
-    draw_cell(cursor_x, cursor_y, px, py, size)
+    redraw_cell(cursor_x, cursor_y)
 
-    display.show()
+def redraw_cell(x, y):
+    # 8x8の枠を消してから、そのマスだけ描き直す（カーソルなら大きめ）。画面の外なら何もしない
+    sx = x - view_x
+    sy = y - view_y
+    if not (0 <= sx < VIEW_WIDTH and 0 <= sy < VIEW_HEIGHT):
+        return
+    display.fill_rect(sx * CELL_SIZE, sy * CELL_SIZE + UI_OFFSET_Y, CELL_SIZE, CELL_SIZE, 0)
+    if x == cursor_x and y == cursor_y:
+        draw_cell(y * GRID_WIDTH + x, sx * CELL_SIZE, sy * CELL_SIZE + UI_OFFSET_Y, CURSOR_SIZE)
+    else:
+        draw_cell(y * GRID_WIDTH + x, sx * CELL_SIZE + 1, sy * CELL_SIZE + UI_OFFSET_Y, CELL_INNER)
 
-def draw_cell(x, y, px, py, size):
-    # セルが開かれている場合（背景を黒にして数字を中央に表示）
-    if revealed[y][x]:
-        display.fill_rect(px, py, size-1, size-1, 0)
-        text_x = px + (size // 2) - 2  # 中央寄せ
-        text_y = py + (size // 2) - 3  # 中央寄せ
-        if board[y][x] == -1:
-            display.text("*", text_x, text_y, 1)  # 地雷（中央）
-        else:
-            display.text(str(board[y][x]), text_x, text_y, 1)  # 数字（中央）
-    elif marked[y][x]:
-        display.fill_rect(px, py, size-1, size-1, 1)
-        text_x = px + (size // 2) - 2  # 中央寄せ
-        text_y = py + (size // 2) - 4  # 中央寄せ
-        display.text("o", text_x, text_y, 0)  # マーク付き（中央）
+def draw_cell(i, px, py, size):
+    # セルが開かれている場合（黒地に数字）、マーク付き、未開封
+    if revealed[i]:
+        kind = board[i]  # 地雷は MINE
+    elif marked[i]:
+        kind = CELL_MARKED
     else:
-        display.fill_rect(px, py, size-1, size-1, 1)  # 未開封のマス
+        kind = CELL_UNOPENED
+    CELL_SPRITES[size][kind].put(display, px, py - 1)
+
+def draw_view():
+    # 見えている範囲のマスを描く
+    display.fill_rect(0, UI_OFFSET_Y, VIEW_WIDTH * CELL_SIZE, VIEW_HEIGHT * CELL_SIZE, 0)
+    for y in range(view_y, view_y + VIEW_HEIGHT):
+        for x in range(view_x, view_x + VIEW_WIDTH):
+            redraw_cell(x, y)
+    if VIEW_WIDTH < GRID_WIDTH or VIEW_HEIGHT < GRID_HEIGHT:
+        draw_position()
+
+def draw_mines_left():
+    display.fill_rect(PANEL_X, 0, display_width - PANEL_X, 8, 0)
+    display.text(f"M:{mine_count - marked_count}", PANEL_X, 0, 1)
+
+def draw_hint(text):
+    global hint_text
+    hint_text = text
+    display.fill_rect(PANEL_X, 40, display_width - PANEL_X, 8, 0)
+    display.text(text, PANEL_X, 40, 1)
+
+def draw_position():
+    # 盤面が画面より大きいときは、見えている範囲の左上を表示する
+    display.fill_rect(PANEL_X, 10, display_width - PANEL_X, 8, 0)
+    display.text(f"{view_x},{view_y}", PANEL_X, 10, 1)
 
 # 画面更新
 def update_display():
     display.fill(0)
 
-    # 各セル描画（画面全体を使う）
-    for y in range(GRID_HEIGHT):
-        for x in range(GRID_WIDTH):
-            px, py = x * CELL_SIZE + 1, y * CELL_SIZE + UI_OFFSET_Y  # 隙間を作るための調整
-
-            # カーソルのあるマスは少し大きくする
-            if x == cursor_x and y == cursor_y:
-                size = CURSOR_SIZE
-                px, py = x * CELL_SIZE, y * CELL_SIZE + UI_OFFSET_Y  # カーソルは1px大きめ
-            else:
-                size = CELL_INNER
-
-            draw_cell(x, y, px, py, size)
+    # 各セル描画（見えている範囲）と右側の表示
+    draw_view()
+    draw_mines_left()
+    if hint_text:
+        draw_hint(hint_text)
 
     # ゲームオーバー表示
     if game_over:
-        display.text("GAME OVER", 70, 24, 1)  # 画面右中央に表示
+        display.text("GAME OVER", PANEL_X, 24, 1)  # 画面右中央に表示
+    elif mines_placed and revealed_count == CELLS - mine_count:
+        display.text("CLEAR", PANEL_X, 24, 1)
 
     display.show()
 
-# セルを開く
+# セルを開く（0のマスは周りもまとめて開く）
 def reveal_cell(x, y):
-    global game_over
-    if revealed[y][x] or marked[y][x]:
+    global game_over, mines_placed, revealed_count
+    i = y * GRID_WIDTH + x
+    if revealed[i] or marked[i]:
         return
-    revealed[y][x] = True
-    if board[y][x] == -1:
+    if not mines_placed:
+        place_mines(i)  # 最初に開くマスは必ず安全
+        mines_placed = True
+        draw_mines_left()  # 実際に置けた地雷の数で表示し直す
+    revealed[i] = 1
+    opened = [i]
+    if board[i] == MINE:
         game_over = True
+    elif board[i] == 0:
+        # 再帰しないように、スタックで0の領域を広げる
+        stack = [i]
+        while stack:
+            c = stack.pop()
+            for k in neighbors(c):
+                j = NEIGHBORS[k]
+                if not revealed[j] and not marked[j]:
+                    revealed[j] = 1
+                    opened.append(j)
+                    if board[j] == 0:
+                        stack.append(j)
+    revealed_count += len(opened)
+    if hint_text:
+        draw_hint("")  # 開いたらヒントは消す
+    if not game_over:
+        for c in opened:
+            solver.open(c, board[c])
+
+    # 開いたマスのうち、見えているものだけ描き直す（送るのはメインループで1回だけ）
+    for c in opened:
+        redraw_cell(c % GRID_WIDTH, c // GRID_WIDTH)
+    if game_over:
+        display.text("GAME OVER", PANEL_X, 24, 1)  # 画面右中央に表示
+        if heap is not None:  # HEAP_STATS = 1 のときだけ診断を表示する
+            print(pacer.report())
+            print(policy.report())
+            print(heap.report())
+    elif revealed_count == CELLS - mine_count:
+        display.text("CLEAR", PANEL_X, 24, 1)
+    if tape is not None and (game_over or revealed_count == CELLS - mine_count):
+        tape.flush()
+        print(tape.report())
+    if capture is not None and (game_over or revealed_count == CELLS - mine_count):
+        capture.flush()
+        print(capture.report())
 
-    update_display()
+# ヒント: 開けて安全なマスにカーソルを動かす。無ければ確実な地雷にマークし、
+# それも無ければ地雷の確率が一番低いマスを教える
+def hint():
+    global marked_count
+    solver.solve()
+    i = solver.next_safe()
+    if i is not None:
+        move_cursor(i % GRID_WIDTH, i // GRID_WIDTH)
+        draw_hint("SAFE")
+        return
+    flagged = 0
+    for j in solver.mines:
+        if not marked[j]:
+            marked[j] = 1
+            marked_count += 1
+            flagged += 1
+            redraw_cell(j % GRID_WIDTH, j // GRID_WIDTH)
+    if flagged:
+        draw_mines_left()
+        draw_hint(f"FLAG {flagged}")
+        return
+    best = None
+    for j, p in solver.prob.items():
+        if not marked[j] and (best is None or p < solver.prob[best]):
+            best = j
+    if best is None:
+        draw_hint("?")
+        return
+    move_cursor(best % GRID_WIDTH, best // GRID_WIDTH)
+    draw_hint(f"{int(solver.prob[best] * 100)}%")
 
-# マークのトグル
+# マークのトグル（開いたマスではヒント）
 def toggle_mark(x, y):
-    if revealed[y][x]:
+    global marked_count
+    i = y * GRID_WIDTH + x
+    if revealed[i]:
+        if not game_over:
+            hint()
         return
-    marked[y][x] = not marked[y][x]
+    marked[i] ^= 1
+    marked_count += 1 if marked[i] else -1
 
-    update_display()
+    redraw_cell(x, y)
+    draw_mines_left()
 
-# 初期化
-place_mines()
+# 初期化（地雷は最初にマスを開いたときに置く）
 update_display()
 
-# メインループ
+# メインループ（0.05秒ごとに入力を処理し、変化があれば1回だけ送る）
+heap = HeapStats.from_settings()  # HEAP_STATS = 1 でフレームごとのメモリ確保量を記録
+policy = GCPolicy()  # プレイ中の回収を入力待ちの間に移す
+pacer = FixedStep(0.05, heap=heap, gc_policy=policy, fast=REPLAY)
+policy.play()
 while True:
-    # 上ボタン
-    if not btns["up"].value:
-        move_cursor(cursor_x, (cursor_y - 1) % GRID_HEIGHT)  # 端に着いたらループ
-    # 下ボタン
-    if not btns["down"].value:
-        move_cursor(cursor_x, (cursor_y + 1) % GRID_HEIGHT)  # 端に着いたらループ
-    # 左ボタン
-    if not btns["left"].value:
-        move_cursor((cursor_x - 1) % GRID_WIDTH, cursor_y)  # 端に着いたらループ
-    # 右ボタン
-    if not btns["right"].value:
-        move_cursor((cursor_x + 1) % GRID_WIDTH, cursor_y)  # 端に着いたらループ
-    # マスを開くボタン
-    if not btns["open"].value:
-        reveal_cell(cursor_x, cursor_y)
-    # マークボタン
-    if not btns["mark"].value:
-        toggle_mark(cursor_x, cursor_y)
-
-    time.sleep(0.05)
+    for _ in range(pacer.ticks()):
+        # 押している間と、前回から押して離したボタン
+        keys = buttons.poll() | buttons.pressed
+        if not keys:
+            policy.idle()  # 入力待ち（必要なときだけ回収する）
+        # 上ボタン
+        if keys & BTN_UP:
+            move_cursor(cursor_x, (cursor_y - 1) % GRID_HEIGHT)  # 端に着いたらループ
+        # 下ボタン
+        if keys & BTN_DOWN:
+            move_cursor(cursor_x, (cursor_y + 1) % GRID_HEIGHT)  # 端に着いたらループ
+        # 左ボタン
+        if keys & BTN_LEFT:
+            move_cursor((cursor_x - 1) % GRID_WIDTH, cursor_y)  # 端に着いたらループ
+        # 右ボタン
+        if keys & BTN_RIGHT:
+            move_cursor((cursor_x + 1) % GRID_WIDTH, cursor_y)  # 端に着いたらループ
+        # マスを開くボタン
+        if keys & BTN_OPEN:
+            reveal_cell(cursor_x, cursor_y)
+        # マークボタン（押した瞬間だけ。押しっぱなしでヒントの移動先にマークしない）
+        if buttons.pressed & BTN_MARK:
+            toggle_mark(cursor_x, cursor_y)
+    if pacer.render_due():
+        display.show()
@@ -1,29 +1,40 @@
 import board
 import busio
-import adafruit_ssd1306
-import digitalio
-import time
+from dirty_display import DirtySSD1306_I2C
+from frame_capture import FrameCapture
+from glyph_cache import GlyphCache
+from sprites import Sprite
+from fixed_step import FixedStep
+from heapstats import HeapStats
+from gc_policy import GCPolicy
+from buttons import Buttons
+from pong_ai import PongAI
+from sfx import SoundFX
+from tone_bank import TRIANGLE
 
 # Set up I2C connection
 i2c_sda = board.GP2
 i2c_scl = board.GP3
 i2c = busio.I2C(i2c_scl, i2c_sda, frequency=1000000)
 
-# Set up buttons
-btns = {
-    "p1_up": digitalio.DigitalInOut(board.GP7),
-    "p1_down": digitalio.DigitalInOut(board.GP6),
-    "p2_up": digitalio.DigitalInOut(board.GP4),
-    "p2_down": digitalio.DigitalInOut(board.GP5)
-}
-for btn in btns.values():
-    btn.direction = digitalio.Direction.INPUT
-    btn.pull = digitalio.Pull.UP
+# Set up buttons (read together once per tick as a bitmask)
+buttons = Buttons((board.GP7, board.GP6, board.GP4, board.GP5))
+P1_UP, P1_DOWN, P2_UP, P2_DOWN = 1, 2, 4, 8
+CPU_PLAYER = 0  # 1 or 2: the computer plays that paddle (single player), 0: two players
+
+# Sound effects on GP12, mixed: a wall bounce doesn't cut off a paddle hit
+sfx = SoundFX(board.GP12)
+SFX_PADDLE = sfx.tone(880, 0.03)
+SFX_WALL = sfx.tone(440, 0.02, level=0.25)
+SFX_POINT = sfx.tone(660, 0.3, TRIANGLE, end=220)
 
 # Set up display
 display_width = 128
 display_height = 64
-display = adafruit_ssd1306.SSD1306_I2C(display_width, display_height, i2c)
+glyphs = GlyphCache()  # font in RAM: score redraws don't read flash
+glyphs.preload(("P1: 0", "P2: 0"))
+capture = FrameCapture.from_settings()  # FRAME_CAPTURE = "/pong.frm": every frame shown, as deltas
+display = DirtySSD1306_I2C(display_width, display_height, i2c, glyphs=glyphs, capture=capture)
 display.fill(0)
 display.show()
 
@@ -31,14 +42,41 @@ display.show()
 paddle_height = 10
 paddle_width = 5
 ball_size = 4
+BALL = Sprite.compose(ball_size, ball_size, (("fill", 0, 0, ball_size, ball_size, 1),))
 p1_y = (display_height - 20 ) // 2 + 20
 p2_y = (display_height - 20) // 2 + 20
-ball_x = display_width // 2
+ball_x = display_width // 2   # pixel position the ball is drawn at
 ball_y = (display_height - 20) // 2 + 20
-ball_dx = 1
-ball_dy = 1
+
+# Ball physics in Q8.8 fixed point (1 px = 256): any speed and angle, not
+# just whole pixels per tick. Ranges are for the ball's top-left corner.
+FIX = 8
+ONE = 1 << FIX
+TOP = 20 * ONE
+BOTTOM = (display_height - ball_size) * ONE
+SPAN = BOTTOM - TOP
+LEFT = paddle_width * ONE                                # at player 1's paddle face
+RIGHT = (display_width - paddle_width - ball_size) * ONE  # at player 2's paddle face
+SERVE = ONE                    # 1 px per tick each way, as the old integer ball
+SPEEDUP = 17                   # each return multiplies the speed by SPEEDUP/16
+MAX_SPEED = 4 * ONE            # px per tick (the paddle test is swept, so no tunnelling)
+MIN_VY = ONE // 4              # px per tick up or down at least after a return (never flat)
+ball_fx = ball_x * ONE
+ball_fy = ball_y * ONE
+ball_vx = SERVE
+ball_vy = SERVE
 score1 = 0
 score2 = 0
+cpu = None
+if CPU_PLAYER:
+    cpu = PongAI(LEFT if CPU_PLAYER == 1 else RIGHT, TOP, BOTTOM,
+                 *((P1_UP, P1_DOWN) if CPU_PLAYER == 1 else (P2_UP, P2_DOWN)),
+                 one=ONE, paddle_height=paddle_height, ball_size=ball_size,
+                 paddle_bottom=display_height - paddle_height)
+TICK = 0.01  # one logic step (ball moves 1px) every 10ms, whatever show() costs
+heap = HeapStats.from_settings()  # HEAP_STATS = 1: bytes allocated per frame
+policy = GCPolicy()  # collections on points scored, not mid-rally
+pacer = FixedStep(TICK, heap=heap, gc_policy=policy)
 
 def init_board():
     display.fill(0)
@@ -48,76 +86,143 @@ def init_board():
     display.fill_rect(0, p1_y, paddle_width, paddle_height, 1)  # Draw player 1 paddle
     display.fill_rect(display_width - paddle_width, p2_y, paddle_width, paddle_height, 1)  # Draw player 2 paddle
 
+def fold(y, vy):
+    # fold a straight path back between the walls: each wall it went past
+    # mirrors the position and flips the direction
+    y = (y - TOP) % (2 * SPAN)
+    if y > SPAN:
+        return TOP + 2 * SPAN - y, -vy
+    return TOP + y, vy
+
+def paddle_hit(paddle_y, y):
+    # same reach as the old point test: any overlap with the paddle rows
+    return (paddle_y - ball_size) * ONE <= y <= (paddle_y + paddle_height) * ONE
+
+def returned(speed, paddle_y, y, vy):
+    # faster after every return, and steeper the further from the paddle
+    # centre it hits (8px off centre = 45 degrees). A hit at (or next to)
+    # the centre keeps the incoming vertical direction at MIN_VY, or the
+    # ball would go back and forth on one row for ever
+    speed = min(speed * SPEEDUP // 16, MAX_SPEED)
+    offset = (y + ball_size * ONE // 2) - (paddle_y * ONE + paddle_height * ONE // 2)
+    nvy = offset * speed // (8 * ONE)
+    if -MIN_VY < nvy < MIN_VY:
+        nvy = MIN_VY if vy >= 0 else -MIN_VY
+    return speed, nvy
+
 def update_ball():
-    global ball_x, ball_y, ball_dx, ball_dy, score1, score2
-    display.fill_rect(ball_x, ball_y, ball_size, ball_size, 0)  # Remove ball
-
-    # Progress one frame
-    ball_x += ball_dx
-    ball_y += ball_dy
-
-    # Update scores if needed
-    if ball_x < paddle_width:
-        score2 += 1
-        reset_ball()
-    elif ball_x > display_width - paddle_width - ball_size :
-        score1 += 1
-        reset_ball()
-    else:
-        # Flip the speed if needed
-        if ball_y <= 20 or ball_y >= display_height - ball_size:
-            ball_dy *= -1
-
-        if ball_x <= paddle_width and p1_y - ball_size <= ball_y <= p1_y + paddle_height:
-            ball_dx *= -1
-        elif ball_x >= display_width - paddle_width - ball_size and p2_y - ball_size <= ball_y <= p2_y + paddle_height:
-            ball_dx *= -1
-
-    display.fill_rect(ball_x, ball_y, ball_size, ball_size, 1)  # Draw ball
-    display.show()
+    global ball_fx, ball_fy, ball_vx, ball_vy, score1, score2
+
+    # Progress one tick along a straight line, folded at the walls
+    x, y, vx, vy = ball_fx, ball_fy, ball_vx, ball_vy
+    nx = x + vx
+    ny, nvy = fold(y + vy, vy)
+
+    # Swept paddle test: the row where the path crosses the paddle face
+    if vx < 0 and nx <= LEFT:
+        cy, cvy = fold(y + vy * (x - LEFT) // -vx, vy)
+        if not paddle_hit(p1_y, cy):
+            score2 += 1
+            sfx.trigger(SFX_POINT)
+            reset_ball()
+            return
+        rest = LEFT - nx  # what is left of this tick's move, bounced back
+        speed, nvy = returned(-vx, p1_y, cy, cvy)
+        nx = LEFT + rest * speed // -vx
+        ny, nvy = fold(cy + rest * nvy // -vx, nvy)
+        vx = speed
+        sfx.trigger(SFX_PADDLE)
+    elif vx > 0 and nx >= RIGHT:
+        cy, cvy = fold(y + vy * (RIGHT - x) // vx, vy)
+        if not paddle_hit(p2_y, cy):
+            score1 += 1
+            sfx.trigger(SFX_POINT)
+            reset_ball()
+            return
+        rest = nx - RIGHT
+        speed, nvy = returned(vx, p2_y, cy, cvy)
+        nx = RIGHT - rest * speed // vx
+        ny, nvy = fold(cy + rest * nvy // vx, nvy)
+        vx = -speed
+        sfx.trigger(SFX_PADDLE)
+    elif nvy != vy:
+        sfx.trigger(SFX_WALL)
+
+    ball_fx, ball_fy, ball_vx, ball_vy = nx, ny, vx, nvy
+    move_ball(nx >> FIX, ny >> FIX)
+
+def move_ball(x, y):
+    # erase and redraw the 4x4 box only when it lands on another pixel
+    global ball_x, ball_y
+    if x != ball_x or y != ball_y:
+        BALL.erase(display, ball_x, ball_y)
+        ball_x, ball_y = x, y
+        BALL.draw(display, ball_x, ball_y)
 
 def reset_ball():
-    global ball_x, ball_y
-    ball_x = display_width // 2
-    ball_y = (display_height - 20) // 2 + 20
+    # serve from the centre at the starting speed, same directions as before
+    global ball_fx, ball_fy, ball_vx, ball_vy
+    ball_fx = (display_width // 2) * ONE
+    ball_fy = ((display_height - 20) // 2 + 20) * ONE
+    ball_vx = SERVE if ball_vx > 0 else -SERVE
+    ball_vy = SERVE if ball_vy >= 0 else -SERVE
+    move_ball(ball_fx >> FIX, ball_fy >> FIX)
+    if cpu is not None:
+        cpu.forget()
 
     display.fill_rect(1, 1, display_width-2, 20-2, 0)  # Remove texts
     display.text(f"P1: {score1}", 5, 5, 1)
     display.text(f"P2: {score2}", display_width - 32, 5, 1)
+    policy.idle()  # the ball is back in the middle: nothing moves fast
 
 # Main game loop
 init_board()
-while True:
-    if not btns["p1_up"].value:
-        old_p1_y = p1_y
-        p1_y = max(20, p1_y - 1)
-        if old_p1_y != p1_y:
-            # one-up'd
-            display.fill_rect(0, p1_y, paddle_width, 1, 1)
-            display.fill_rect(0, p1_y+paddle_height, paddle_width, 1, 0)
-    elif not btns["p1_down"].value:
-        old_p1_y = p1_y
-        p1_y = min(display_height - paddle_height, p1_y + 1)
-        if old_p1_y != p1_y:
-            # one-down'd
-            display.fill_rect(0, old_p1_y, paddle_width, 1, 0)
-            display.fill_rect(0, old_p1_y+paddle_height, paddle_width, 1, 1)
-
-
-    if not btns["p2_up"].value:
-        old_p2_y = p2_y
-        p2_y = max(20, p2_y - 1)
-        if old_p2_y != p2_y:
-            # one-up'd
-            display.fill_rect(display_width - paddle_width, p2_y, paddle_width, 1, 1)
-            display.fill_rect(display_width - paddle_width, p2_y+paddle_height, paddle_width, 1, 0)
-    elif not btns["p2_down"].value:
-        old_p2_y = p2_y
-        p2_y = min(display_height - paddle_height, p2_y + 1)
-        if old_p2_y != p2_y:
-            # one-down'd
-            display.fill_rect(display_width - paddle_width, old_p2_y, paddle_width, 1, 0)
-            display.fill_rect(display_width - paddle_width, old_p2_y+paddle_height, paddle_width, 1, 1)
-
-    update_ball()
-    time.sleep(0.008)
+policy.play()
+pacer.reset()
+try:
+    while True:
+        for _ in range(pacer.ticks()):
+            held = buttons.poll()
+            if cpu is not None:
+                cpu_y = p1_y if CPU_PLAYER == 1 else p2_y
+                held = held & ~cpu.bits | cpu.poll(ball_fx, ball_fy, ball_vx, ball_vy, cpu_y)
+            if held & P1_UP:
+                old_p1_y = p1_y
+                p1_y = max(20, p1_y - 1)
+                if old_p1_y != p1_y:
+                    # one-up'd
+                    display.fill_rect(0, p1_y, paddle_width, 1, 1)
+                    display.fill_rect(0, p1_y+paddle_height, paddle_width, 1, 0)
+            elif held & P1_DOWN:
+                old_p1_y = p1_y
+                p1_y = min(display_height - paddle_height, p1_y + 1)
+                if old_p1_y != p1_y:
+                    # one-down'd
+                    display.fill_rect(0, old_p1_y, paddle_width, 1, 0)
+                    display.fill_rect(0, old_p1_y+paddle_height, paddle_width, 1, 1)
+
+
+            if held & P2_UP:
+                old_p2_y = p2_y
+                p2_y = max(20, p2_y - 1)
+                if old_p2_y != p2_y:
+                    # one-up'd
+                    display.fill_rect(display_width - paddle_width, p2_y, paddle_width, 1, 1)
+                    display.fill_rect(display_width - paddle_width, p2_y+paddle_height, paddle_width, 1, 0)
+            elif held & P2_DOWN:
+                old_p2_y = p2_y
+                p2_y = min(display_height - paddle_height, p2_y + 1)
+                if old_p2_y != p2_y:
+                    # one-down'd
+                    display.fill_rect(display_width - paddle_width, old_p2_y, paddle_width, 1, 0)
+                    display.fill_rect(display_width - paddle_width, old_p2_y+paddle_height, paddle_width, 1, 1)
+
+            update_ball()
+        if pacer.render_due():
+            display.show()
+finally:
+    # Ctrl-C (or the end of a host run): the stats once, not at every point
+    if heap is not None:
+        print(pacer.report())
+        print(policy.report())
+        print(heap.report())
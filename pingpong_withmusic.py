@@ -1,34 +1,31 @@
 import board
 import busio
-import adafruit_ssd1306
-import digitalio
-import time
+from dirty_display import DirtySSD1306_I2C
+from frame_capture import FrameCapture
+from buttons import Buttons
+from pong_ai import PongAI
+from tone_bank import ToneBank, SQUARE
+from sequencer import Sequencer
+from sfx import SoundFX
+from heapstats import HeapStats
+from gc_policy import GCPolicy
 import asyncio
-import audiocore
-import audiopwmio
-import array
-import math
 
 # Set up I2C connection
 i2c_sda = board.GP2
 i2c_scl = board.GP3
 i2c = busio.I2C(i2c_scl, i2c_sda, frequency=1000000)
 
-# Set up buttons
-btns = {
-    "p1_up": digitalio.DigitalInOut(board.GP7),
-    "p1_down": digitalio.DigitalInOut(board.GP6),
-    "p2_up": digitalio.DigitalInOut(board.GP4),
-    "p2_down": digitalio.DigitalInOut(board.GP5)
-}
-for btn in btns.values():
-    btn.direction = digitalio.Direction.INPUT
-    btn.pull = digitalio.Pull.UP
+# Set up buttons (read together once per loop as a bitmask)
+buttons = Buttons((board.GP7, board.GP6, board.GP4, board.GP5))
+P1_UP, P1_DOWN, P2_UP, P2_DOWN = 1, 2, 4, 8
+CPU_PLAYER = 0  # 1 or 2: the computer plays that paddle (single player), 0: two players
 
 # Set up display
 display_width = 128
 display_height = 64
-display = adafruit_ssd1306.SSD1306_I2C(display_width, display_height, i2c)
+capture = FrameCapture.from_settings()  # FRAME_CAPTURE = "/pong.frm": every frame shown, as deltas
+display = DirtySSD1306_I2C(display_width, display_height, i2c, capture=capture)
 display.fill(0)
 display.show()
 
@@ -44,23 +41,27 @@ ball_dx = 1
 ball_dy = 1
 score1 = 0
 score2 = 0
-
-# Speaker setup
-speaker = audiopwmio.PWMAudioOut(board.GP12)
-
-def generate_sine_wave(frequency, sample_rate=8000, duration=1):
-    length = sample_rate // frequency
-    sine_wave = array.array("H", [0] * length)
-    for i in range(length):
-        sine_wave[i] = int(math.sin(2 * math.pi * i / length) * 32767 + 32767)
-    sample = audiocore.RawSample(sine_wave, sample_rate=sample_rate)
-    return sample
-
-async def play_music():
-    sample = generate_sine_wave(440)
-    speaker.play(sample, loop=True)
-    await asyncio.sleep(1)
-    speaker.stop()
+heap = HeapStats.from_settings()  # HEAP_STATS = 1: bytes allocated per loop
+policy = GCPolicy()  # collections on points scored, not mid-rally
+cpu = None
+if CPU_PLAYER:
+    cpu = PongAI(paddle_width if CPU_PLAYER == 1 else display_width - paddle_width - ball_size,
+                 20, display_height - ball_size,
+                 *((P1_UP, P1_DOWN) if CPU_PLAYER == 1 else (P2_UP, P2_DOWN)),
+                 paddle_height=paddle_height, ball_size=ball_size,
+                 paddle_bottom=display_height - paddle_height)
+
+# Speaker setup: voice 0 of the mixer plays the music, the others effects
+tones = ToneBank(sample_rate=8000, max_tones=24)
+sfx = SoundFX(board.GP12, voices=3, reserved=1, tones=tones)
+SFX_PADDLE = sfx.tone(880, 0.03, level=0.4)
+SFX_WALL = sfx.tone(440, 0.02, level=0.2)
+sfx.voice(0).level = 0.4  # leaves room for two effects on top without clipping
+music = Sequencer(sfx.voice(0), tones)  # tunes parsed here, not when a point is scored
+MUSIC = True  # background tune; False: only the point jingle
+THEME = music.rtttl("theme:d=8,o=5,b=150:c,e,g,e,f,a,c6,a,g,e,c,e,4d,4p,"
+                    "c,e,g,e,f,a,c6,a,b,g,d6,b,4c6,4p")
+POINT = music.rtttl("point:d=16,o=6,b=200:c,e,g,8c7", SQUARE)
 
 def init_board():
     display.fill(0)
@@ -81,58 +82,73 @@ def update_ball():
     # Update scores if needed
     if ball_x < paddle_width:
         score2 += 1
-        asyncio.create_task(play_music())
+        music.play(POINT, priority=1)  # over the theme, which then goes on
         reset_ball()
     elif ball_x > display_width - paddle_width - ball_size:
         score1 += 1
-        asyncio.create_task(play_music())
+        music.play(POINT, priority=1)  # over the theme, which then goes on
         reset_ball()
     else:
         # Flip the speed if needed
         if ball_y <= 20 or ball_y >= display_height - ball_size:
             ball_dy *= -1
+            sfx.trigger(SFX_WALL)
 
         if ball_x <= paddle_width and p1_y - ball_size <= ball_y <= p1_y + paddle_height:
             ball_dx *= -1
+            sfx.trigger(SFX_PADDLE)
         elif ball_x >= display_width - paddle_width - ball_size and p2_y - ball_size <= ball_y <= p2_y + paddle_height:
             ball_dx *= -1
+            sfx.trigger(SFX_PADDLE)
 
     display.fill_rect(ball_x, ball_y, ball_size, ball_size, 1)  # Draw ball
-    display.show()
+    display.request_show()  # sent by the flusher task, page by page
 
 def reset_ball():
     global ball_x, ball_y
     ball_x = display_width // 2
     ball_y = (display_height - 20) // 2 + 20
+    if cpu is not None:
+        cpu.forget()
 
     display.fill_rect(1, 1, display_width-2, 20-2, 0)  # Remove texts
     display.text(f"P1: {score1}", 5, 5, 1)
     display.text(f"P2: {score2}", display_width - 32, 5, 1)
+    policy.idle()  # the ball is back in the middle: nothing moves fast
 
 async def game_loop():
     global p1_y, p2_y
+    asyncio.create_task(display.flusher())  # I2C transfer runs between our awaits
+    asyncio.create_task(music.run())
+    if MUSIC:
+        music.play(THEME, loop=True)
     init_board()
+    policy.play()
     while True:
-        if not btns["p1_up"].value:
+        held = buttons.poll()
+        if cpu is not None:
+            cpu_y = p1_y if CPU_PLAYER == 1 else p2_y
+            held = held & ~cpu.bits | cpu.poll(ball_x, ball_y, ball_dx, ball_dy, cpu_y)
+        if held & P1_UP:
             old_p1_y = p1_y
             p1_y = max(20, p1_y - 1)
             if old_p1_y != p1_y:
                 display.fill_rect(0, p1_y, paddle_width, 1, 1)
                 display.fill_rect(0, p1_y + paddle_height, paddle_width, 1, 0)
-        elif not btns["p1_down"].value:
+        elif held & P1_DOWN:
             old_p1_y = p1_y
             p1_y = min(display_height - paddle_height, p1_y + 1)
             if old_p1_y != p1_y:
                 display.fill_rect(0, old_p1_y, paddle_width, 1, 0)
                 display.fill_rect(0, old_p1_y + paddle_height, paddle_width, 1, 1)
 
-        if not btns["p2_up"].value:
+        if held & P2_UP:
             old_p2_y = p2_y
             p2_y = max(20, p2_y - 1)
             if old_p2_y != p2_y:
                 display.fill_rect(display_width - paddle_width, p2_y, paddle_width, 1, 1)
                 display.fill_rect(display_width - paddle_width, p2_y + paddle_height, paddle_width, 1, 0)
-        elif not btns["p2_down"].value:
+        elif held & P2_DOWN:
             old_p2_y = p2_y
             p2_y = min(display_height - paddle_height, p2_y + 1)
             if old_p2_y != p2_y:
@@ -140,7 +156,17 @@ async def game_loop():
                 display.fill_rect(display_width - paddle_width, old_p2_y + paddle_height, paddle_width, 1, 1)
 
         update_ball()
+        if heap is not None:
+            heap.frame()
+        policy.frame()  # no FixedStep here to check the free-heap floor each loop
         await asyncio.sleep(0.008)
 
 # Run the main async loop
-asyncio.run(game_loop())
\ No newline at end of file
+try:
+    asyncio.run(game_loop())
+finally:
+    # Ctrl-C (or the end of a host run): the stats once, not at every point
+    if heap is not None:
+        print(music.report())
+        print(policy.report())
+        print(heap.report())
@@ -0,0 +1,83 @@
+# Computer opponent for the pong games: moves one paddle by setting the same
+# held-button bits a player would press.
+#
+# The ball flies in a straight line between bounces, so the row where it will
+# reach the paddle is worked out only when it changes direction (a paddle hit
+# or a serve): a straight line to the paddle face, folded between the walls
+# the way the ball bounces, so wall bounces need no new prediction. Every
+# other tick just compares the paddle with that cached row. Difficulty
+# is how late a new row is noticed (delay, in ticks) and how far off it is
+# (error, in px), so an easier or harder opponent costs the same per tick.
+#
+#   cpu = PongAI(RIGHT, TOP, BOTTOM, P2_UP, P2_DOWN, one=ONE)
+#   held = buttons.poll()
+#   held = held & ~cpu.bits | cpu.poll(ball_fx, ball_fy, ball_vx, ball_vy, p2_y)
+#   cpu.forget()                  # in reset_ball(): the ball jumped to the centre
+#
+# Ball positions are its top-left corner in the game's own units (one per
+# pixel, e.g. 256 for Q8.8); face is the ball x where it meets this paddle.
+# The paddle position is in pixels.
+
+import random
+
+
+class PongAI:
+    """ Paddle that waits where the ball will arrive """
+
+    def __init__(self, face, top, bottom, up, down, *, one=1, paddle_height=10,
+                 ball_size=4, paddle_top=20, paddle_bottom=54, delay=10, error=5):
+        self.face = face
+        self.top = top
+        self.span = bottom - top
+        self.up = up
+        self.down = down
+        self.bits = up | down
+        self.one = one
+        self.paddle_height = paddle_height
+        self.ball_size = ball_size
+        self.paddle_top = paddle_top
+        self.paddle_bottom = paddle_bottom
+        self.home = (paddle_top + paddle_bottom) // 2
+        self.delay = delay      # ticks before a new path is noticed
+        self.error = error      # px the aim can be off by
+        self.target = self.home
+        self.predictions = 0
+        self.forget()
+
+    def forget(self):
+        """ Predict again on the next poll, e.g. after a serve """
+        self._dir = None
+        self._next = self.home
+        self._wait = 0
+
+    def predict(self, x, y, vx, vy):
+        """ Paddle row to wait at for a ball at (x, y) moving (vx, vy) """
+        self.predictions += 1
+        if vx == 0 or (self.face - x) * vx < 0:
+            return self.home  # going away: back to the middle
+        # the row at the paddle face on a straight path, folded between the walls
+        y = (y + vy * (self.face - x) // vx - self.top) % (2 * self.span)
+        if y > self.span:
+            y = 2 * self.span - y
+        y = (self.top + y) // self.one + self.ball_size // 2 - self.paddle_height // 2
+        if self.error:
+            y += random.randint(-self.error, self.error)
+        return min(max(y, self.paddle_top), self.paddle_bottom)
+
+    def poll(self, x, y, vx, vy, paddle_y):
+        """ Held mask (up, down or 0) for this tick """
+        d = vx > 0
+        if d != self._dir:
+            # hit by a paddle (or served): the path changed
+            self._dir = d
+            self._next = self.predict(x, y, vx, vy)
+            self._wait = self.delay + 1
+        if self._wait:
+            self._wait -= 1
+            if not self._wait:
+                self.target = self._next
+        if paddle_y > self.target:
+            return self.up
+        if paddle_y < self.target:
+            return self.down
+        return 0
@@ -0,0 +1,186 @@
+# Input recording and replay: a game session as a random seed plus what
+# Buttons reported at every poll, so a bug or a slow spot can be played
+# again exactly, as often as needed.
+#
+#   buttons = Buttons(pins)
+#   tape = Recorder.from_settings(buttons)   # INPUT_RECORD / INPUT_REPLAY in settings.toml
+#   REPLAY = tape is not None and tape.replaying
+#   pacer = FixedStep(TICK, fast=REPLAY)     # replays don't wait for the ticks
+#   tape.flush()                             # at game over: the log so far is on flash
+#   print(tape.report())
+#
+# Recording seeds `random` with a fresh seed and writes it to the log, then
+# logs buttons.held/pressed/released/repeated after every poll (Buttons calls
+# record()), so taps shorter than a tick and DAS repeats come back as they
+# were seen, whatever the timing of the replay. Replaying seeds `random`
+# with the logged seed and makes every poll return the logged state instead
+# of reading the pins (play()); with FixedStep(fast=True) nothing sleeps and
+# the game runs as fast as the CPU allows. At the end of the log the report
+# is printed and SystemExit stops the program.
+#
+# File: b"BTN1", number of buttons (1 byte), seed (4 bytes, little endian),
+# then runs of up to 255 polls with the same state: count (1 byte) and the
+# state (held | pressed << n | released << 2n | repeated << 3n, in
+# (4n + 7) // 8 bytes). Most polls repeat the previous one: a tap is about
+# three runs, holding still costs a run every 255 polls.
+#
+# The board can only write files if boot.py remounts the drive for the
+# program (storage.remount("/", readonly=False)); otherwise recording is
+# turned off with a message. A recording is exact as long as the game logic
+# counts time in ticks (tetris: gravity and lock delay), not in seconds read
+# from a clock: a replay starts at another time, and sums of floats taken
+# from there can round the other way.
+
+import random
+import time
+
+try:
+    from time import perf_counter as _clock  # host: time.monotonic is the virtual clock
+except ImportError:
+    from time import monotonic as _clock
+
+from buttons import PRESS, RELEASE, REPEAT
+
+MAGIC = b"BTN1"
+MAX_RUN = 255
+
+instances = []  # for the host runner: logs are closed when a run ends
+
+
+def _new_seed():
+    try:
+        import os
+        return int.from_bytes(os.urandom(4), "little")
+    except (AttributeError, NotImplementedError):  # no hardware random source
+        return time.monotonic_ns() & 0xFFFFFFFF
+
+
+class Recorder:
+    """ Seeded RNG and run-length encoded button states, to a file or back from it """
+
+    def __init__(self, buttons, path, *, replay=False, seed=None):
+        n = buttons.count
+        self.path = path
+        self.replaying = replay
+        self.polls = 0
+        self.runs = 0
+        self._n = n
+        self._mask = (1 << n) - 1
+        self._width = (4 * n + 7) // 8  # bytes per state
+        self._state = 0
+        self._count = 0                 # record: polls in the current run; replay: polls left
+        self._file = None
+        self._start = None
+        if replay:
+            self._file = open(path, "rb")
+            head = self._file.read(9)
+            if len(head) < 9 or head[:4] != MAGIC or head[4] != n:
+                raise ValueError("%s is not an input log for %d buttons" % (path, n))
+            self.seed = int.from_bytes(head[5:9], "little")
+            self._run = bytearray(1 + self._width)
+        else:
+            self.seed = _new_seed() if seed is None else seed
+            try:
+                self._file = open(path, "wb")
+                self._file.write(MAGIC + bytes((n,)) + self.seed.to_bytes(4, "little"))
+            except OSError as e:
+                print("recorder: can't write %s (%s), not recording" % (path, e))
+                self._file = None
+        random.seed(self.seed)
+        buttons.tape = self
+        instances.append(self)
+
+    @staticmethod
+    def from_settings(buttons):
+        """ A Recorder if INPUT_REPLAY or INPUT_RECORD (a file name) is set, else None """
+        try:
+            import os
+            replay = os.getenv("INPUT_REPLAY")
+            record = os.getenv("INPUT_RECORD")
+        except AttributeError:  # no os.getenv before CircuitPython 8
+            return None
+        if replay:
+            return Recorder(buttons, replay, replay=True)
+        if record:
+            return Recorder(buttons, record)
+        return None
+
+    # ---------- Recording ----------
+    def record(self, buttons):
+        """ Called by Buttons.poll() after every poll """
+        if self._start is None:
+            self._start = _clock()
+        self.polls += 1
+        n = self._n
+        state = (buttons.held | buttons.pressed << n | buttons.released << 2 * n
+                 | buttons.repeated << 3 * n)
+        if state == self._state and self._count < MAX_RUN:
+            self._count += 1
+            return
+        self._write()
+        self._state = state
+        self._count = 1
+
+    def _write(self):
+        if self._count and self._file is not None:
+            self._file.write(bytes((self._count,)) + self._state.to_bytes(self._width, "little"))
+            self.runs += 1
+        self._count = 0
+
+    def flush(self):
+        """ Write out what was recorded so far (e.g. at game over) """
+        if self.replaying or self._file is None:
+            return
+        self._write()
+        self._file.flush()
+
+    def close(self):
+        if self._file is None:
+            return
+        self.flush()
+        self._file.close()
+        self._file = None
+
+    # ---------- Replay ----------
+    def play(self, buttons, now):
+        """ Called by Buttons.poll() instead of reading the pins; returns the held mask """
+        if self._start is None:
+            self._start = _clock()
+        if not self._count:
+            run = self._run
+            if self._file is None or self._file.readinto(run) < len(run):
+                self._end()
+            self._count = run[0]
+            self._state = int.from_bytes(run[1:], "little")
+            self.runs += 1
+        self._count -= 1
+        self.polls += 1
+        n = self._n
+        mask = self._mask
+        state = self._state
+        buttons.held = state & mask
+        buttons.pressed = pressed = state >> n & mask
+        buttons.released = released = state >> 2 * n & mask
+        buttons.repeated = repeated = state >> 3 * n & mask
+        if pressed | released | repeated:
+            # the same events Buttons would have queued
+            for i in range(n):
+                bit = 1 << i
+                if pressed & bit:
+                    buttons._push(PRESS, i, now)
+                elif repeated & bit:
+                    buttons._push(REPEAT, i, now)
+                if released & bit:
+                    buttons._push(RELEASE, i, now)
+        return buttons.held
+
+    def _end(self):
+        self.close()
+        print(self.report())
+        raise SystemExit
+
+    def report(self):
+        elapsed = _clock() - self._start if self._start is not None else 0
+        return "input %s %s: seed %d, %d polls in %d runs, %.2fs (%.0f polls/s)" % (
+            "replay" if self.replaying else "record", self.path, self.seed, self.polls, self.runs,
+            elapsed, self.polls / elapsed if elapsed else 0)
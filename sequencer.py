@@ -0,0 +1,198 @@
+# Music and jingles without blocking the game: one asyncio task changes
+# notes on a PWMAudioOut at monotonic deadlines.
+#
+# Tunes are parsed once (RTTTL text or a list of (frequency, seconds)) into
+# steps of (RawSample from a ToneBank, seconds), so a note change is a single
+# speaker.play(). Every tune plays on a priority: the highest one sounds and
+# lower ones wait, paused on their current note, until it has finished. A
+# jingle at priority 1 thus interrupts looping music at 0, which then goes on.
+#
+#   music = Sequencer(speaker, tones)
+#   THEME = music.rtttl("theme:d=8,o=5,b=140:c,e,g,c6,p,g,4c6")
+#   BEEP = music.steps(((880, 0.05), (0, 0.02), (1760, 0.05)))
+#   asyncio.create_task(music.run())
+#   music.play(THEME, loop=True)        # background, priority 0
+#   music.play(BEEP, priority=1)        # preempts it, returns at once
+#   print(music.report())               # how late note changes were
+#
+# Each note change records how far past its deadline the task woke up. Notes
+# later than late_limit go into late_log as (deadline, seconds late): a
+# late note means something held the event loop, i.e. a game frame overran.
+
+import asyncio
+import time
+
+from tone_bank import SINE
+
+try:
+    from time import perf_counter as _clock  # host: time.monotonic is the virtual clock
+except ImportError:
+    from time import monotonic as _clock
+
+# semitones above C
+NOTES = {"c": 0, "d": 2, "e": 4, "f": 5, "g": 7, "a": 9, "b": 11, "h": 11}
+
+
+class Sequencer:
+    """ Prioritised note sequences played by an asyncio task """
+
+    def __init__(self, speaker, tones, *, late_limit=0.004, log_size=16):
+        self.speaker = speaker
+        self.tones = tones
+        self.late_limit = late_limit    # s, note changes later than this are logged
+        self.log_size = log_size
+        self.tracks = {}                # priority -> [steps, index, loop]
+        self.playing = None             # priority of the track that sounds
+        self.deadline = 0.0             # when its note ends
+        self._wake = None
+        self.notes = 0
+        self.late_sum = 0.0
+        self.late_max = 0.0
+        self.late_count = 0             # note changes later than late_limit
+        self.late_log = []
+        self.busy_max = 0.0             # s, longest note change
+
+    # ---------- Tunes ----------
+    def steps(self, notes, waveform=SINE):
+        """ Steps for (frequency, seconds) pairs; frequency 0 is a rest """
+        return [(self.tones.get(f, waveform) if f else None, s) for f, s in notes]
+
+    def rtttl(self, text, waveform=SINE):
+        """ Steps for an RTTTL tune, e.g. "name:d=4,o=5,b=120:8c6,8e6,p,2g." """
+        _, defaults, body = text.split(":")
+        d, o, b = 4, 6, 63
+        for item in defaults.split(","):
+            key, value = item.strip().split("=")
+            if key == "d":
+                d = int(value)
+            elif key == "o":
+                o = int(value)
+            elif key == "b":
+                b = int(value)
+        whole = 240 / b  # s per whole note (b = quarter notes per minute)
+        notes = []
+        for token in body.split(","):
+            token = token.strip().lower()
+            if not token:
+                continue
+            i = 0
+            while token[i].isdigit():
+                i += 1
+            length = int(token[:i]) if i else d
+            semis = NOTES.get(token[i])
+            i += 1
+            if i < len(token) and token[i] == "#":
+                semis += 1
+                i += 1
+            rest = token[i:]
+            seconds = whole / length
+            if "." in rest:
+                seconds *= 1.5
+                rest = rest.replace(".", "")
+            octave = int(rest) if rest else o
+            if semis is None:
+                notes.append((0, seconds))  # "p": pause
+            else:
+                notes.append((round(440 * 2 ** ((semis - 9) / 12 + octave - 4)), seconds))
+        return self.steps(notes, waveform)
+
+    # ---------- Control ----------
+    def play(self, steps, priority=0, loop=False):
+        """ Queue a tune on a priority; it sounds now unless a higher one does """
+        self.tracks[priority] = [steps, 0, loop]
+        if self.playing is None or priority >= self.playing:
+            self._sound(priority, time.monotonic())
+
+    def stop(self, priority=None):
+        """ Stop one priority's tune, or everything """
+        if priority is None:
+            self.tracks = {}
+        elif priority in self.tracks:
+            del self.tracks[priority]
+        if self.playing not in self.tracks:
+            self._resume(time.monotonic())
+
+    def _sound(self, priority, now):
+        # start the current note of that priority's tune
+        self.playing = priority
+        steps, index, _ = self.tracks[priority]
+        sample, seconds = steps[index]
+        if sample is None:
+            self.speaker.stop()
+        else:
+            self.speaker.play(sample, loop=True)
+        self.deadline = now + seconds
+        if self._wake is not None:
+            self._wake.set()
+
+    def _resume(self, now):
+        # the highest waiting tune goes on, or silence
+        if self.tracks:
+            self._sound(max(self.tracks), now)
+        else:
+            self.playing = None
+            self.speaker.stop()
+
+    def _next(self, now):
+        # the note that sounds is over: the next one, or the next tune
+        track = self.tracks[self.playing]
+        track[1] += 1
+        if track[1] == len(track[0]):
+            if not track[2]:
+                del self.tracks[self.playing]
+                self._resume(now)
+                return
+            track[1] = 0
+        due = self.deadline
+        self._sound(self.playing, now)
+        # time the note from when it was due, so lateness doesn't add up
+        due += track[0][track[1]][1]
+        if due > now:
+            self.deadline = due
+
+    async def run(self):
+        """ The task: changes notes at their deadlines """
+        self._wake = wake = asyncio.Event()
+        try:
+            while True:
+                if self.playing is None:
+                    await wake.wait()
+                    wake.clear()
+                    continue
+                delay = self.deadline - time.monotonic()
+                if delay > 0:
+                    # until the deadline, or a play()/stop() moves it
+                    try:
+                        await asyncio.wait_for(wake.wait(), delay)
+                        wake.clear()
+                        continue
+                    except asyncio.TimeoutError:
+                        pass
+                now = time.monotonic()
+                start = _clock()
+                self._log(max(0.0, now - self.deadline))
+                self._next(now)
+                busy = _clock() - start
+                if busy > self.busy_max:
+                    self.busy_max = busy
+        finally:
+            self._wake = None
+
+    # ---------- Lateness ----------
+    def _log(self, late):
+        self.notes += 1
+        self.late_sum += late
+        if late > self.late_max:
+            self.late_max = late
+        if late > self.late_limit:
+            self.late_count += 1
+            log = self.late_log
+            if len(log) >= self.log_size:
+                log.pop(0)
+            log.append((self.deadline, late))
+
+    def report(self):
+        avg = self.late_sum / self.notes if self.notes else 0
+        return "music: %d notes, late avg %.1fms max %.1fms, %d over %.0fms, note change max %.2fms" % (
+            self.notes, avg * 1000, self.late_max * 1000, self.late_count,
+            self.late_limit * 1000, self.busy_max * 1000)
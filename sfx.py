@@ -0,0 +1,118 @@
+# Sound effects on a fixed set of audiomixer voices, so a new effect doesn't
+# cut off the one already playing.
+#
+# Effects are built once at startup as RawSamples (one-shot buffers from
+# tone(), or any sample given to effect()) and referred to by number, so
+# trigger() in a game loop is a scan over a few voices and a voice.play():
+# no allocation. A free voice is used if there is one, otherwise the voice
+# that was started longest ago is taken over.
+#
+#   sfx = SoundFX(board.GP12, voices=3, reserved=1)   # voice 0 left for music
+#   HIT = sfx.tone(880, 0.04)                          # square blip
+#   CLEAR = sfx.tone(300, 0.25, TRIANGLE, end=1200)    # rising sweep
+#   sfx.trigger(HIT)
+#   Sequencer(sfx.voice(0), sfx.tones)                 # a voice plays like a PWMAudioOut
+#
+# Without audiomixer the effects go straight to the PWMAudioOut (one at a
+# time, newest wins); without audio output at all trigger() does nothing.
+
+import array
+
+import audiocore
+
+from tone_bank import ToneBank, SQUARE, CENTER
+
+try:
+    import audiopwmio
+except ImportError:
+    audiopwmio = None
+
+try:
+    import audiomixer
+except ImportError:
+    audiomixer = None
+
+
+class SoundFX:
+    """ One-shot and looping effects mixed on a fixed number of voices """
+
+    def __init__(self, pin, *, voices=3, reserved=0, sample_rate=8000, buffer_size=1024, tones=None):
+        self.sample_rate = sample_rate
+        self.tones = tones if tones is not None else ToneBank(sample_rate)
+        self.out = None
+        self.mixer = None
+        self.voices = []
+        if audiopwmio is not None:
+            self.out = audiopwmio.PWMAudioOut(pin)
+            if audiomixer is not None:
+                self.mixer = audiomixer.Mixer(voice_count=voices, sample_rate=sample_rate,
+                                              channel_count=1, bits_per_sample=16,
+                                              samples_signed=False, buffer_size=buffer_size)
+                self.out.play(self.mixer)
+                self.voices = [self.mixer.voice[i] for i in range(voices)]
+            else:
+                self.voices = [self.out]
+        self.reserved = min(reserved, len(self.voices) - 1) if self.voices else 0
+        self._next = self.reserved      # next voice to take over
+        self.effects = []               # (sample, level, loop) by effect number
+        self.triggers = 0
+        self.stolen = 0                 # effects that cut another one off
+
+    # ---------- Effects ----------
+    def effect(self, sample, *, level=0.5, loop=False):
+        """ Number for a ready-made sample (same rate, unsigned 16-bit mono) """
+        self.effects.append((sample, level, loop))
+        return len(self.effects) - 1
+
+    def tone(self, frequency, seconds, waveform=SQUARE, *, end=None, level=0.5):
+        """ Number for a one-shot tone (sweeping to end Hz) that fades out """
+        n = int(seconds * self.sample_rate)
+        buf = array.array("H", bytes(2 * n))
+        i = 0
+        while i < n:
+            f = frequency if end is None else frequency + (end - frequency) * i // n
+            for s in self.tones.table(f, waveform):
+                if i == n:
+                    break
+                buf[i] = CENTER + (s - CENTER) * (n - i) // n  # no click at the end
+                i += 1
+        return self.effect(audiocore.RawSample(buf, sample_rate=self.sample_rate), level=level)
+
+    # ---------- Playing ----------
+    def voice(self, i):
+        """ Voice i, e.g. a reserved one for a Sequencer (play/stop like PWMAudioOut) """
+        return self.voices[i]
+
+    def trigger(self, effect):
+        """ Start an effect; returns the voice number, or None without audio """
+        voices = self.voices
+        if not voices:
+            return None
+        self.triggers += 1
+        sample, level, loop = self.effects[effect]
+        n = len(voices)
+        first = self.reserved
+        i = self._next
+        for _ in range(n - first):
+            if not voices[i].playing:
+                break
+            i = i + 1 if i + 1 < n else first
+        else:
+            self.stolen += 1  # all busy: take the oldest
+        self._next = i + 1 if i + 1 < n else first
+        voice = voices[i]
+        if self.mixer is not None:
+            voice.level = level
+        voice.play(sample, loop=loop)
+        return i
+
+    def stop(self, voice=None):
+        """ Stop one voice, or every effect voice """
+        if voice is not None:
+            self.voices[voice].stop()
+            return
+        for i in range(self.reserved, len(self.voices)):
+            self.voices[i].stop()
+
+    def report(self):
+        return "sfx: %d voices, %d triggers, %d cut off" % (len(self.voices), self.triggers, self.stolen)
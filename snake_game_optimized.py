@@ -1,54 +1,110 @@
 import board
 import busio
-import adafruit_ssd1306
-import digitalio
-import time
+from dirty_display import DirtySSD1306_I2C
+from frame_capture import FrameCapture
+from glyph_cache import GlyphCache
+from fixed_step import FixedStep
+from heapstats import HeapStats
+from gc_policy import GCPolicy
+from buttons import Buttons
+from recorder import Recorder
+from sfx import SoundFX
 import random
+import array
 
 # I2C接続の設定
 i2c_sda = board.GP2
 i2c_scl = board.GP3
 i2c = busio.I2C(i2c_scl, i2c_sda)
 
-# ボタンの設定
-btn_up = digitalio.DigitalInOut(board.GP7)
-btn_up.direction = digitalio.Direction.INPUT
-btn_up.pull = digitalio.Pull.UP
+# ボタンの設定（4つまとめて1回で読む）
+buttons = Buttons((board.GP7, board.GP5, board.GP6, board.GP4))
+BTN_UP, BTN_DOWN, BTN_LEFT, BTN_RIGHT = 1, 2, 4, 8
+# INPUT_RECORD = "/snake.bin" で乱数の種とボタン入力を記録し、INPUT_REPLAY = "/snake.bin" で全速で再生する
+tape = Recorder.from_settings(buttons)
+REPLAY = tape is not None and tape.replaying
 
-btn_down = digitalio.DigitalInOut(board.GP5)
-btn_down.direction = digitalio.Direction.INPUT
-btn_down.pull = digitalio.Pull.UP
-
-btn_left = digitalio.DigitalInOut(board.GP6)
-btn_left.direction = digitalio.Direction.INPUT
-btn_left.pull = digitalio.Pull.UP
-
-btn_right = digitalio.DigitalInOut(board.GP4)
-btn_right.direction = digitalio.Direction.INPUT
-btn_right.pull = digitalio.Pull.UP
+# 効果音（GP12のスピーカー。エサを食べたとき）
+sfx = SoundFX(board.GP12)
+SFX_FOOD = sfx.tone(1200, 0.05)
 
 # ディスプレイの設定
 display_width = 128
 display_height = 64
-display = adafruit_ssd1306.SSD1306_I2C(display_width, display_height, i2c)
+glyphs = GlyphCache()  # フォントをRAMに読み込んでおく
+glyphs.preload(("Score: 0", "Game Over"))
+capture = FrameCapture.from_settings()  # FRAME_CAPTURE = "/snake.frm" で表示したフレームを差分で記録
+display = DirtySSD1306_I2C(display_width, display_height, i2c, glyphs=glyphs, capture=capture)
 display.fill(0)
 display.show()
 
+# マス目の設定（CELL=2にすると64x32マスの細かい盤面になる）
+CELL = 4
+GRID_W = display_width // CELL
+GRID_H = display_height // CELL
+FOOD_TOP = 20 // CELL  # エサはスコア表示より下（y>=20px）にだけ置く
+CELLS = GRID_W * GRID_H
+
+# ヘビの体はマス番号（y*GRID_W+x）のリングバッファ。頭がhead、しっぽはlength-1個前
+body = array.array("H", [0] * CELLS)
+head = 0
+length = 0
+occupied = bytearray(CELLS)  # 1 = ヘビの体があるマス
+# エサを置けるマスの一覧。free_pos[c]はマスcのfree内の位置（無ければNONE）
+NONE = 0xFFFF
+free = array.array("H", [0] * CELLS)
+free_pos = array.array("H", [NONE] * CELLS)
+free_count = 0
+
 # 変数の宣言
-snake = []
 direction = (0, 0)
 speed = 0
-food = (0, 0)
+food = None
 score = 0
 game_over = False
 reset_game = False
 
+def occupy(c):
+    global free_count
+    occupied[c] = 1
+    i = free_pos[c]
+    if i != NONE:
+        # 一覧の最後のマスを空いた場所に移して詰める
+        free_count -= 1
+        last = free[free_count]
+        free[i] = last
+        free_pos[last] = i
+        free_pos[c] = NONE
+
+def vacate(c):
+    global free_count
+    occupied[c] = 0
+    if c >= FOOD_TOP * GRID_W:
+        free[free_count] = c
+        free_pos[c] = free_count
+        free_count += 1
+
+def place_food():
+    # 今までと同じように1回選び、体に重なったら空きマスの一覧から直接選ぶ
+    # （ヘビが長くなっても引き直しを繰り返さない。どちらでも空きマスから一様）
+    global food
+    x = random.randint(0, GRID_W - 1)
+    y = random.randint(FOOD_TOP, GRID_H - 1)
+    food = y * GRID_W + x
+    if occupied[food]:
+        if not free_count:
+            food = None  # 置く場所がない
+            return
+        food = free[random.randint(0, free_count - 1)]
+    display.fill_rect((food % GRID_W) * CELL, (food // GRID_W) * CELL, CELL, CELL, 1)
+
 # ゲームの変数と初期設定
 def init_game():
-    global snake
+    global head
+    global length
+    global free_count
     global direction
     global speed
-    global food
     global score
     global game_over
     global reset_game
@@ -56,12 +112,19 @@ def init_game():
     display.fill(0)
     display.show()
 
-    snake = [(display_width // 2, display_height // 2)]
+    free_count = 0
+    for c in range(CELLS):
+        occupied[c] = 0
+        free_pos[c] = NONE
+    for c in range(FOOD_TOP * GRID_W, CELLS):
+        vacate(c)
+    head = 0
+    length = 1
+    body[head] = (GRID_H // 2) * GRID_W + GRID_W // 2
+    occupy(body[head])
     direction = (0, -1)  # 初期方向は上
-    speed = 0.001
-    food = (random.randint(0, (display_width // 4) - 1) * 4,
-            random.randint(5, (display_height // 4) - 1) * 4)
-    display.fill_rect(food[0], food[1], 4, 4, 1)
+    speed = 0.1  # 1マス進む間隔（秒）。I2Cの速さに関係なく一定
+    place_food()
     score = 0
     update_score()
     game_over = False
@@ -74,77 +137,93 @@ def update_score():
     # スコアを再描画
     display.text(f"Score: {score}", 5, 5, 1)
 
-    # 画面更新
-    display.show()
-
 def move_snake():
-    global food, score, game_over
+    global head, length, score, game_over
 
-    # 現在のスネークの頭の位置
-    old_head = snake[0]
-    
     # 新しい頭の位置を計算
-    new_x = old_head[0] + direction[0] * 4
-    new_y = old_head[1] + direction[1] * 4
-    new_head = (new_x, new_y)
+    old_head = body[head]
+    new_x = old_head % GRID_W + direction[0]
+    new_y = old_head // GRID_W + direction[1]
 
     # 壁にぶつかったらゲームオーバー
-    if new_x < 0 or new_x >= display_width or new_y < 0 or new_y >= display_height:
+    if new_x < 0 or new_x >= GRID_W or new_y < 0 or new_y >= GRID_H:
         game_over = True
         return
 
-    # 自分自身との衝突判定
-    if new_head in snake:
+    # 自分自身との衝突判定（しっぽが動く前なので、しっぽのマスも衝突）
+    new_head = new_y * GRID_W + new_x
+    if occupied[new_head]:
         game_over = True
         return
 
-    # 新しい頭をリストに追加
-    snake.insert(0, new_head)
+    # 新しい頭をリングバッファに追加
+    head = (head + 1) % CELLS
+    body[head] = new_head
+    occupy(new_head)
+    length += 1
 
     # スネークがエサを食べたか判定
     if new_head == food:
         score += 1
-        # スネークの体にエサが重ならないように、新しいエサをランダムに配置
-        while True:
-            new_food_x = random.randint(0, (display_width // 4) - 1) * 4
-            new_food_y = random.randint(5, (display_height // 4) - 1) * 4
-            if (new_food_x, new_food_y) not in snake:
-                food = (new_food_x, new_food_y)
-                break
-
+        sfx.trigger(SFX_FOOD)
+        # スネークの体にエサが重ならないように、新しいエサを空きマスに配置
+        place_food()
         update_score()
     else:
         # しっぽを削除し、そこだけ消去
-        tail = snake.pop()
-        display.fill_rect(tail[0], tail[1], 4, 4, 0)  # しっぽ部分を黒で消す
+        tail = body[(head - length + 1) % CELLS]
+        length -= 1
+        vacate(tail)
+        display.fill_rect((tail % GRID_W) * CELL, (tail // GRID_W) * CELL, CELL, CELL, 0)  # しっぽ部分を黒で消す
 
-    display.fill_rect(new_head[0], new_head[1], 4, 4, 1)  # 頭を描画
-    display.fill_rect(food[0], food[1], 4, 4, 1)  # エサを再描画
+    display.fill_rect(new_x * CELL, new_y * CELL, CELL, CELL, 1)  # 頭を描画
+    if food is not None:
+        display.fill_rect((food % GRID_W) * CELL, (food // GRID_W) * CELL, CELL, CELL, 1)  # エサを再描画
 
-    # 画面更新
-    display.show()
 
+heap = HeapStats.from_settings()  # HEAP_STATS = 1 でフレームごとのメモリ確保量を記録
+policy = GCPolicy()  # プレイ中の回収をゲームオーバーのときにまとめて行う
 
 while 1:
     init_game()
-    # メインゲームループ
+    display.show()
+    pacer = FixedStep(speed, heap=heap, gc_policy=policy, fast=REPLAY)
+    policy.play()
+    # メインゲームループ（一定間隔で1マス進み、遅れたら表示を飛ばして追いつく）
     while not game_over:
-        # ボタン入力の読み取り
-        if not btn_up.value and direction != (0, 1):
-            direction = (0, -1)
-            print("1")
-        elif not btn_down.value and direction != (0, -1):
-            direction = (0, 1)
-            print("2")
-        elif not btn_left.value and direction != (1, 0):
-            direction = (-1, 0)
-            print("3")
-        elif not btn_right.value and direction != (-1, 0):
-            direction = (1, 0)
-            print("4")
-        
-        move_snake()
-        time.sleep(speed)
+        for _ in range(pacer.ticks()):
+            # ボタン入力の読み取り（押してすぐ離した場合も拾う）
+            keys = buttons.poll() | buttons.pressed
+            if keys & BTN_UP and direction != (0, 1):
+                direction = (0, -1)
+                print("1")
+            elif keys & BTN_DOWN and direction != (0, -1):
+                direction = (0, 1)
+                print("2")
+            elif keys & BTN_LEFT and direction != (1, 0):
+                direction = (-1, 0)
+                print("3")
+            elif keys & BTN_RIGHT and direction != (-1, 0):
+                direction = (1, 0)
+                print("4")
+
+            move_snake()
+            if game_over:
+                break
+        if pacer.render_due():
+            display.show()
+    policy.idle()
+    policy.stop()
+    if heap is not None:  # HEAP_STATS = 1 のときだけ診断を表示する
+        print(pacer.report())
+        print(policy.report())
+        print(heap.report())
+    if tape is not None:
+        tape.flush()
+        print(tape.report())
+    if capture is not None:
+        capture.flush()
+        print(capture.report())
 
     # ゲームオーバー時の表示
     display.fill(0)
@@ -152,8 +231,11 @@ while 1:
     display.text(f"Score: {score}", display_width // 2 - 20, display_height // 2 + 10, 1)
     display.show()
     
+    # 上ボタンで再開（0.02秒ごとに見る。待っている間も入力の記録が増え続けない）
+    wait = FixedStep(0.02, fast=REPLAY)
     while not reset_game:
-        if not btn_up.value:
+        wait.ticks()
+        if (buttons.poll() | buttons.pressed) & BTN_UP:
             print("reset")
             game_over = False
             reset_game = True
\ No newline at end of file
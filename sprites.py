@@ -0,0 +1,112 @@
+# Small 1-bit sprites stored in SSD1306 page format (one byte = 8 vertical
+# pixels), with a pre-shifted copy for each of the 8 possible y offsets
+# inside a page. Drawing is a few byte operations per column instead of a
+# fill_rect/pixel/text call per piece.
+#
+#   BALL = Sprite.compose(4, 4, (("fill", 0, 0, 4, 4, 1),))
+#   BALL.draw(display, x, y)     # OR image in
+#   BALL.erase(display, x, y)    # clear image bits
+#   CELL.put(display, x, y)      # clear mask bits, then OR image (opaque)
+#
+# A sprite has an image and a mask. compose() builds both from the same
+# fill/text steps the games already use, so put() gives the same pixels as
+# doing those drawing calls in order.
+
+DRAW = 0
+ERASE = 1
+PUT = 2
+
+
+class Sprite:
+    """ 1-bit image + mask, pre-shifted for every row offset within a page """
+
+    def __init__(self, width, height, image, mask=None):
+        # image/mask: one int per column, bit n = row n
+        self.width = width
+        self.height = height
+        self._img = [self._shifted(image, s) for s in range(8)]
+        if mask is None:
+            self._msk = self._img
+        else:
+            self._msk = [self._shifted(mask, s) for s in range(8)]
+
+    def _shifted(self, columns, shift):
+        pages = (self.height + shift + 7) // 8
+        w = self.width
+        out = bytearray(pages * w)
+        for i in range(w):
+            v = columns[i] << shift
+            for k in range(pages):
+                out[k * w + i] = (v >> (8 * k)) & 0xFF
+        return out
+
+    @staticmethod
+    def compose(width, height, steps):
+        """ Build a sprite from drawing steps applied in order:
+        ("fill", x, y, w, h, color) and ("text", columns, x, y, color),
+        where columns are glyph column bytes (GlyphCache.columns()).
+        The mask is every pixel a step touched. """
+        image = [0] * width
+        mask = [0] * width
+        for step in steps:
+            if step[0] == "fill":
+                _, x, y, w, h, color = step
+                bits = ((1 << h) - 1) << y
+                cols = range(max(x, 0), min(x + w, width))
+                for i in cols:
+                    mask[i] |= bits
+                    image[i] = (image[i] | bits) if color else (image[i] & ~bits)
+            else:
+                _, columns, x, y, color = step
+                for j in range(len(columns)):
+                    i = x + j
+                    if 0 <= i < width and columns[j]:
+                        bits = columns[j] << y
+                        mask[i] |= bits
+                        image[i] = (image[i] | bits) if color else (image[i] & ~bits)
+        full = (1 << height) - 1
+        for i in range(width):
+            image[i] &= full
+            mask[i] &= full
+        return Sprite(width, height, image, mask)
+
+    def draw(self, display, x, y):
+        self._blit(display, x, y, DRAW)
+
+    def erase(self, display, x, y):
+        self._blit(display, x, y, ERASE)
+
+    def put(self, display, x, y):
+        self._blit(display, x, y, PUT)
+
+    def _blit(self, display, x, y, mode):
+        w = self.width
+        width = display.width
+        c0 = -x if x < 0 else 0
+        c1 = w if x + w <= width else width - x
+        if c0 >= c1:
+            return
+        mark = getattr(display, "mark", None)
+        if mark is not None:
+            mark(x, y, w, self.height)
+        shift = y & 7
+        img = self._img[shift]
+        msk = self._msk[shift]
+        buf = display.buf
+        pages = display.height >> 3
+        page = y >> 3
+        for k in range(len(img) // w):
+            if page + k < 0 or page + k >= pages:
+                continue
+            base = (page + k) * width + x
+            off = k * w
+            if mode == DRAW:
+                for i in range(c0, c1):
+                    buf[base + i] |= img[off + i]
+            elif mode == ERASE:
+                for i in range(c0, c1):
+                    buf[base + i] &= ~img[off + i]
+            else:
+                for i in range(c0, c1):
+                    j = base + i
+                    buf[j] = (buf[j] & ~msk[off + i]) | img[off + i]
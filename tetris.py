@@ -2,16 +2,31 @@
 # Field: 10x16 cells, cell size = 4px
 # Controls (pull-up buttons):
 #   p1_up (GP7)   : Rotate
-#   p1_down (GP6) : Soft Drop
-#   p2_up (GP5)   : Move Right (auto-repeat)
-#   p2_down (GP4) : Move Left  (auto-repeat)
+#   p1_down (GP5) : Soft Drop
+#   p2_up (GP4)   : Move Right (auto-repeat)
+#   p2_down (GP6) : Move Left  (auto-repeat)
+#   GP14          : Hard Drop
+# TETRIS_AUTOPLAY = 1 in settings.toml (or the environment on the host) lets
+# tetris_ai play through the same inputs; 2 also looks at the next piece.
+# INPUT_RECORD = "/tetris.bin" records the seed and the buttons of a session,
+# INPUT_REPLAY = "/tetris.bin" plays it again as fast as possible (recorder.py).
 
 import board
 import busio
-import adafruit_ssd1306
-import digitalio
-import time
+from dirty_display import DirtySSD1306_I2C
+from frame_capture import FrameCapture
+from glyph_cache import GlyphCache
+from sprites import Sprite
+from fixed_step import FixedStep
+from heapstats import HeapStats
+from gc_policy import GCPolicy
+from buttons import Buttons
+from recorder import Recorder
+from sfx import SoundFX
+from tone_bank import TRIANGLE
 import random
+import array
+import os
 
 # ---------- Hardware setup ----------
 # I2C pins (same as your Pong example)
@@ -19,20 +34,27 @@ i2c_sda = board.GP2
 i2c_scl = board.GP3
 i2c = busio.I2C(i2c_scl, i2c_sda, frequency=1000000)
 
-# Buttons (active low with pull-up)
-btns = {
-    "p1_up": digitalio.DigitalInOut(board.GP7),   # Rotate
-    "p1_down": digitalio.DigitalInOut(board.GP5), # Soft drop
-    "p2_up": digitalio.DigitalInOut(board.GP4),   # Right
-    "p2_down": digitalio.DigitalInOut(board.GP6)  # Left
-}
-for b in btns.values():
-    b.direction = digitalio.Direction.INPUT
-    b.pull = digitalio.Pull.UP
+# Buttons (active low with pull-up), read together once per tick
+buttons = Buttons((
+    board.GP7,  # p1_up: Rotate
+    board.GP5,  # p1_down: Soft drop
+    board.GP4,  # p2_up: Right
+    board.GP6,  # p2_down: Left
+    board.GP14, # Hard drop
+))
+BTN_ROTATE, BTN_SOFT, BTN_RIGHT, BTN_LEFT, BTN_HARD = 1, 2, 4, 8, 16
+
+# Sound effects on GP12 (mixed voices, so clears don't cut each other off)
+sfx = SoundFX(board.GP12)
+SFX_CLEAR = sfx.tone(400, 0.15, TRIANGLE, end=800)
+SFX_TETRIS = sfx.tone(300, 0.4, TRIANGLE, end=1200)
 
 # Display
 DISPLAY_W, DISPLAY_H = 128, 64
-display = adafruit_ssd1306.SSD1306_I2C(DISPLAY_W, DISPLAY_H, i2c)
+glyphs = GlyphCache()  # font in RAM: panel text doesn't read flash every frame
+glyphs.preload(("TETRIS", "NEXT", "S:0", "L:1", "Ln:0"))
+capture = FrameCapture.from_settings()  # FRAME_CAPTURE = "/tetris.frm": every frame shown, as deltas
+display = DirtySSD1306_I2C(DISPLAY_W, DISPLAY_H, i2c, glyphs=glyphs, capture=capture)
 display.fill(0)
 display.show()
 
@@ -54,6 +76,7 @@ SCORE_DOUBLE = 300
 SCORE_TRIPLE = 500
 SCORE_TETRIS = 800
 SCORE_SOFTDROP = 1             # per soft-drop row
+SCORE_HARDDROP = 2             # per hard-drop row
 
 LINES_PER_LEVEL = 10
 GRAVITY_START = 0.60           # seconds per step at level 1
@@ -63,6 +86,17 @@ GRAVITY_STEP = 0.07            # speed up per level
 MOVE_DAS = 0.20                # initial delay for left/right hold
 MOVE_RR  = 0.08                # repeat rate while holding
 
+TICK = 0.01                    # logic step (s), independent of render cost
+
+try:
+    AUTOPLAY = int(os.getenv("TETRIS_AUTOPLAY", 0))
+except AttributeError:  # no os.getenv before CircuitPython 8
+    AUTOPLAY = 0
+heap = HeapStats.from_settings()  # HEAP_STATS = 1: bytes allocated per frame
+policy = GCPolicy()  # collect when a piece locks, not during a DAS repeat
+tape = Recorder.from_settings(buttons)  # record or replay the buttons (and the random seed)
+REPLAY = tape is not None and tape.replaying
+
 # ---------- Tetromino definitions ----------
 # Shapes as rotation states of (x, y) offsets from the piece origin
 # Origin is the top-left of a notional 4x4 box; spawn uses these offsets.
@@ -112,6 +146,45 @@ TETROMINOES = {
 }
 PIECE_TYPES = list(TETROMINOES.keys())
 
+# ---------- Bitboard ----------
+# The board is one 10-bit mask per row (bit c = column c). Each rotation of
+# each piece is stored as (dy, mask) rows, the mask shifted so the piece's
+# leftmost column is bit 0; at origin x the piece starts at column x + min_dx.
+# After the rows the board keeps a skyline: board[SKY + c] is the row of the
+# highest filled cell in column c (ROWS when empty).
+FULL_ROW = (1 << COLS) - 1
+SKY = ROWS
+
+def piece_masks(shape):
+    min_dx = min(dx for (dx, dy) in shape)
+    max_dx = max(dx for (dx, dy) in shape)
+    rows = {}
+    bottom = {}
+    for (dx, dy) in shape:
+        rows[dy] = rows.get(dy, 0) | (1 << (dx - min_dx))
+        bottom[dx - min_dx] = max(bottom.get(dx - min_dx, dy), dy)
+    return tuple(sorted(rows.items())), min_dx, max_dx, tuple(sorted(bottom.items()))
+
+PIECE_ROWS = {}    # type -> per rotation: ((dy, mask), ...)
+PIECE_MIN_DX = {}  # type -> per rotation: leftmost dx
+PIECE_MAX_DX = {}  # type -> per rotation: rightmost dx
+PIECE_BOTTOM = {}  # type -> per rotation: ((column from the left, lowest dy), ...)
+for _t in PIECE_TYPES:
+    _masks = [piece_masks(shape) for shape in TETROMINOES[_t]]
+    PIECE_ROWS[_t] = tuple(m[0] for m in _masks)
+    PIECE_MIN_DX[_t] = tuple(m[1] for m in _masks)
+    PIECE_MAX_DX[_t] = tuple(m[2] for m in _masks)
+    PIECE_BOTTOM[_t] = tuple(m[3] for m in _masks)
+
+# ---------- Sprites ----------
+CELL_SPRITE = Sprite.compose(CELL, CELL, (("fill", 0, 0, CELL, CELL, 1),))
+GHOST_SPRITE = Sprite.compose(CELL, CELL, (("fill", 0, 0, CELL, CELL, 1), ("fill", 1, 1, CELL-2, CELL-2, 0)))
+# NEXT preview: 2x2 dots at 3/2 spacing inside the 16x16 box
+NEXT_SPRITES = {
+    t: Sprite.compose(16, 16, [("fill", 2 + dx*3//2, 2 + dy*3//2, 2, 2, 1) for (dx, dy) in TETROMINOES[t][0]])
+    for t in PIECE_TYPES
+}
+
 # ---------- Utilities ----------
 def shuffle_in_place(seq):
     # Fisher–Yates
@@ -120,8 +193,8 @@ def shuffle_in_place(seq):
         seq[i], seq[j] = seq[j], seq[i]
         
 def new_board():
-    # 0 = empty, 1 = filled (monochrome)
-    return [[0 for _ in range(COLS)] for _ in range(ROWS)]
+    # one row mask per row, 0 = empty, then the skyline
+    return array.array("H", [0] * ROWS + [ROWS] * COLS)
 
 def piece_spawn_x(piece_type):
     # Center-ish spawn: origin x near middle
@@ -133,34 +206,73 @@ def piece_spawn_y():
 def cells_of(piece_type, rot, x, y):
     return [(x + dx, y + dy) for (dx, dy) in TETROMINOES[piece_type][rot]]
 
-def in_bounds(x, y):
-    return 0 <= x < COLS and 0 <= y < ROWS
-
 def collides(board, piece_type, rot, x, y):
-    for (cx, cy) in cells_of(piece_type, rot, x, y):
-        if not in_bounds(cx, cy):
-            return True
-        if board[cy][cx]:
+    # walls, floor and ceiling, then one AND per piece row
+    left = x + PIECE_MIN_DX[piece_type][rot]
+    if left < 0 or x + PIECE_MAX_DX[piece_type][rot] >= COLS:
+        return True
+    for (dy, mask) in PIECE_ROWS[piece_type][rot]:
+        r = y + dy
+        if r < 0 or r >= ROWS or board[r] & (mask << left):
             return True
     return False
 
+def drop_distance(board, piece_type, rot, x, y):
+    # rows the piece can fall: the skyline under each of its columns
+    left = x + PIECE_MIN_DX[piece_type][rot]
+    dist = ROWS
+    for (dc, dy) in PIECE_BOTTOM[piece_type][rot]:
+        d = board[SKY + left + dc] - (y + dy) - 1
+        if d < dist:
+            dist = d
+    if dist < 0:
+        # tucked under an overhang, where the skyline doesn't tell: probe
+        dist = 0
+        while not collides(board, piece_type, rot, x, y + dist + 1):
+            dist += 1
+    return dist
+
 def lock_piece(board, piece_type, rot, x, y):
-    for (cx, cy) in cells_of(piece_type, rot, x, y):
-        if 0 <= cy < ROWS and 0 <= cx < COLS:
-            board[cy][cx] = 1
+    left = x + PIECE_MIN_DX[piece_type][rot]
+    for (dy, mask) in PIECE_ROWS[piece_type][rot]:
+        r = y + dy
+        if 0 <= r < ROWS:
+            board[r] |= mask << left
+            # a cell above its column's top becomes the new top
+            c = SKY + left
+            while mask:
+                if mask & 1 and r < board[c]:
+                    board[c] = r
+                mask >>= 1
+                c += 1
+
+def update_skyline(board):
+    seen = 0
+    for c in range(COLS):
+        board[SKY + c] = ROWS
+    for r in range(ROWS):
+        new = board[r] & ~seen
+        c = 0
+        while new:
+            if new & 1:
+                board[SKY + c] = r
+            new >>= 1
+            c += 1
+        seen |= board[r]
 
 def clear_lines(board):
-    cleared = 0
-    new_rows = []
-    for r in range(ROWS):
-        if all(board[r][c] == 1 for c in range(COLS)):
-            cleared += 1
-        else:
-            new_rows.append(board[r])
-    while len(new_rows) < ROWS:
-        new_rows.insert(0, [0]*COLS)
-    for r in range(ROWS):
-        board[r] = new_rows[r]
+    # compact the rows that aren't full towards the bottom, in place
+    dst = ROWS - 1
+    for r in range(ROWS - 1, -1, -1):
+        row = board[r]
+        if row != FULL_ROW:
+            board[dst] = row
+            dst -= 1
+    cleared = dst + 1
+    for r in range(cleared):
+        board[r] = 0
+    if cleared:
+        update_skyline(board)
     return cleared
 
 def gravity_interval_for_level(level):
@@ -179,114 +291,137 @@ def try_rotate(board, piece_type, rot, x, y, dir=1):
     return rot, x
 
 # ---------- Input handling ----------
-class HoldRepeater:
-    """ Auto-repeat handler for left/right movement """
-    def __init__(self, digital_in, initial_delay=MOVE_DAS, repeat_delay=MOVE_RR):
-        self.pin = digital_in
-        self.initial = initial_delay
-        self.repeat = repeat_delay
-        self.last_state = True  # pull-up: True=not pressed
-        self.next_time = 0.0
-        self.phase = 'idle'     # 'idle', 'held_initial', 'held_repeat'
-
-    def pressed_edge(self):
-        now = time.monotonic()
-        state = self.pin.value  # True=not pressed, False=pressed
-        edge = (self.last_state and not state)
-        self.last_state = state
-        if edge:
-            self.phase = 'held_initial'
-            self.next_time = now + self.initial
-            return True
-        return False
-
-    def held_tick(self):
-        # returns True when it's time to repeat an action while button is held
-        now = time.monotonic()
-        if not self.pin.value:  # still pressed
-            if self.phase == 'held_initial' and now >= self.next_time:
-                self.phase = 'held_repeat'
-                self.next_time = now + self.repeat
-                return True
-            elif self.phase == 'held_repeat' and now >= self.next_time:
-                self.next_time = now + self.repeat
-                return True
-        else:
-            self.phase = 'idle'
-        return False
-
-# Map controls
-btn_rotate = btns["p1_up"]
-btn_soft   = btns["p1_down"]
-rep_right  = HoldRepeater(btns["p2_up"])
-rep_left   = HoldRepeater(btns["p2_down"])
-
-# For single-press detection on rotate & soft drop
-last_rotate_state = True
-last_soft_state = True
-
-def rotate_pressed():
-    global last_rotate_state
-    cur = btn_rotate.value
-    pressed = (last_rotate_state and not cur)
-    last_rotate_state = cur
-    return pressed
-
-def soft_pressed():
-    global last_soft_state
-    cur = btn_soft.value
-    pressed = (last_soft_state and not cur)
-    last_soft_state = cur
-    return pressed
+# Left/Right: move on press, then auto-repeat while held
+buttons.set_repeat(BTN_LEFT | BTN_RIGHT, MOVE_DAS, MOVE_RR)
+
+# Autoplay: the bot holds the buttons instead of the pins
+bot = None
+if AUTOPLAY:
+    from tetris_ai import PlacementSearch, AutoPlayer
+    search = PlacementSearch(ROWS, COLS, collides, try_rotate, lock_piece, clear_lines,
+                             drop_distance=drop_distance)
+    bot = AutoPlayer(search, BTN_ROTATE, BTN_LEFT, BTN_RIGHT, BTN_SOFT, hard=BTN_HARD,
+                     lookahead=AUTOPLAY >= 2)
+    buttons.source = bot.source
 
 # ---------- Drawing ----------
 def draw_cell(px, py):
     # filled cell of 4x4
-    display.fill_rect(px, py, CELL, CELL, 1)
+    CELL_SPRITE.draw(display, px, py)
 
-def draw_board(board):
-    # Field border
+def erase_cell(sprite, cx, cy):
+    sprite.erase(display, FIELD_X + cx*CELL, FIELD_Y + cy*CELL)
+    if cy == 0 or cy == ROWS-1:
+        draw_border()
+
+def draw_border():
+    # the top and bottom edges are clipped onto rows 0 and 63, under the
+    # first and last rows of cells
     display.rect(FIELD_X-1, FIELD_Y-1, FIELD_W+2, FIELD_H+2, 1)
+
+def draw_field(board):
     # Filled cells
     for r in range(ROWS):
-        for c in range(COLS):
-            if board[r][c]:
+        row = board[r]
+        c = 0
+        while row:
+            if row & 1:
                 draw_cell(FIELD_X + c*CELL, FIELD_Y + r*CELL)
-
-def draw_piece(piece_type, rot, x, y):
-    for (cx, cy) in cells_of(piece_type, rot, x, y):
-        if cy >= 0:
-            draw_cell(FIELD_X + cx*CELL, FIELD_Y + cy*CELL)
-
-def draw_panel(score, level, lines, next_piece):
-    # Header
-    display.text("TETRIS", PANEL_X, 0, 1)
-    display.text(f"S:{score}", PANEL_X, 12, 1)
-    display.text(f"L:{level}", PANEL_X, 22, 1)
-    display.text(f"Ln:{lines}", PANEL_X, 32, 1)
-    # Next
-    display.text("NEXT", PANEL_X, 44, 1)
-    # mini preview (scale ~3x3 area)
-    if next_piece:
-        # Draw next piece in a small 16x16 box
-        box_x = PANEL_X
-        box_y = 54
-        display.rect(box_x-1, box_y-1, 18, 18, 1)
-        # center roughly
-        for (dx, dy) in TETROMINOES[next_piece][0]:
-            nx = box_x + 2 + dx*3//2  # compact
-            ny = box_y + 2 + dy*3//2
-            display.pixel(nx, ny, 1)
-            display.pixel(nx+1, ny, 1)
-            display.pixel(nx, ny+1, 1)
-            display.pixel(nx+1, ny+1, 1)
-
-def render(board, piece_type, rot, x, y, score, level, lines, next_piece):
-    display.fill(0)
-    draw_board(board)
-    draw_piece(piece_type, rot, x, y)
-    draw_panel(score, level, lines, next_piece)
-    display.show()
+            row >>= 1
+            c += 1
+
+def visible_cells(piece_type, rot, x, y):
+    return [(cx, cy) for (cx, cy) in cells_of(piece_type, rot, x, y) if cy >= 0]
+
+def ghost_cells(board, piece_type, rot, x, y, cells):
+    # where a hard drop would land, minus what the piece itself covers
+    gy = y + drop_distance(board, piece_type, rot, x, y)
+    return [c for c in visible_cells(piece_type, rot, x, gy) if c not in cells]
+
+class TetrisView:
+    """ Redraws only what changed since the last render() """
+    def __init__(self):
+        self.invalidate()
+
+    def invalidate(self):
+        # next render() starts from a blank screen
+        self.blank = True
+        self.field_dirty = True
+        self.piece = []                 # piece cells as drawn last time
+        self.ghost = []                 # ghost outline cells as drawn last time
+        self.panel = [None] * 4         # score, level, lines, next as drawn
+
+    def piece_locked(self, cells, cleared):
+        # the piece may have moved since it was drawn (move + lock in one tick);
+        # bring it to where it locked, then its cells belong to the board
+        if cleared:
+            self.field_dirty = True
+        elif not self.field_dirty:
+            self.move_piece(cells, [])
+        self.piece = []
+        self.ghost = []
+
+    def move_piece(self, cells, ghost):
+        # neither the piece nor its ghost overlaps filled cells, so erasing is safe
+        for (cx, cy) in self.ghost:
+            if (cx, cy) not in ghost:
+                erase_cell(GHOST_SPRITE, cx, cy)
+        for (cx, cy) in self.piece:
+            if (cx, cy) not in cells:
+                erase_cell(CELL_SPRITE, cx, cy)
+        for (cx, cy) in ghost:
+            if (cx, cy) not in self.ghost:
+                GHOST_SPRITE.draw(display, FIELD_X + cx*CELL, FIELD_Y + cy*CELL)
+        for (cx, cy) in cells:
+            if (cx, cy) not in self.piece:
+                draw_cell(FIELD_X + cx*CELL, FIELD_Y + cy*CELL)
+        self.piece = cells
+        self.ghost = ghost
+
+    def render(self, board, piece_type, rot, x, y, score, level, lines, next_piece):
+        if self.blank:
+            display.fill(0)
+            display.text("TETRIS", PANEL_X, 0, 1)
+            display.text("NEXT", PANEL_X, 44, 1)
+            self.blank = False
+        cells = visible_cells(piece_type, rot, x, y)
+        ghost = ghost_cells(board, piece_type, rot, x, y, cells)
+        if self.field_dirty:
+            display.fill_rect(FIELD_X, FIELD_Y, FIELD_W, FIELD_H, 0)
+            draw_border()
+            draw_field(board)
+            for (cx, cy) in ghost:
+                GHOST_SPRITE.draw(display, FIELD_X + cx*CELL, FIELD_Y + cy*CELL)
+            for (cx, cy) in cells:
+                draw_cell(FIELD_X + cx*CELL, FIELD_Y + cy*CELL)
+            self.piece = cells
+            self.ghost = ghost
+            self.field_dirty = False
+        else:
+            self.move_piece(cells, ghost)
+        self.draw_panel(score, level, lines, next_piece)
+        display.show()
+
+    def draw_panel(self, score, level, lines, next_piece):
+        last = self.panel
+        for i, (label, value, py) in enumerate((("S:", score, 12), ("L:", level, 22), ("Ln:", lines, 32))):
+            if last[i] != value:
+                display.fill_rect(PANEL_X, py, DISPLAY_W - PANEL_X, 8, 0)
+                display.text(f"{label}{value}", PANEL_X, py, 1)
+                last[i] = value
+        # mini preview (scale ~3x3 area)
+        if last[3] != next_piece:
+            # Draw next piece in a small 16x16 box
+            box_x = PANEL_X
+            box_y = 54
+            display.fill_rect(box_x-1, box_y-1, 18, 18, 0)
+            if next_piece:
+                display.rect(box_x-1, box_y-1, 18, 18, 1)
+                # center roughly
+                NEXT_SPRITES[next_piece].draw(display, box_x, box_y)
+            last[3] = next_piece
+
+view = TetrisView()
 
 # ---------- Game state ----------
 def new_piece(bag):
@@ -297,20 +432,33 @@ def new_piece(bag):
     return bag.pop()
 
 def game_over_screen(score):
+    view.invalidate()
+    policy.idle()
+    policy.stop()
+    if heap is not None:
+        print(policy.report())
+    if tape is not None:
+        tape.flush()
+        print(tape.report())
+    if capture is not None:
+        capture.flush()
+        print(capture.report())
+    if bot:
+        print(bot.report())
+        bot.game_over()
     display.fill(0)
     display.text("GAME OVER", 20, 20, 1)
     display.text(f"Score:{score}", 20, 32, 1)
     display.text("Press ROTATE", 8, 48, 1)
     display.show()
-    # wait for rotate press to restart
-    global last_rotate_state
+    # wait for rotate press to restart, one poll per 20ms tick (so a recording
+    # doesn't grow with every spin of the loop; replays don't wait)
+    wait = FixedStep(0.02, fast=REPLAY)
     while True:
-        cur = btn_rotate.value
-        if last_rotate_state and not cur:
-            last_rotate_state = cur
+        wait.ticks()
+        buttons.poll()
+        if buttons.pressed & BTN_ROTATE:
             break
-        last_rotate_state = cur
-        time.sleep(0.02)
 
 def tetris_game():
     board = new_board()
@@ -328,104 +476,137 @@ def tetris_game():
     if collides(board, curr, rot, x, y):
         game_over_screen(score)
         return
+    if bot:
+        bot.new_piece(board, curr, rot, x, y, nextp)
 
-    last_gravity = time.monotonic()
     fall_interval = gravity_interval_for_level(level)
 
-    # movement repeat timers are inside HoldRepeater
+    # movement repeat timers are inside Buttons
     # draw first frame
-    render(board, curr, rot, x, y, score, level, lines_cleared_total, nextp)
+    view.render(board, curr, rot, x, y, score, level, lines_cleared_total, nextp)
 
     # Lock delay (very small & simple)
     LOCK_DELAY = 0.25
     lock_timer = None
 
-    while True:
-        now = time.monotonic()
-        moved = False
-
-        # ----- Inputs -----
-        # Rotate (on press)
-        if rotate_pressed():
-            new_rot, new_x = try_rotate(board, curr, rot, x, y, dir=1)
-            if (new_rot != rot) or (new_x != x):
-                rot, x = new_rot, new_x
-                moved = True
-                lock_timer = None  # reset lock if rotated
-
-        # Left/Right (edge and hold)
-        if rep_left.pressed_edge() or rep_left.held_tick():
-            if not collides(board, curr, rot, x-1, y):
-                x -= 1
-                moved = True
-                lock_timer = None
-        if rep_right.pressed_edge() or rep_right.held_tick():
-            if not collides(board, curr, rot, x+1, y):
-                x += 1
-                moved = True
-                lock_timer = None
+    pacer = FixedStep(TICK, heap=heap, gc_policy=policy, fast=REPLAY)
+    tick = 0  # game time in ticks: gravity and lock delay come out the same in a replay
+    last_gravity = 0
+    policy.play()
+    dirty = False  # moved since the last render
 
-        # Soft drop (held increases gravity; press also nudges one step)
-        soft_held = not btn_soft.value
-        if soft_pressed():
-            # single nudge on edge
-            if not collides(board, curr, rot, x, y+1):
-                y += 1
-                score += SCORE_SOFTDROP
-                moved = True
+    while True:
+        for i in range(pacer.ticks()):
+            now = pacer.start + i * TICK  # scheduled time of this tick (Buttons' debounce and DAS)
+            tick += 1
+            moved = False
+
+            # ----- Inputs -----
+            held = buttons.poll(now)
+            # Rotate (on press)
+            if buttons.pressed & BTN_ROTATE:
+                new_rot, new_x = try_rotate(board, curr, rot, x, y, dir=1)
+                if (new_rot != rot) or (new_x != x):
+                    rot, x = new_rot, new_x
+                    moved = True
+                    lock_timer = None  # reset lock if rotated
+
+            # Left/Right (edge and hold)
+            if buttons.repeated & BTN_LEFT:
+                if not collides(board, curr, rot, x-1, y):
+                    x -= 1
+                    moved = True
+                    lock_timer = None
+            if buttons.repeated & BTN_RIGHT:
+                if not collides(board, curr, rot, x+1, y):
+                    x += 1
+                    moved = True
+                    lock_timer = None
 
-        # gravity tick
-        cur_interval = fall_interval * (0.25 if soft_held else 1.0)
-        if now - last_gravity >= cur_interval:
-            last_gravity = now
-            if not collides(board, curr, rot, x, y+1):
-                y += 1
-                if soft_held:
+            # Soft drop (held increases gravity; press also nudges one step)
+            soft_held = held & BTN_SOFT
+            if buttons.pressed & BTN_SOFT:
+                # single nudge on edge
+                if drop_distance(board, curr, rot, x, y):
+                    y += 1
                     score += SCORE_SOFTDROP
+                    moved = True
+
+            # Hard drop (on press): straight down to the ghost and lock
+            lock = False
+            if buttons.pressed & BTN_HARD:
+                dist = drop_distance(board, curr, rot, x, y)
+                y += dist
+                score += SCORE_HARDDROP * dist
                 moved = True
-                # moving down cancels lock timer
-                lock_timer = None
-            else:
-                # start lock timer if touching ground
-                if lock_timer is None:
-                    lock_timer = now
-                elif now - lock_timer >= LOCK_DELAY:
-                    # lock piece
-                    lock_piece(board, curr, rot, x, y)
-                    # line clear
-                    cleared = clear_lines(board)
-                    if cleared:
-                        if cleared == 1:
-                            score += SCORE_SINGLE
-                        elif cleared == 2:
-                            score += SCORE_DOUBLE
-                        elif cleared == 3:
-                            score += SCORE_TRIPLE
-                        elif cleared == 4:
-                            score += SCORE_TETRIS
-                        lines_cleared_total += cleared
-                        # level up
-                        new_level = 1 + lines_cleared_total // LINES_PER_LEVEL
-                        if new_level != level:
-                            level = new_level
-                            fall_interval = gravity_interval_for_level(level)
-                    # next piece
-                    curr = nextp
-                    nextp = new_piece(bag)
-                    rot = 0
-                    x = piece_spawn_x(curr)
-                    y = piece_spawn_y()
+                lock = True
+
+            # gravity tick
+            cur_interval = fall_interval * (0.25 if soft_held else 1.0)
+            if not lock and (tick - last_gravity) * TICK >= cur_interval:
+                last_gravity = tick
+                if drop_distance(board, curr, rot, x, y):
+                    y += 1
+                    if soft_held:
+                        score += SCORE_SOFTDROP
+                    moved = True
+                    # moving down cancels lock timer
                     lock_timer = None
-                    if collides(board, curr, rot, x, y):
-                        # Game Over
-                        render(board, curr, rot, x, y, score, level, lines_cleared_total, nextp=None)
-                        game_over_screen(score)
-                        return
-
-        if moved:
-            render(board, curr, rot, x, y, score, level, lines_cleared_total, nextp)
-
-        time.sleep(0.01)
+                else:
+                    # start lock timer if touching ground
+                    if lock_timer is None:
+                        lock_timer = tick
+                    elif (tick - lock_timer) * TICK >= LOCK_DELAY:
+                        lock = True
+
+            if lock:
+                # lock piece
+                lock_piece(board, curr, rot, x, y)
+                # line clear
+                cleared = clear_lines(board)
+                view.piece_locked(visible_cells(curr, rot, x, y), cleared)
+                policy.idle()  # between pieces: a pause here isn't seen mid-move
+                if cleared:
+                    sfx.trigger(SFX_TETRIS if cleared == 4 else SFX_CLEAR)
+                    if cleared == 1:
+                        score += SCORE_SINGLE
+                    elif cleared == 2:
+                        score += SCORE_DOUBLE
+                    elif cleared == 3:
+                        score += SCORE_TRIPLE
+                    elif cleared == 4:
+                        score += SCORE_TETRIS
+                    lines_cleared_total += cleared
+                    # level up
+                    new_level = 1 + lines_cleared_total // LINES_PER_LEVEL
+                    if new_level != level:
+                        level = new_level
+                        fall_interval = gravity_interval_for_level(level)
+                # next piece
+                curr = nextp
+                nextp = new_piece(bag)
+                rot = 0
+                x = piece_spawn_x(curr)
+                y = piece_spawn_y()
+                lock_timer = None
+                moved = True  # show the new piece and its ghost right away
+                if collides(board, curr, rot, x, y):
+                    # Game Over
+                    view.render(board, curr, rot, x, y, score, level, lines_cleared_total, None)
+                    if heap is not None:
+                        print(pacer.report())
+                        print(heap.report())
+                    game_over_screen(score)
+                    return
+                if bot:
+                    bot.new_piece(board, curr, rot, x, y, nextp)
+
+            dirty = dirty or moved
+
+        # skipped while behind schedule; the next render catches up
+        if dirty and pacer.render_due():
+            view.render(board, curr, rot, x, y, score, level, lines_cleared_total, nextp)
+            dirty = False
 
 # ---------- Main loop (restartable) ----------
 while True:
@@ -0,0 +1,192 @@
+# Placement search and autoplayer for tetris.py (soak and throughput runs).
+#
+# The search takes the game's own rules (collides, try_rotate, lock_piece,
+# clear_lines on the row-mask board), so it can only find placements the
+# player could reach: a breadth-first search over (rotation, x) using the
+# same rotate/kick and move steps as the inputs, each result hard-dropped,
+# locked on a copy of the board and scored. With lookahead the next piece is
+# placed on every result as well and the best pair wins.
+#
+#   search = PlacementSearch(ROWS, COLS, collides, try_rotate, lock_piece, clear_lines,
+#                            drop_distance=drop_distance)
+#   bot = AutoPlayer(search, BTN_ROTATE, BTN_LEFT, BTN_RIGHT, BTN_SOFT, hard=BTN_HARD)
+#   buttons.source = bot.source                   # moves go through Buttons
+#   bot.new_piece(board, curr, rot, x, y, nextp)  # after every spawn
+#   print(bot.report())                           # placements searched per second
+#
+# Score = lines * w_lines + aggregate height * w_height + holes * w_holes
+#         + bumpiness * w_bump   (weights as keyword arguments)
+
+import array
+
+try:
+    from time import perf_counter as _clock  # host: time.monotonic is the virtual clock
+except ImportError:
+    from time import monotonic as _clock
+
+ROTATE = "r"
+LEFT = "<"
+RIGHT = ">"
+
+
+class PlacementSearch:
+    """ Every reachable final placement of a piece, scored by a heuristic """
+
+    def __init__(self, rows, cols, collides, try_rotate, lock_piece, clear_lines, *,
+                 drop_distance=None, w_lines=0.76, w_height=-0.51, w_holes=-0.36, w_bump=-0.18):
+        self.rows = rows
+        self.cols = cols
+        self.full = (1 << cols) - 1
+        self.collides = collides
+        self.try_rotate = try_rotate
+        self.lock_piece = lock_piece
+        self.clear_lines = clear_lines
+        self.drop_distance = drop_distance  # rows a piece can fall, else probed with collides
+        self.w_lines = w_lines
+        self.w_height = w_height
+        self.w_holes = w_holes
+        self.w_bump = w_bump
+        self._pop = bytes(bin(i).count("1") for i in range(1 << cols))  # bits set per row mask
+        self._heights = [0] * cols
+        self.searched = 0       # placements scored
+        self.elapsed = 0.0      # s spent in best()
+
+    def reachable(self, board, t, rot, x, y):
+        """ {(rot, x): moves} for every position reachable at row y """
+        collides = self.collides
+        if collides(board, t, rot, x, y):
+            return {}
+        paths = {(rot, x): ""}
+        queue = [(rot, x)]
+        i = 0
+        while i < len(queue):
+            r, px = queue[i]
+            i += 1
+            path = paths[(r, px)]
+            nr, nx = self.try_rotate(board, t, r, px, y)
+            if (nr, nx) not in paths:
+                paths[(nr, nx)] = path + ROTATE
+                queue.append((nr, nx))
+            for move, nx in ((LEFT, px - 1), (RIGHT, px + 1)):
+                if (r, nx) not in paths and not collides(board, t, r, nx, y):
+                    paths[(r, nx)] = path + move
+                    queue.append((r, nx))
+        return paths
+
+    def drop(self, board, t, rot, x, y):
+        if self.drop_distance is not None:
+            return y + self.drop_distance(board, t, rot, x, y)
+        while not self.collides(board, t, rot, x, y + 1):
+            y += 1
+        return y
+
+    def evaluate(self, board, lines):
+        """ Heuristic score of a board after a placement that cleared lines """
+        self.searched += 1
+        rows = self.rows
+        pop = self._pop
+        heights = self._heights
+        for c in range(self.cols):
+            heights[c] = 0
+        seen = 0    # columns with a filled cell above this row
+        holes = 0
+        for r in range(rows):
+            row = board[r]
+            if seen:
+                holes += pop[seen & ~row & self.full]
+            new = row & ~seen
+            if new:
+                c = 0
+                while new:
+                    if new & 1:
+                        heights[c] = rows - r
+                    new >>= 1
+                    c += 1
+                seen |= row
+        bump = 0
+        for c in range(self.cols - 1):
+            bump += abs(heights[c] - heights[c + 1])
+        return (lines * self.w_lines + sum(heights) * self.w_height
+                + holes * self.w_holes + bump * self.w_bump)
+
+    def _place(self, board, t, rot, x, y):
+        # copy of board with the piece dropped and locked, lines cleared
+        b = array.array("H", board)
+        self.lock_piece(b, t, rot, x, self.drop(board, t, rot, x, y))
+        return b, self.clear_lines(b)
+
+    def best(self, board, t, rot, x, y, next_t=None):
+        """ (score, rot, x, moves) of the best placement, or None if there is none """
+        start = _clock()
+        best = None
+        for (r, px), path in self.reachable(board, t, rot, x, y).items():
+            b, lines = self._place(board, t, r, px, y)
+            if next_t is None:
+                score = self.evaluate(b, lines)
+            else:
+                # the next piece spawns where this one did
+                score = None
+                for (nr, nx) in self.reachable(b, next_t, 0, x, y):
+                    b2, lines2 = self._place(b, next_t, nr, nx, y)
+                    s = self.evaluate(b2, lines2)
+                    if score is None or s > score:
+                        score = s
+                if score is None:
+                    score = -1e9  # the next piece would top out
+                score += lines * self.w_lines
+            if best is None or score > best[0]:
+                best = (score, r, px, path)
+        self.elapsed += _clock() - start
+        return best
+
+
+class AutoPlayer:
+    """ Plays tetris.py through a Buttons source using PlacementSearch """
+
+    def __init__(self, search, rotate, left, right, soft, *, hard=None, lookahead=True):
+        self.search = search
+        self.lookahead = lookahead
+        self.bits = {ROTATE: rotate, LEFT: left, RIGHT: right}
+        self.soft = soft
+        self.hard = hard        # hard drop button; without one, soft drop is held
+        self.rotate = rotate
+        self.queue = []         # button masks for the next polls
+        self.dropping = False   # soft drop held once the moves are done
+        self._tap = False
+        self.pieces = 0
+        self.games = 0
+
+    def new_piece(self, board, t, rot, x, y, next_t=None):
+        """ Plan the moves for a freshly spawned piece """
+        best = self.search.best(board, t, rot, x, y, next_t if self.lookahead else None)
+        self.queue = [0]  # let go of the last piece's drop first
+        if best is not None:
+            for move in best[3]:
+                # press and release: every move is its own press edge
+                self.queue.append(self.bits[move])
+                self.queue.append(0)
+        if self.hard:
+            self.queue.append(self.hard)
+        self.dropping = True
+        self.pieces += 1
+
+    def game_over(self):
+        self.queue = []
+        self.dropping = False
+        self.games += 1
+
+    def source(self, now):
+        """ Buttons source: the held mask for this poll """
+        if self.queue:
+            return self.queue.pop(0)
+        if self.dropping:
+            return self.soft
+        # game over screen: tap rotate to start the next game
+        self._tap = not self._tap
+        return self.rotate if self._tap else 0
+
+    def report(self):
+        s = self.search
+        rate = s.searched / s.elapsed if s.elapsed else 0
+        return "autoplay: games %d pieces %d, placements searched %d in %.2fs (%.0f/s)" % (
+            self.games, self.pieces, s.searched, s.elapsed, rate)
@@ -0,0 +1,107 @@
+# Wavetables for the speaker: one cycle of each (frequency, waveform) as an
+# audiocore.RawSample that is built once and then replayed with loop=True.
+#
+# generate_sine_wave() used to run math.sin for every sample and make a new
+# array and RawSample on each call, i.e. on every point scored, in the middle
+# of the game loop. ToneBank builds a table the first time a tone is asked
+# for (from one sine cycle computed at startup, by integer phase stepping) and
+# keeps the most recently used ones, so after preload() playing a tone is a
+# dict lookup.
+#
+#   tones = ToneBank()
+#   tones.preload(((440, SINE), (880, SQUARE)))     # at startup
+#   speaker.play(tones.get(440), loop=True)
+#   speaker.play(tones.get(200, NOISE), loop=True)  # short effects
+#
+# A table is one cycle, sample_rate // frequency samples long, so the pitch
+# is rounded the same way as before. NOISE is that many pseudo-random
+# samples, repeating at the frequency (lower = hissier).
+
+import array
+import math
+
+import audiocore
+
+SINE = 0
+SQUARE = 1
+TRIANGLE = 2
+NOISE = 3
+
+CENTER = 0x8000  # PWMAudioOut's quiescent value
+SINE_STEPS = 256
+
+
+class ToneBank:
+    """ LRU of one-cycle RawSamples keyed by (frequency, waveform) """
+
+    def __init__(self, sample_rate=8000, max_tones=16, amplitude=32767):
+        self.sample_rate = sample_rate
+        self.max_tones = max_tones
+        self.amplitude = amplitude
+        self._sine = array.array("H", [
+            CENTER + int(math.sin(2 * math.pi * i / SINE_STEPS) * amplitude)
+            for i in range(SINE_STEPS)])
+        self._samples = {}
+        self._order = []  # least recently used first
+        self._noise = 0xACE1  # LFSR state
+        self.hits = 0
+        self.misses = 0
+
+    def preload(self, tones):
+        # Build up front, e.g. preload(((440, SINE), (220, NOISE)))
+        for frequency, waveform in tones:
+            self.get(frequency, waveform)
+
+    def get(self, frequency, waveform=SINE):
+        """ RawSample of one cycle (cached) """
+        key = (frequency, waveform)
+        sample = self._samples.get(key)
+        order = self._order
+        if sample is not None:
+            self.hits += 1
+            if order[-1] != key:
+                order.remove(key)
+                order.append(key)
+            return sample
+        self.misses += 1
+        sample = audiocore.RawSample(self.table(frequency, waveform), sample_rate=self.sample_rate)
+        if len(order) >= self.max_tones:
+            del self._samples[order.pop(0)]
+        self._samples[key] = sample
+        order.append(key)
+        return sample
+
+    def table(self, frequency, waveform=SINE):
+        """ One cycle of the waveform as unsigned 16-bit samples """
+        n = max(2, self.sample_rate // frequency)
+        out = array.array("H", bytes(2 * n))
+        amp = self.amplitude
+        low = CENTER - amp
+        if waveform == SINE:
+            sine = self._sine
+            for i in range(n):
+                out[i] = sine[i * SINE_STEPS // n]
+        elif waveform == SQUARE:
+            half = n // 2
+            for i in range(n):
+                out[i] = CENTER + amp if i < half else low
+        elif waveform == TRIANGLE:
+            half = n // 2
+            for i in range(n):
+                if i < half:
+                    out[i] = low + 2 * amp * i // half
+                else:
+                    out[i] = CENTER + amp - 2 * amp * (i - half) // (n - half)
+        elif waveform == NOISE:
+            s = self._noise
+            for i in range(n):
+                # 16-bit Galois LFSR
+                s = (s >> 1) ^ (0xB400 if s & 1 else 0)
+                out[i] = low + (s * 2 * amp >> 16)
+            self._noise = s
+        else:
+            raise ValueError("unknown waveform %r" % waveform)
+        return out
+
+    def report(self):
+        return "tones: %d cached, %d hits, %d built" % (len(self._samples), self.hits, self.misses)